@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Subject, TimetableEntry, Task, Reminder, ClassroomCourse, ClassroomAssignment, OAuthAccount
+from .models import Subject, TimetableEntry, Task, Reminder, ClassroomCourse, ClassroomAssignment, OAuthAccount, WorkerHeartbeat
 
 @admin.register(Subject)
 class SubjectAdmin(admin.ModelAdmin):
@@ -34,4 +34,8 @@ class ClassroomAssignmentAdmin(admin.ModelAdmin):
 @admin.register(OAuthAccount)
 class OAuthAccountAdmin(admin.ModelAdmin):
     list_display = ("id","user","provider","provider_user_id","token_expires_at","updated_at")
-    search_fields = ("provider_user_id", "user__email")
\ No newline at end of file
+    search_fields = ("provider_user_id", "user__email")
+
+@admin.register(WorkerHeartbeat)
+class WorkerHeartbeatAdmin(admin.ModelAdmin):
+    list_display = ("name","state","pid","ticks","started_at","beat_at")
@@ -0,0 +1,17 @@
+# core/checks.py
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+from core.services import quota
+
+
+@register(Tags.caches)
+def google_quota_cache(app_configs, **kwargs):
+    """The Google API budget is only project-wide when every process shares the cache."""
+    if quota.shared_cache() or settings.GOOGLE_QUOTA_ALLOW_LOCAL_CACHE:
+        return []
+    return [Warning(
+        "The Google API budget is kept in a per-process cache, so every web process and "
+        "the reminder worker gets the whole budget to itself.",
+        hint="Set REDIS_URL, or GOOGLE_QUOTA_ALLOW_LOCAL_CACHE=true when one process is all there is.",
+        id="core.W001",
+    )]
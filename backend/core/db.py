@@ -0,0 +1,69 @@
+# core/db.py
+"""
+Primary/replica routing.
+
+Reads go to the "replica" alias when one is configured, except when the
+current context is pinned to the primary: inside a transaction on the
+primary, within use_primary(), or - via
+core.middleware.ReplicaStickinessMiddleware - after a write earlier in the
+same request or by the same client within DB_REPLICA_STICKY_SECONDS.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connections
+
+PRIMARY = "default"
+REPLICA = "replica"
+
+_pinned = ContextVar("uniplan_db_pinned", default=False)
+_WRITE_VERBS = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+def pin_primary(value: bool = True):
+    """Pin (or unpin) the current context; returns a token for reset_pin()."""
+    return _pinned.set(value)
+
+
+def reset_pin(token):
+    _pinned.reset(token)
+
+
+def is_pinned() -> bool:
+    return _pinned.get()
+
+
+def pin_on_write(execute, sql, params, many, context):
+    """connection.execute_wrapper hook: the first real write pins the context."""
+    if not _pinned.get() and sql.lstrip()[:7].upper().startswith(_WRITE_VERBS):
+        _pinned.set(True)
+    return execute(sql, params, many, context)
+
+
+@contextmanager
+def use_primary():
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if REPLICA not in settings.DATABASES:
+            return PRIMARY
+        if _pinned.get() or connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        # "for write" also covers get_or_create lookups, so pinning happens on
+        # executed writes instead (pin_on_write)
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # same data on both aliases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
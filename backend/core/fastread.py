@@ -0,0 +1,129 @@
+# core/fastread.py
+"""
+Opt-in fast read path for list endpoints (settings.FAST_READ_PATH).
+
+List actions skip ModelSerializer instances entirely: rows come from a
+.values_list() queryset and are turned into dicts by a mapper compiled once per
+serializer class. The mapper reproduces the serializer's read output
+(field order, FK ids, DRF date/time formats); write paths are untouched.
+"""
+from datetime import timezone as dt_timezone
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from .renderers import FastJSONRenderer
+
+
+def _fmt_datetime(value):
+    # DRF DateTimeField: shift to the current zone, ISO 8601, "Z" for UTC
+    if value is None:
+        return None
+    value = value.astimezone(timezone.get_current_timezone()).isoformat()
+    return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+
+def json_datetime(value):
+    # DRF's JSON encoder (used when a serializer returns a datetime object as-is)
+    if value is None:
+        return None
+    value = value.astimezone(dt_timezone.utc).isoformat() if value.tzinfo else value.isoformat()
+    return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+
+def _fmt_iso(value):
+    return None if value is None else value.isoformat()
+
+
+_FORMATTERS = (
+    (serializers.DateTimeField, _fmt_datetime),
+    (serializers.DateField, _fmt_iso),
+    (serializers.TimeField, _fmt_iso),
+    (serializers.PrimaryKeyRelatedField, None),
+    (serializers.BooleanField, None),
+    (serializers.ChoiceField, None),
+    (serializers.CharField, None),
+    (serializers.IntegerField, None),
+)
+
+
+class ValuesMapper:
+    """
+    Maps .values_list() rows to the dicts a serializer would have produced.
+    `extra` maps output names to (queryset annotation, formatter) for
+    computed fields the serializer fills in by hand.
+    """
+
+    def __init__(self, serializer_class, extra=None):
+        extra = extra or {}
+        model = serializer_class.Meta.model
+        spec = []  # (output name, column, formatter)
+        for name, field in serializer_class().fields.items():
+            if field.write_only:
+                continue
+            if name in extra:
+                spec.append((name, name, extra[name][1]))
+                continue
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                continue  # serializer would raise SkipField for this one
+            for kind, fmt in _FORMATTERS:
+                if isinstance(field, kind):
+                    break
+            else:
+                raise ImproperlyConfigured(f"No fast formatter for {type(field).__name__} ({name})")
+            spec.append((name, model_field.name, fmt))
+
+        self.annotations = {name: expr for name, (expr, _) in extra.items()}
+        self.sources = [src for _, src, _ in spec]
+        self._row = self._compile(spec)
+
+    @staticmethod
+    def _compile(spec):
+        # resolved once: output names in order, plus only the columns that need formatting
+        names = tuple(name for name, _, _ in spec)
+        fmts = tuple((i, fmt) for i, (_, _, fmt) in enumerate(spec) if fmt is not None)
+
+        def row(values):
+            values = list(values)
+            for i, fmt in fmts:
+                values[i] = fmt(values[i])
+            return dict(zip(names, values))
+        return row
+
+    def rows(self, queryset):
+        if self.annotations:
+            queryset = queryset.annotate(**self.annotations)
+        return list(map(self._row, queryset.values_list(*self.sources)))
+
+
+class FastListMixin:
+    """
+    ModelViewSet mixin: when settings.FAST_READ_PATH is on, `list` is served
+    through a ValuesMapper and every action renders with FastJSONRenderer.
+    Set `fast_list_extra` for serializer fields computed outside the model.
+    """
+    fast_list_extra = None
+    _fast_mappers = {}
+
+    @classmethod
+    def get_fast_mapper(cls):
+        mapper = FastListMixin._fast_mappers.get(cls)
+        if mapper is None:
+            mapper = FastListMixin._fast_mappers[cls] = ValuesMapper(cls.serializer_class, cls.fast_list_extra)
+        return mapper
+
+    def get_renderers(self):
+        renderers = super().get_renderers()
+        if not settings.FAST_READ_PATH:
+            return renderers
+        return [FastJSONRenderer() if type(r) is JSONRenderer else r for r in renderers]
+
+    def list(self, request, *args, **kwargs):
+        if not settings.FAST_READ_PATH or self.paginator is not None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(self.get_fast_mapper().rows(queryset))
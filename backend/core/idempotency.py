@@ -0,0 +1,82 @@
+# core/idempotency.py
+"""
+Idempotency-Key support for create endpoints.
+
+The first POST with a given key inserts an IdempotencyRecord and does the
+work in the same transaction, storing its response on the record. A retry
+with the same key gets that stored response back without running the view.
+A duplicate arriving while the first is still running blocks on the unique
+(user, key) insert until the first commits, then replays its response; if
+the first failed, its record rolled back with it and the retry does the work.
+"""
+import hashlib
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework.response import Response
+from .db import PRIMARY
+from .models import IdempotencyRecord
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+
+def _fingerprint(request) -> str:
+    h = hashlib.sha256()
+    h.update(f"{request.method} {request.path}\n".encode())
+    h.update(request.body)
+    return h.hexdigest()
+
+
+def _replay(record):
+    resp = Response(record.body, status=record.status_code)
+    resp["Idempotent-Replayed"] = "true"
+    return resp
+
+
+def _mismatch():
+    return Response({"detail": f"{HEADER} was already used for a different request."}, status=422)
+
+
+class IdempotentCreateMixin:
+    """Makes create() honour the Idempotency-Key header; requests without one behave as before."""
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return super().create(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response({"detail": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters."}, status=400)
+
+        fingerprint = _fingerprint(request)  # read the body before the parsers consume the stream
+        now = timezone.now()
+        expires_at = now + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS)
+        done = (IdempotencyRecord.objects.using(PRIMARY)
+                .filter(user=request.user, key=key, expires_at__gt=now, status_code__isnull=False).first())
+        if done is not None:  # the usual retry: no transaction, no locks
+            return _replay(done) if done.fingerprint == fingerprint else _mismatch()
+
+        with transaction.atomic(using=PRIMARY):
+            try:
+                with transaction.atomic(using=PRIMARY):
+                    record = IdempotencyRecord.objects.create(user=request.user, key=key, fingerprint=fingerprint,
+                                                              expires_at=expires_at)
+            except IntegrityError:
+                # taken: by a finished request, or one still running (this waited for it to commit)
+                record = IdempotencyRecord.objects.select_for_update().get(user=request.user, key=key)
+                if record.expires_at > now:
+                    if record.fingerprint != fingerprint:
+                        return _mismatch()
+                    if record.status_code is not None:
+                        return _replay(record)
+                # expired, not purged yet: the key is free again
+                record.fingerprint, record.created_at, record.expires_at = fingerprint, now, expires_at
+
+            response = super().create(request, *args, **kwargs)
+            if response.status_code >= 500:
+                transaction.set_rollback(True)  # let a retry do the work again
+                return response
+            record.status_code, record.body = response.status_code, response.data
+            record.save()
+        return response
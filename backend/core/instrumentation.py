@@ -0,0 +1,72 @@
+# core/instrumentation.py
+"""
+Per-request timing collected by core.middleware.RequestMetricsMiddleware.
+
+Code paths record into the current request's RequestMetrics through
+sql_timer (a connection.execute_wrapper) and span("name"); both are no-ops
+outside an instrumented request.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+MAX_STATEMENTS = 500  # bound memory on pathological requests
+
+_current = ContextVar("uniplan_request_metrics", default=None)
+
+
+class RequestMetrics:
+    __slots__ = ("queries", "sql_ms", "statements", "spans")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_ms = 0.0
+        self.statements = []  # (ms, sql)
+        self.spans = {}       # name -> ms
+
+    def slowest(self, n=3):
+        return sorted(self.statements, key=lambda s: s[0], reverse=True)[:n]
+
+
+def start():
+    """Begin collecting for this context; returns (metrics, token for stop())."""
+    m = RequestMetrics()
+    return m, _current.set(m)
+
+
+def resume(metrics):
+    """Collect into an existing request's metrics again (a streamed body); returns a token for stop()."""
+    return _current.set(metrics)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+def sql_timer(execute, sql, params, many, context):
+    m = _current.get()
+    if m is None:
+        return execute(sql, params, many, context)
+    t0 = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        ms = (time.perf_counter() - t0) * 1000
+        m.queries += 1
+        m.sql_ms += ms
+        if len(m.statements) < MAX_STATEMENTS:
+            m.statements.append((ms, sql))
+
+
+@contextmanager
+def span(name: str):
+    """Time a block (e.g. an outbound Google call) into the current request."""
+    m = _current.get()
+    if m is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        m.spans[name] = m.spans.get(name, 0.0) + (time.perf_counter() - t0) * 1000
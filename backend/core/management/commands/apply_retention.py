@@ -0,0 +1,62 @@
+# core/management/commands/apply_retention.py
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core.db import use_primary
+from core.models import IdempotencyRecord, Tombstone
+from core.services import retention
+
+
+class Command(BaseCommand):
+    help = (
+        "Archive (or purge) delivered reminders and long-completed tasks in small chunked transactions, "
+        "and drop expired sync tombstones and idempotency keys. "
+        "Safe to interrupt: the next run resumes where this one stopped."
+    )
+
+    def add_arguments(self, p):
+        p.add_argument("--reminder-days", type=int, default=settings.REMINDER_RETENTION_DAYS,
+                       help="keep delivered reminders this long")
+        p.add_argument("--task-days", type=int, default=settings.TASK_RETENTION_DAYS,
+                       help="keep completed tasks this long")
+        p.add_argument("--tombstone-days", type=int, default=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+        p.add_argument("--chunk", type=int, default=settings.RETENTION_CHUNK, help="rows per transaction")
+        p.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between chunks")
+        p.add_argument("--max-seconds", type=int, help="stop after this long; rerun to continue")
+        p.add_argument("--purge", action="store_true", help="delete instead of copying to the archive tables")
+        p.add_argument("--dry-run", action="store_true", help="only count what would be moved")
+
+    def handle(self, *args, **opt):
+        now = timezone.now()
+        reminder_cutoff = now - timedelta(days=opt["reminder_days"])
+        task_cutoff = now - timedelta(days=opt["task_days"])
+        tombstone_cutoff = now - timedelta(days=opt["tombstone_days"])
+
+        with use_primary():
+            if opt["dry_run"]:
+                self.stdout.write(
+                    f"would move {retention.expired_tasks(task_cutoff).count()} task(s), "
+                    f"{retention.expired_reminders(reminder_cutoff).count()} delivered reminder(s); "
+                    f"would purge {Tombstone.objects.filter(deleted_at__lt=tombstone_cutoff).count()} tombstone(s), "
+                    f"{IdempotencyRecord.objects.filter(expires_at__lt=now).count()} idempotency key(s)"
+                )
+                return
+
+            budget = retention.Budget(opt["max_seconds"], opt["pause"])
+            t0 = time.perf_counter()
+            chunk = opt["chunk"]
+            # tasks first: their reminders leave with them instead of being archived twice
+            tasks, task_reminders = retention.archive_tasks(task_cutoff, now, chunk, opt["purge"], budget)
+            reminders = retention.archive_reminders(reminder_cutoff, now, chunk, opt["purge"], budget)
+            tombstones = retention.purge_tombstones(tombstone_cutoff, chunk * 2, budget)
+            keys = retention.purge_idempotency_records(now, chunk * 2, budget)
+
+        verb = "purged" if opt["purge"] else "archived"
+        self.stdout.write(
+            f"{verb} {tasks} task(s) with {task_reminders} reminder(s), {reminders} delivered reminder(s); "
+            f"purged {tombstones} tombstone(s), {keys} idempotency key(s) in {time.perf_counter() - t0:.1f}s"
+        )
+        if budget.exhausted:
+            self.stdout.write("stopped at --max-seconds; run again to continue")
@@ -0,0 +1,86 @@
+# core/management/commands/bench_imports.py
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from django.core.management.base import BaseCommand, CommandError
+
+# what a fresh process imports before it can do any work
+SCENARIOS = {
+    # every manage.py command runs the URL system check, which imports all views
+    "urls": "from django.urls import get_resolver; get_resolver().url_patterns",
+    "send_reminders": (
+        "from django.core.management import load_command_class; "
+        "load_command_class('core', 'send_reminders'); "
+        "from django.core import checks; checks.run_checks()"
+    ),
+}
+# must not be imported at startup; they belong on the OAuth / Classroom / workload paths only
+HEAVY = ("google_auth_oauthlib", "googleapiclient", "google.auth.transport.requests", "google.oauth2", "numpy")
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def _profile(code):
+    """Run `code` in a fresh interpreter under -X importtime; returns (wall ms, {module: (self us, cum us, depth)})."""
+    script = f"import time; t0 = time.perf_counter(); import django; django.setup(); {code}; " \
+             "print((time.perf_counter() - t0) * 1000)"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", script],
+                          capture_output=True, text=True, env=os.environ.copy())
+    if proc.returncode:
+        raise CommandError(proc.stderr[-2000:])
+    modules = {}
+    for m in LINE.finditer(proc.stderr):
+        modules[m.group(4)] = (int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2)
+    return float(proc.stdout.strip().splitlines()[-1]), modules
+
+
+def _top_packages(modules, n):
+    # roll self time up to top-level package, so "google.*" shows as one line
+    totals = {}
+    for name, (self_us, _, _) in modules.items():
+        pkg = name.split(".", 1)[0]
+        totals[pkg] = totals.get(pkg, 0) + self_us
+    return sorted(((us / 1000, pkg) for pkg, us in totals.items()), reverse=True)[:n]
+
+
+class Command(BaseCommand):
+    help = (
+        "Startup import cost (python -X importtime) of a fresh process, per scenario. "
+        "Fails if a heavy module is imported eagerly or startup exceeds --max-ms."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, p):
+        p.add_argument("--scenario", nargs="+", choices=sorted(SCENARIOS), default=sorted(SCENARIOS))
+        p.add_argument("--repeat", type=int, default=5)
+        p.add_argument("--top", type=int, default=12, help="packages to list by import time")
+        p.add_argument("--max-ms", type=float, help="fail when median startup exceeds this")
+        p.add_argument("--json", dest="json_out", help="also write results to this file")
+
+    def handle(self, *args, **opt):
+        results, failures = [], []
+        for name in opt["scenario"]:
+            runs = [_profile(SCENARIOS[name]) for _ in range(opt["repeat"])]
+            wall = statistics.median(ms for ms, _ in runs)
+            modules = runs[-1][1]
+            eager = sorted(m for m in modules if m.startswith(HEAVY))
+            top = _top_packages(modules, opt["top"])
+
+            self.stdout.write(f"{name}: median {wall:.0f} ms over {len(runs)} runs, {len(modules)} modules")
+            for ms, pkg in top:
+                self.stdout.write(f"  {ms:8.1f} ms  {pkg}")
+            if eager:
+                failures.append(f"{name}: imports {', '.join(eager[:5])}{' ...' if len(eager) > 5 else ''} at startup")
+            if opt["max_ms"] and wall > opt["max_ms"]:
+                failures.append(f"{name}: {wall:.0f} ms > --max-ms {opt['max_ms']:.0f}")
+            results.append({"scenario": name, "median_ms": round(wall, 1), "modules": len(modules),
+                            "eager_heavy": eager, "top": [{"package": p, "ms": round(ms, 1)} for ms, p in top]})
+
+        if opt["json_out"]:
+            with open(opt["json_out"], "w") as fh:
+                json.dump(results, fh, indent=2)
+        if failures:
+            raise CommandError("; ".join(failures))
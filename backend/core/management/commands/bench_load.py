@@ -0,0 +1,194 @@
+# core/management/commands/bench_load.py
+import json
+import random
+import statistics
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils import timezone
+from core.models import Subject, TimetableEntry, Task, Reminder
+from core.services.ical import feed_secret
+from core.views import _sign, _sign_feed, _sign_sync
+
+# name -> path builder(user_id, today), run once per user before timing; every request goes
+# through the full middleware stack
+SCENARIOS = {
+    "subjects": lambda uid, today: "/api/subjects/",
+    "timetable": lambda uid, today: "/api/timetable/",
+    "tasks": lambda uid, today: "/api/tasks/",
+    "reminders": lambda uid, today: "/api/reminders/",
+    "reminders_summary": lambda uid, today: "/api/reminders/summary/",
+    "notifications": lambda uid, today: "/api/notifications/",
+    "calendar_month": lambda uid, today: f"/api/calendar?from={today}&to={today + timedelta(days=30)}",
+    "sync_full": lambda uid, today: "/api/sync",
+    "sync_delta": lambda uid, today: f"/api/sync?since={_sign_sync(timezone.now() - timedelta(minutes=5))}",
+    "ical_feed": lambda uid, today: f"/api/calendar/feed/{_sign_feed(uid, feed_secret(uid))}.ics",
+}
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _percentiles(samples):
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {"p50_ms": round(pick(0.50), 2), "p95_ms": round(pick(0.95), 2), "p99_ms": round(pick(0.99), 2),
+            "mean_ms": round(statistics.fmean(ordered), 2), "max_ms": round(ordered[-1], 2)}
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the main API endpoints and the send_reminders tick against users created by seed_data; "
+        "reports throughput and p50/p95/p99 latency, optionally as JSON for comparing runs."
+    )
+
+    def add_arguments(self, p):
+        p.add_argument("--prefix", default="load", help="seed_data user prefix")
+        p.add_argument("--requests", type=int, default=200, help="per endpoint")
+        p.add_argument("--concurrency", type=int, default=4, help="client threads")
+        p.add_argument("--sample-users", type=int, default=50)
+        p.add_argument("--warmup", type=int, default=10, help="untimed requests per endpoint")
+        p.add_argument("--only", nargs="+", choices=sorted(SCENARIOS), help="endpoints to run (default all)")
+        p.add_argument("--ticks", type=int, default=3, help="send_reminders ticks to time (0 to skip)")
+        p.add_argument("--seed", type=int, default=1)
+        p.add_argument("--json", dest="json_out", help="write results to this file")
+        p.add_argument("--baseline", help="earlier --json output to compare against")
+
+    def handle(self, *args, **opt):
+        users = list(get_user_model().objects
+                     .filter(username__startswith=opt["prefix"], username__endswith="@uniplan.local")
+                     .order_by("id").values_list("id", "username")[:5000])
+        if not users:
+            raise CommandError(f"no seeded users with prefix {opt['prefix']!r}; run seed_data first")
+        rng = random.Random(opt["seed"])
+        users = rng.sample(users, min(opt["sample_users"], len(users)))
+        tokens = {uid: _sign(email) for uid, email in users}
+
+        result = {
+            "run_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "cache": settings.CACHES["default"]["BACKEND"].rsplit(".", 1)[-1],
+            "fast_read_path": settings.FAST_READ_PATH,
+            "options": {k: opt[k] for k in ("requests", "concurrency", "sample_users", "warmup", "seed")},
+            "dataset": self._dataset(opt["prefix"]),
+            "endpoints": [],
+        }
+        self.stdout.write("dataset: " + ", ".join(f"{n} {k}" for k, n in result["dataset"].items()))
+
+        self.stdout.write(f"{'endpoint':<18} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>7}")
+        for name in opt["only"] or SCENARIOS:
+            row = self._run_endpoint(name, SCENARIOS[name], list(tokens.items()), rng, opt)
+            result["endpoints"].append(row)
+            self.stdout.write(f"{name:<18} {row['rps']:>8.1f} {row['p50_ms']:>8.1f} "
+                              f"{row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['errors']:>7}")
+
+        if opt["ticks"]:
+            tick = self._run_ticks(opt["ticks"])
+            result["reminder_tick"] = tick
+            self.stdout.write(f"send_reminders tick: {tick['due']} due, p50 {tick['p50_ms']:.1f} ms, "
+                              f"{tick['reminders_per_s']:.0f} reminders/s")
+
+        if opt["baseline"]:
+            self._compare(result, opt["baseline"])
+        if opt["json_out"]:
+            with open(opt["json_out"], "w") as fh:
+                json.dump(result, fh, indent=2)
+
+    def _dataset(self, prefix):
+        users = get_user_model().objects.filter(username__startswith=prefix, username__endswith="@uniplan.local")
+        return {
+            "users": users.count(),
+            "subjects": Subject.objects.filter(user__in=users).count(),
+            "timetable": TimetableEntry.objects.filter(user__in=users).count(),
+            "tasks": Task.objects.filter(user__in=users).count(),
+            "reminders": Reminder.objects.filter(task__user__in=users).count(),
+        }
+
+    def _run_endpoint(self, name, build, users, rng, opt):
+        today = timezone.localdate()
+        # built up front: building may touch the database (the feed secret), which isn't what is measured
+        paths = {uid: build(uid, today) for uid, _ in users}
+        plan = [rng.choice(users) for _ in range(opt["warmup"] + opt["requests"])]
+        warm, plan = plan[:opt["warmup"]], plan[opt["warmup"]:]
+        client = Client(raise_request_exception=False, SERVER_NAME="localhost")
+        for uid, token in warm:
+            client.get(paths[uid], HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        samples, errors, lock = [], [0], threading.Lock()
+        cursor = iter(plan)
+
+        def worker():
+            c = Client(raise_request_exception=False, SERVER_NAME="localhost")
+            try:
+                while True:
+                    with lock:
+                        item = next(cursor, None)
+                    if item is None:
+                        return
+                    uid, token = item
+                    t0 = time.perf_counter()
+                    resp = c.get(paths[uid], HTTP_AUTHORIZATION=f"Bearer {token}")
+                    if resp.streaming:
+                        b"".join(resp.streaming_content)
+                    ms = (time.perf_counter() - t0) * 1000
+                    with lock:
+                        samples.append(ms)
+                        if resp.status_code >= 400:
+                            errors[0] += 1
+            finally:
+                connections.close_all()  # each thread opened its own connections
+
+        threads = [threading.Thread(target=worker) for _ in range(max(1, opt["concurrency"]))]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - t0
+        return {"endpoint": name, "requests": len(samples), "errors": errors[0],
+                "rps": round(len(samples) / wall, 1), **_percentiles(samples)}
+
+    def _run_ticks(self, n):
+        # every tick runs against the same backlog and is rolled back, so runs are repeatable
+        due = (Reminder.objects
+               .filter(delivered_at__isnull=True, status__in=["", "pending"], notify_at__lte=timezone.now())
+               .count())
+        samples = []
+        with override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend"):
+            for _ in range(n):
+                try:
+                    with transaction.atomic():
+                        t0 = time.perf_counter()
+                        call_command("send_reminders", stdout=StringIO())
+                        samples.append((time.perf_counter() - t0) * 1000)
+                        raise _Rollback
+                except _Rollback:
+                    pass
+        p50 = statistics.median(samples)
+        return {"ticks": n, "due": due, "reminders_per_s": round(due / (p50 / 1000), 1) if p50 else None,
+                **_percentiles(samples)}
+
+    def _compare(self, result, path):
+        with open(path) as fh:
+            base = json.load(fh)
+        before = {r["endpoint"]: r for r in base.get("endpoints", [])}
+        self.stdout.write(f"vs {path} ({base.get('run_at', '?')}):")
+        for row in result["endpoints"]:
+            old = before.get(row["endpoint"])
+            if not old:
+                continue
+            delta = lambda k: (row[k] - old[k]) / old[k] * 100 if old[k] else 0.0
+            self.stdout.write(f"  {row['endpoint']:<18} req/s {delta('rps'):+6.1f}%   p95 {delta('p95_ms'):+6.1f}%")
+        if "reminder_tick" in result and "reminder_tick" in base:
+            old, new = base["reminder_tick"]["p50_ms"], result["reminder_tick"]["p50_ms"]
+            if old:
+                self.stdout.write(f"  {'send_reminders':<18} p50 {(new - old) / old * 100:+6.1f}%")
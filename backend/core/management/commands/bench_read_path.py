@@ -0,0 +1,106 @@
+# core/management/commands/bench_read_path.py
+import json
+import statistics
+import time
+from datetime import time as dtime, timedelta
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+from core.models import Subject, TimetableEntry, Task, Reminder, ReminderChannel
+from core import views
+
+ENDPOINTS = [
+    ("tasks", views.TaskViewSet),
+    ("reminders", views.ReminderViewSet),
+    ("subjects", views.SubjectViewSet),
+    ("timetable", views.TimetableEntryViewSet),
+]
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Compare serializer vs fast (values + orjson) list rendering at several row counts. Writes nothing."
+
+    def add_arguments(self, p):
+        p.add_argument("--rows", type=int, nargs="+", default=[1000, 10000])
+        p.add_argument("--repeat", type=int, default=5)
+        p.add_argument("--json", dest="json_out", help="also write results to this file")
+
+    def handle(self, *args, **opt):
+        results = []
+        for n in opt["rows"]:
+            try:
+                with transaction.atomic():
+                    user = self._seed(n)
+                    results += self._run(user, n, opt["repeat"])
+                    raise _Rollback
+            except _Rollback:
+                pass
+
+        self.stdout.write(f"{'endpoint':<10} {'rows':>6} {'serializer ms':>14} {'fast ms':>9} {'speedup':>8}")
+        for r in results:
+            self.stdout.write(
+                f"{r['endpoint']:<10} {r['rows']:>6} {r['serializer_ms']:>14.1f} {r['fast_ms']:>9.1f} {r['speedup']:>7.1f}x"
+            )
+        if opt["json_out"]:
+            with open(opt["json_out"], "w") as fh:
+                json.dump(results, fh, indent=2)
+
+    def _seed(self, n):
+        user = get_user_model().objects.create(username="bench@uniplan.local", email="bench@uniplan.local")
+        now = timezone.now()
+        n_subjects = max(1, n // 10)
+        subjects = Subject.objects.bulk_create(
+            Subject(user=user, name=f"Subject {i}", code=f"S{i:05d}", color_hex="#1f2937") for i in range(n_subjects)
+        )
+        TimetableEntry.objects.bulk_create(
+            TimetableEntry(user=user, subject=subjects[i % n_subjects], day_of_week=i % 7,
+                           start_time=dtime(8 + i % 10), end_time=dtime(9 + i % 10), room=f"R{i}")
+            for i in range(n)
+        )
+        tasks = Task.objects.bulk_create(
+            Task(user=user, subject=subjects[i % n_subjects], title=f"Task {i}", description="x" * 80,
+                 due_at=now + timedelta(days=i % 60), source="bench", external_id=str(i))
+            for i in range(n)
+        )
+        Reminder.objects.bulk_create(
+            Reminder(task=t, channel=ReminderChannel.EMAIL, notify_at=t.due_at - timedelta(days=1), status="pending")
+            for t in tasks
+        )
+        return user
+
+    def _time(self, viewset, user, repeat):
+        view = viewset.as_view({"get": "list"})
+        factory = APIRequestFactory()
+        samples, body = [], None
+        for _ in range(repeat):
+            request = factory.get("/", HTTP_ACCEPT="application/json")
+            force_authenticate(request, user=user)
+            t0 = time.perf_counter()
+            resp = view(request)
+            resp.render()
+            samples.append((time.perf_counter() - t0) * 1000)
+            body = resp.content
+        return statistics.median(samples), body
+
+    def _run(self, user, n, repeat):
+        out = []
+        for name, viewset in ENDPOINTS:
+            with override_settings(FAST_READ_PATH=False):
+                slow_ms, slow_body = self._time(viewset, user, repeat)
+            with override_settings(FAST_READ_PATH=True):
+                fast_ms, fast_body = self._time(viewset, user, repeat)
+            if json.loads(slow_body) != json.loads(fast_body):
+                self.stderr.write(f"WARNING: {name} fast output differs from serializer output")
+            out.append({
+                "endpoint": name, "rows": n,
+                "serializer_ms": round(slow_ms, 2), "fast_ms": round(fast_ms, 2),
+                "speedup": round(slow_ms / fast_ms, 2) if fast_ms else None,
+            })
+        return out
@@ -0,0 +1,73 @@
+# core/management/commands/bench_task_stats.py
+import random
+import statistics
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from core.db import use_primary
+from core.models import Subject
+from core.services import task_stats
+
+
+def _time(fn, repeat):
+    samples = []
+    with CaptureQueriesContext(connection) as ctx:
+        fn()
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples, len(ctx.captured_queries)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare /api/stats read from the maintained counters with the live COUNT/GROUP BY it replaces, "
+        "for users created by seed_data; also checks that both give the same numbers."
+    )
+
+    def add_arguments(self, p):
+        p.add_argument("--prefix", default="load", help="seed_data user prefix")
+        p.add_argument("--sample-users", type=int, default=50)
+        p.add_argument("--repeat", type=int, default=20, help="timed calls per user and method")
+        p.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **opt):
+        users = list(get_user_model().objects
+                     .filter(username__startswith=opt["prefix"], username__endswith="@uniplan.local")
+                     .order_by("id").values_list("id", flat=True)[:5000])
+        if not users:
+            raise CommandError(f"no seeded users with prefix {opt['prefix']!r}; run seed_data first")
+        users = random.Random(opt["seed"]).sample(users, min(opt["sample_users"], len(users)))
+
+        with use_primary():
+            task_stats.roll()
+            task_stats.rebuild_all(get_user_model().objects.filter(pk__in=users))  # counters exist and are exact
+            as_of = task_stats.watermark()
+
+            mismatched = 0
+            timings = {"counters": ([], []), "live": ([], [])}
+            for uid in users:
+                fresh = task_stats.aggregate([uid], as_of)
+                board = task_stats.dashboard(uid)
+                live = {f: sum(c[f] for c in fresh.values()) for f in task_stats.FIELDS}
+                mismatched += live != board["totals"]
+                for name, fn in (("counters", lambda: task_stats.dashboard(uid)),
+                                 ("live", lambda: (task_stats.aggregate([uid], as_of),
+                                                   list(Subject.objects.filter(user_id=uid).values())))):
+                    samples, queries = _time(fn, opt["repeat"])
+                    timings[name][0].extend(samples)
+                    timings[name][1].append(queries)
+
+        self.stdout.write(f"{len(users)} users, {opt['repeat']} calls each ({connection.vendor})")
+        for name, (samples, queries) in timings.items():
+            ordered = sorted(samples)
+            self.stdout.write(
+                f"  {name:9s} p50 {statistics.median(ordered):7.2f} ms  "
+                f"p95 {ordered[int(0.95 * (len(ordered) - 1))]:7.2f} ms  "
+                f"{max(queries)} queries")
+        if mismatched:
+            raise CommandError(f"counters disagree with the live aggregate for {mismatched} user(s)")
+        self.stdout.write("counters match the live aggregate")
@@ -0,0 +1,31 @@
+# core/management/commands/rebuild_task_stats.py
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from core.db import use_primary
+from core.models import Task
+from core.services import task_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the dashboard task counters from the tasks table and fix any drift "
+        "(run periodically, e.g. nightly). --backfill also builds users that have no counters yet."
+    )
+
+    def add_arguments(self, p):
+        p.add_argument("--email", nargs="+", help="only these users")
+        p.add_argument("--backfill", action="store_true", help="every user with tasks, not just those with counters")
+        p.add_argument("--chunk", type=int, default=500, help="users per transaction")
+
+    def handle(self, *args, **opt):
+        users = None
+        if opt["email"]:
+            users = get_user_model().objects.filter(username__in=opt["email"])
+        elif opt["backfill"]:
+            users = get_user_model().objects.filter(pk__in=Task.objects.values("user_id"))
+
+        t0 = time.perf_counter()
+        with use_primary():
+            repaired = task_stats.rebuild_all(users, chunk=opt["chunk"])
+        self.stdout.write(f"{repaired} counter row(s) rewritten in {time.perf_counter() - t0:.1f}s")
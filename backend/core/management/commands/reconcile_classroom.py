@@ -0,0 +1,46 @@
+# core/management/commands/reconcile_classroom.py
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from core.db import use_primary
+from core.models import GoogleAccount
+from core.services import classroom_sync, quota
+from core.views import _creds_for, _google, _refresh_if_expired, _service
+
+
+class Command(BaseCommand):
+    help = "Reconcile every linked account's classroom tasks with Google Classroom (deadlines, titles, deletions)."
+
+    def add_arguments(self, p):
+        p.add_argument("--email", nargs="+", help="only these accounts")
+
+    def handle(self, *args, **opt):
+        emails = GoogleAccount.objects.order_by("email").values_list("email", flat=True)
+        if opt["email"]:
+            emails = emails.filter(email__in=opt["email"])
+        users = dict(get_user_model().objects.filter(username__in=list(emails)).values_list("username", "id"))
+
+        totals = {}
+        with use_primary():
+            for email in emails:
+                user_id = users.get(email)
+                if user_id is None:
+                    continue  # linked Google account that never signed in to the API
+                try:
+                    acc, creds = _creds_for(email)
+                    with quota.charged_to(email):
+                        _refresh_if_expired(acc, creds)
+                        remote, courses = classroom_sync.fetch_remote(
+                            _service("classroom", "v1", creds), lambda req: _google(req.execute))
+                    counts = classroom_sync.reconcile(user_id, remote, courses)
+                except quota.QuotaExceeded as e:
+                    self.stderr.write(f"{email}: {e}; stopping, the rest wait for the next run")
+                    break
+                except Exception as e:  # one broken grant shouldn't stop the others
+                    self.stderr.write(f"{email}: {type(e).__name__}: {e}")
+                    continue
+                for k, v in counts.items():
+                    totals[k] = totals.get(k, 0) + v
+                if any(counts.values()):
+                    self.stdout.write(f"{email}: " + ", ".join(f"{v} {k}" for k, v in counts.items() if v))
+
+        self.stdout.write("total: " + (", ".join(f"{v} {k}" for k, v in totals.items()) or "nothing to do"))
@@ -0,0 +1,176 @@
+# core/management/commands/seed_data.py
+import random
+import time
+from datetime import time as dtime, timedelta
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from core.models import Subject, TimetableEntry, Task, Reminder, ReminderChannel, TaskStatus, Priority
+from core.services import task_stats
+from core.services.generations import bump_generation
+
+RULES = ["FREQ=WEEKLY", "FREQ=WEEKLY;INTERVAL=2", "FREQ=DAILY;INTERVAL=3", "FREQ=MONTHLY"]
+
+
+def _range(value: str):
+    """'20' or '10:200' -> (lo, hi), drawn uniformly per user."""
+    lo, _, hi = value.partition(":")
+    try:
+        lo, hi = int(lo), int(hi or lo)
+    except ValueError:
+        raise CommandError(f"expected N or MIN:MAX, got {value!r}")
+    if lo < 0 or hi < lo:
+        raise CommandError(f"bad range {value!r}")
+    return lo, hi
+
+
+def _ratio(value: str):
+    v = float(value)
+    if not 0 <= v <= 1:
+        raise CommandError(f"ratio must be within 0..1, got {value!r}")
+    return v
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-generate synthetic users with subjects, timetable, tasks and reminders for load testing. "
+        "Users are named <prefix><n>@uniplan.local; --clear removes an earlier run with the same prefix."
+    )
+
+    def add_arguments(self, p):
+        p.add_argument("--users", type=int, default=100)
+        p.add_argument("--prefix", default="load")
+        p.add_argument("--seed", type=int, default=1, help="RNG seed; the same seed gives the same dataset")
+        p.add_argument("--subjects", type=_range, default=(4, 8), help="per user, N or MIN:MAX")
+        p.add_argument("--classes", type=_range, default=(1, 3), help="weekly timetable slots per subject")
+        p.add_argument("--tasks", type=_range, default=(20, 120), help="per user, N or MIN:MAX")
+        p.add_argument("--past-days", type=int, default=60, help="due dates spread from now-past-days ...")
+        p.add_argument("--future-days", type=int, default=90, help="... to now+future-days")
+        p.add_argument("--completed", type=_ratio, default=0.35, help="share of past-due tasks already completed")
+        p.add_argument("--recurring", type=_ratio, default=0.05)
+        p.add_argument("--no-due", type=_ratio, default=0.1, help="share of tasks without a due date")
+        p.add_argument("--reminders", type=_ratio, default=0.7, help="share of dated tasks with an email reminder")
+        p.add_argument("--in-app", type=_ratio, default=0.2, help="share of those also reminded in-app")
+        p.add_argument("--backlog", type=_ratio, default=0.05,
+                       help="share of past reminders left pending, i.e. the queue send_reminders will find")
+        p.add_argument("--priorities", default="1:3:1", help="LOW:NORMAL:HIGH weights")
+        p.add_argument("--chunk", type=int, default=200, help="users written per transaction")
+        p.add_argument("--clear", action="store_true")
+
+    def handle(self, *args, **opt):
+        User = get_user_model()
+        prefix = opt["prefix"]
+        if opt["clear"]:
+            deleted, _ = User.objects.filter(username__startswith=prefix, username__endswith="@uniplan.local").delete()
+            self.stdout.write(f"cleared {deleted} row(s)")
+
+        rng = random.Random(opt["seed"])
+        self.weights = [int(w) for w in opt["priorities"].split(":")]
+        if len(self.weights) != 3:
+            raise CommandError("--priorities takes three weights, LOW:NORMAL:HIGH")
+        self.password = make_password(None)  # unusable; these users only sign in with bearer tokens
+        self.now = timezone.now()
+
+        totals = dict.fromkeys(["users", "subjects", "timetable", "tasks", "reminders"], 0)
+        t0 = time.perf_counter()
+        for first in range(0, opt["users"], opt["chunk"]):
+            names = [f"{prefix}{i}@uniplan.local" for i in range(first, min(first + opt["chunk"], opt["users"]))]
+            with transaction.atomic():
+                for key, n in self._seed_chunk(User, names, rng, opt).items():
+                    totals[key] += n
+            self.stdout.write(f"  {totals['users']}/{opt['users']} users")
+
+        elapsed = time.perf_counter() - t0
+        rows = sum(totals.values())
+        self.stdout.write(self.style.SUCCESS(
+            ", ".join(f"{n} {k}" for k, n in totals.items())
+            + f" in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)"
+        ))
+
+    def _seed_chunk(self, User, names, rng, opt):
+        # bulk_create doesn't return pks on every backend (MySQL), so ids are read back per table
+        User.objects.bulk_create(
+            [User(username=n, email=n, password=self.password) for n in names], ignore_conflicts=True
+        )
+        user_ids = list(User.objects.filter(username__in=names).values_list("id", flat=True))
+
+        Subject.objects.bulk_create([
+            Subject(user_id=uid, name=f"Subject {s}", code=f"SUB{s:03d}",
+                    color_hex="#%06x" % rng.randrange(0x1000000), location=f"Building {rng.randint(1, 20)}",
+                    teacher_name=f"Teacher {rng.randint(1, 500)}")
+            for uid in user_ids for s in range(rng.randint(*opt["subjects"]))
+        ], batch_size=1000, ignore_conflicts=True)
+        subjects = {}
+        for sid, uid in Subject.objects.filter(user_id__in=user_ids).values_list("id", "user_id"):
+            subjects.setdefault(uid, []).append(sid)
+
+        entries = []
+        for uid, sids in subjects.items():
+            for sid in sids:
+                for _ in range(rng.randint(*opt["classes"])):
+                    start = rng.randint(8, 17)
+                    entries.append(TimetableEntry(
+                        user_id=uid, subject_id=sid, day_of_week=rng.randint(1, 5),
+                        start_time=dtime(start), end_time=dtime(start + rng.choice((1, 2))),
+                        room=f"R{rng.randint(100, 999)}",
+                    ))
+        # timetable rows have no natural key: users from an earlier run keep theirs rather than get a copy
+        scheduled = set(TimetableEntry.objects.filter(user_id__in=user_ids).values_list("user_id", flat=True))
+        entries = [e for e in entries if e.user_id not in scheduled]
+        TimetableEntry.objects.bulk_create(entries, batch_size=1000)
+
+        tasks = [task for uid in user_ids for task in self._tasks(uid, subjects.get(uid, []), rng, opt)]
+        Task.objects.bulk_create(tasks, batch_size=1000, ignore_conflicts=True)
+
+        reminders = []
+        for tid, due_at, status, days in (Task.objects
+                                          .filter(user_id__in=user_ids, source="seed")
+                                          .values_list("id", "due_at", "status", "reminder_days_before")):
+            if days is None:
+                continue
+            channels = [ReminderChannel.EMAIL]
+            if rng.random() < opt["in_app"]:
+                channels.append(ReminderChannel.IN_APP)
+            notify_at = due_at - timedelta(days=days)
+            past = notify_at <= self.now
+            # past reminders have normally gone out already; a few stay pending as the worker's backlog
+            sent = past and (status == TaskStatus.COMPLETED or rng.random() >= opt["backlog"])
+            for channel in channels:
+                reminders.append(Reminder(
+                    task_id=tid, channel=channel, notify_at=notify_at,
+                    status="sent" if sent else "pending", delivered_at=notify_at if sent else None,
+                ))
+        Reminder.objects.bulk_create(reminders, batch_size=1000, ignore_conflicts=True)
+
+        # bulk inserts skip the signals: recount the dashboard and retire cached views
+        task_stats.rebuild(user_ids)
+        for uid in user_ids:
+            bump_generation("calendar", uid)
+
+        return {"users": len(user_ids), "subjects": sum(map(len, subjects.values())),
+                "timetable": len(entries), "tasks": len(tasks), "reminders": len(reminders)}
+
+    def _tasks(self, uid, sids, rng, opt):
+        for i in range(rng.randint(*opt["tasks"])):
+            due_at = None
+            if rng.random() >= opt["no_due"]:
+                due_at = self.now + timedelta(minutes=rng.randrange(-opt["past_days"] * 1440, opt["future_days"] * 1440 + 1))
+            recurring = due_at is not None and rng.random() < opt["recurring"]
+            done = due_at is not None and due_at < self.now and not recurring and rng.random() < opt["completed"]
+            days = rng.choice((1, 3, 7)) if due_at and rng.random() < opt["reminders"] else None
+            yield Task(
+                user_id=uid,
+                subject_id=rng.choice(sids) if sids and rng.random() < 0.9 else None,
+                title=f"Assignment {i}",
+                description="Synthetic task. " * rng.randint(0, 12),
+                status=TaskStatus.COMPLETED if done else rng.choice((TaskStatus.NOT_STARTED, TaskStatus.IN_PROCESS)),
+                priority=rng.choices((Priority.LOW, Priority.NORMAL, Priority.HIGH), weights=self.weights)[0],
+                due_at=due_at,
+                rrule=rng.choice(RULES) if recurring else "",
+                reminder_days_before=days,
+                source="seed",
+                external_id=str(i),
+                completed_at=due_at if done else None,
+            )
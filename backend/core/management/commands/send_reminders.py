@@ -1,109 +1,306 @@
 # core/management/commands/send_reminders.py
 from django.core.management.base import BaseCommand
+from django.core.exceptions import ImproperlyConfigured
 from django.core.mail import send_mail
 from django.db import transaction
 from django.utils import timezone
 from django.conf import settings
-from core.models import Reminder, ReminderChannel, TaskStatus
+from core.models import GoogleAccount, Reminder, ReminderChannel, TaskStatus
+from core.services.reminders import schedule_recurring_reminders
+from core.services.notifications import notify_many
+from core.services import classroom_sync, quota, task_stats
+from core.services import worker
+from core.db import use_primary
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+import json
+import signal
+import socket
+import threading
+
+# reminders claimed per batch; a stop signal waits for at most one batch to finish
+DELIVERY_BATCH = 100
+# emails recorded as sent per UPDATE while a batch goes out; a crash re-sends at most this many
+SENT_FLUSH = 10
 
 
 class Command(BaseCommand):
-    help = "Send due task reminders (email) once and mark delivered."
+    help = "Send due task reminders (email, or in-app inbox) once and mark delivered."
 
     def add_arguments(self, p):
         p.add_argument("--loop", action="store_true")
         p.add_argument("--interval", type=int, default=60)
         p.add_argument("--dry-run", action="store_true")
+        p.add_argument("--worker-name", default=None, help="heartbeat row name; defaults to the hostname")
+        p.add_argument("--profile", type=int, default=0, metavar="N",
+                       help="profile the first N ticks, one file each (see --profile-mode, --profile-dir)")
+        p.add_argument("--profile-mode", choices=["sample", "cprofile"], default="sample")
+        p.add_argument("--profile-dir", default=None, help="defaults to PROFILE_DIR, else the current directory")
 
     def handle(self, *args, **opt):
+        name = opt["worker_name"] or socket.gethostname()
+        self._stopping = threading.Event()
+
         def tick():
             now = timezone.now()
+            # claims a dead worker left in "sending": all of them at startup if no other worker is alive
+            released = worker.recover_claims(name, now, startup=ticks == 1)
+            if released:
+                self.stdout.write(f"released {released} reminder(s) left claimed by a stopped worker")
+
+            # top up reminders for recurring tasks whose next occurrences entered the horizon
+            added = schedule_recurring_reminders(now=now)
+            if added:
+                self.stdout.write(f"scheduled {added} recurring reminder(s)")
+
+            # dashboard counters: move overdue / due-this-week up to now
+            if task_stats.roll(now) is None:
+                repaired = task_stats.rebuild_all()
+                self.stdout.write(f"task stats were over a week behind; rebuilt ({repaired} row(s) changed)")
+
             qs = (
                 Reminder.objects
                 .select_related("task", "task__user")
                 .filter(
-                    channel=ReminderChannel.EMAIL,
+                    channel__in=[ReminderChannel.EMAIL, ReminderChannel.IN_APP],
                     delivered_at__isnull=True,
                     status__in=["", "pending"],
                     notify_at__lte=now,
                 )
             )
 
+            skipped = {"skipped": [], "skipped_completed": []}
+            deliver = []
             for r in qs:
                 t = r.task
-                if not t or not t.user or not t.user.email:
+                if not t or not t.user or (r.channel == ReminderChannel.EMAIL and not t.user.email):
                     # drop unfulfillable reminders
-                    r.status = "skipped"
-                    r.delivered_at = now
-                    r.save(update_fields=["status", "delivered_at"])
-                    continue
-
+                    skipped["skipped"].append(r.pk)
                 # don’t remind completed tasks
-                if t.status == TaskStatus.COMPLETED or t.completed_at:
-                    r.status = "skipped_completed"
-                    r.delivered_at = now
-                    r.save(update_fields=["status", "delivered_at"])
+                elif t.status == TaskStatus.COMPLETED or t.completed_at:
+                    skipped["skipped_completed"].append(r.pk)
+                else:
+                    deliver.append(r)
+
+            for status, ids in skipped.items():
+                if ids:
+                    (Reminder.objects
+                     .filter(pk__in=ids, delivered_at__isnull=True)
+                     .update(status=status, delivered_at=now, updated_at=now))
+
+            for i in range(0, len(deliver), DELIVERY_BATCH):
+                if self._stopping.is_set():
+                    break  # the rest stays pending for the next worker
+                if i:
+                    worker.beat(name)  # a long backlog mustn't look like a hung worker
+                batch = self._skip_turned_in(deliver[i:i + DELIVERY_BATCH], now)
+                if batch:
+                    self._deliver(batch, opt["dry_run"])
+
+        with use_primary():
+            worker.start(name, opt["interval"])
+        ticks = 0
+
+        def run(state):
+            nonlocal ticks
+            ticks += 1
+            # the claim/deliver path must never read a lagging replica
+            with use_primary():
+                if ticks > opt["profile"]:
+                    tick()
+                else:
+                    from core import profiling
+                    directory = opt["profile_dir"] or settings.PROFILE_DIR or "."
+                    with profiling.profile(opt["profile_mode"], directory, tag=f"send_reminders-tick{ticks}") as prof:
+                        tick()
+                    self.stdout.write(f"profile written to {prof.path}")
+                worker.beat(name, state=state, ticked=True)
+
+        if not opt["loop"]:
+            run(worker.STOPPED)
+            return
+
+        def stop(signum, frame):
+            self.stdout.write(f"received signal {signum}; finishing the current batch")
+            self._stopping.set()
+
+        previous = {sig: signal.signal(sig, stop) for sig in (signal.SIGTERM, signal.SIGINT)}
+        try:
+            while not self._stopping.is_set():
+                run(worker.RUNNING)
+                self._stopping.wait(opt["interval"])  # a stop signal cuts the sleep short
+        finally:
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+            with use_primary():
+                worker.beat(name, state=worker.STOPPED)
+        self.stdout.write("stopped")
+
+    def _skip_turned_in(self, batch, now):
+        """
+        Ask Classroom which of the batch's classroom tasks were already turned
+        in: one submissions list per course involved, accounts checked in
+        parallel (CLASSROOM_CHECK_CONCURRENCY). Those tasks are completed and
+        their reminders skipped in bulk; the rest of the batch is returned.
+        A failed check only means that account's reminders go out as before;
+        a configuration error fails the tick instead.
+        """
+        courses = {}
+        for r in batch:
+            t = r.task
+            if t.source == classroom_sync.SOURCE and ":" in t.external_id and t.status != TaskStatus.COMPLETED:
+                courses.setdefault(t.user.username, set()).add(t.external_id.split(":", 1)[0])
+        if not courses:
+            return batch
+        accounts = list(GoogleAccount.objects.filter(email__in=courses))
+        if not accounts:
+            return batch
+
+        from google.auth.transport.requests import Request
+        from google.oauth2.credentials import Credentials
+        from core.views import SCOPES, _google, _service
+
+        def check(acc):
+            # network only: the database stays on this command's thread
+            creds = Credentials.from_authorized_user_info(acc.credentials, SCOPES)
+            with quota.charged_to(acc.email):
+                refreshed = creds.expired and creds.refresh_token
+                if refreshed:
+                    _google(creds.refresh, Request())
+                done = classroom_sync.fetch_turned_in(
+                    _service("classroom", "v1", creds), lambda req: _google(req.execute), courses[acc.email])
+            return done, creds if refreshed else None
+
+        turned_in, refreshed = set(), []
+        with ThreadPoolExecutor(max_workers=min(settings.CLASSROOM_CHECK_CONCURRENCY, len(accounts))) as pool:
+            pending = {pool.submit(check, acc): acc for acc in accounts}
+            for future in as_completed(pending):
+                acc = pending[future]
+                try:
+                    done, creds = future.result()
+                except ImproperlyConfigured:
+                    raise  # the same for every account: fail the tick, don't report it per account
+                except Exception as e:
+                    self.stderr.write(f"{acc.email}: Classroom check failed ({type(e).__name__}: {e}); reminding anyway")
                     continue
+                turned_in |= {(acc.email, ext) for ext in done}
+                if creds is not None:
+                    acc.credentials = json.loads(creds.to_json())
+                    refreshed.append(acc)
+        if refreshed:
+            GoogleAccount.objects.bulk_update(refreshed, ["credentials"])
+
+        done_tasks = {r.task_id: r.task for r in batch if (r.task.user.username, r.task.external_id) in turned_in}
+        if not done_tasks:
+            return batch
+        completed = classroom_sync.complete_turned_in(list(done_tasks.values()), now)
+        self.stdout.write(f"completed {completed} task(s) already turned in on Classroom; their reminders skipped")
+        return [r for r in batch if r.task_id not in done_tasks]
+
+    def _deliver(self, batch, dry_run):
+        """
+        Claim a batch (one locking query and one UPDATE to "sending",
+        committed before anything goes out), then send. Emails are recorded
+        as sent every SENT_FLUSH deliveries (one UPDATE each); the rest, and
+        the in-app entries with their bulk insert, are recorded in one
+        transaction at the end. A stop signal waits for this to finish; if
+        the process dies mid-batch instead, worker.recover_claims() hands back
+        the claims not yet recorded, so at most SENT_FLUSH emails go out twice.
+        """
+        with transaction.atomic():
+            locked = set(
+                Reminder.objects
+                .select_for_update(skip_locked=True)
+                .filter(pk__in=[r.pk for r in batch], delivered_at__isnull=True, status__in=["", "pending"])
+                .values_list("pk", flat=True)
+            )
+            if not locked:
+                return  # another worker has them all
+            Reminder.objects.filter(pk__in=locked).update(status=worker.SENDING, updated_at=timezone.now())
+
+        def record(pks):
+            delivered_at = timezone.now()
+            Reminder.objects.filter(pk__in=pks).update(status="sent", delivered_at=delivered_at,
+                                                       updated_at=delivered_at)
+
+        error, sent, inbox = None, [], []
+        for r in batch:
+            if r.pk not in locked:
+                continue
+            t = r.task
+            subject, body = self._compose(r)
+
+            if r.channel == ReminderChannel.IN_APP:
+                # stored in the inbox; the SSE hub pushes it to connected clients
+                if dry_run:
+                    self.stdout.write(f"[dry] would notify {t.user.username}: {subject}")
+                    sent.append(r.pk)
+                else:
+                    inbox.append((t.user_id, subject, body, r))
+                continue
+            if dry_run:
+                self.stdout.write(f"[dry] would email {t.user.email}: {subject}")
+                sent.append(r.pk)
+                continue
+            try:
+                send_mail(
+                    subject,
+                    body,
+                    settings.DEFAULT_FROM_EMAIL,
+                    [t.user.email],
+                    fail_silently=False,
+                )
+            except Exception as e:
+                # keep what already went out marked as sent, then fail the tick as before
+                error = e
+                break
+            sent.append(r.pk)
+            if len(sent) >= SENT_FLUSH:
+                record(sent)
+                sent = []
+
+        with transaction.atomic():
+            notify_many(inbox)
+            sent += [r.pk for *_, r in inbox]
+            if sent:
+                record(sent)
+        if error is not None:
+            # hand back the failed email and everything after it for the next tick
+            (Reminder.objects
+             .filter(pk__in=locked, status=worker.SENDING)
+             .update(status="pending", updated_at=timezone.now()))
+            raise error
+
+    def _compose(self, r):
+        t = r.task
+        # subject: prefer "due in X days" when we have a due date
+        subject = f"UniPlan reminder — {t.title}"
+
+        due_local_txt = "—"
+        days_left = None
+        if t.due_at:
+            due = t.due_at
+            if t.rrule and t.reminder_days_before is not None:
+                # recurring: this reminder belongs to a later occurrence
+                due = r.notify_at + timedelta(days=t.reminder_days_before)
+            if timezone.is_naive(due):
+                due = timezone.make_aware(due, timezone.get_current_timezone())
+            due_local = timezone.localtime(due)
+            due_local_txt = due_local.strftime("%A, %B %d, %Y at %H:%M")
+            days_left = max((due_local.date() - timezone.localdate()).days, 0)
+            plural = "" if days_left == 1 else "s"
+            subject = f'Reminder: "{t.title}" due in {days_left} day{plural}'
 
-                # send the reminder
-                with transaction.atomic():
-                    locked = (
-                        Reminder.objects
-                        .select_for_update(skip_locked=True)
-                        .filter(pk=r.pk, delivered_at__isnull=True)
-                        .first()
-                    )
-                    if not locked:
-                        continue
-
-                    # subject: prefer "due in X days" when we have a due date
-                    subject = f"UniPlan reminder — {t.title}"
-
-                    due_local_txt = "—"
-                    days_left = None
-                    if t.due_at:
-                        due = t.due_at
-                        if timezone.is_naive(due):
-                            due = timezone.make_aware(due, timezone.get_current_timezone())
-                        due_local = timezone.localtime(due)
-                        due_local_txt = due_local.strftime("%A, %B %d, %Y at %H:%M")
-                        days_left = max((due_local.date() - timezone.localdate()).days, 0)
-                        plural = "" if days_left == 1 else "s"
-                        subject = f'Reminder: "{t.title}" due in {days_left} day{plural}'
-
-                    # body of the email context
-                    lines = [
-                        f"Hello {t.user.username or t.user.email},",
-                        "",
-                        f"This is a reminder for your assignment: {t.title}",
-                        f"Priority: {t.get_priority_display()}",
-                    ]
-                    if t.due_at:
-                        lines.append(f"Due date: {due_local_txt}")
-                    if (t.description or "").strip():
-                        lines += ["", "Details:", t.description.strip()]
-                    lines += ["", "— UniPlan"]
-                    body = "\n".join(lines)
-
-                    if opt["dry_run"]:
-                        self.stdout.write(f"[dry] would email {t.user.email}: {subject}")
-                    else:
-                        send_mail(
-                            subject,
-                            body,
-                            settings.DEFAULT_FROM_EMAIL,
-                            [t.user.email],
-                            fail_silently=False,
-                        )
-
-                    locked.status = "sent"
-                    locked.delivered_at = timezone.now()
-                    locked.save(update_fields=["status", "delivered_at"])
-
-        if opt["loop"]:
-            import time
-            while True:
-                tick()
-                time.sleep(opt["interval"])
-        else:
-            tick()
+        # body of the email context
+        lines = [
+            f"Hello {t.user.username or t.user.email},",
+            "",
+            f"This is a reminder for your assignment: {t.title}",
+            f"Priority: {t.get_priority_display()}",
+        ]
+        if t.due_at:
+            lines.append(f"Due date: {due_local_txt}")
+        if (t.description or "").strip():
+            lines += ["", "Details:", t.description.strip()]
+        lines += ["", "— UniPlan"]
+        return subject, "\n".join(lines)
@@ -0,0 +1,28 @@
+# core/management/commands/worker_health.py
+import socket
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from core.models import WorkerHeartbeat
+from core.services import worker
+
+
+class Command(BaseCommand):
+    help = "Exit non-zero unless the reminder worker's heartbeat is fresh (container health check)."
+
+    def add_arguments(self, p):
+        p.add_argument("--worker-name", default=None, help="defaults to the hostname, like send_reminders")
+        p.add_argument("--max-age", type=int, default=None,
+                       help="seconds; defaults to two tick intervals plus REMINDER_CLAIM_LEASE_SECONDS")
+
+    def handle(self, *args, **opt):
+        name = opt["worker_name"] or socket.gethostname()
+        hb = WorkerHeartbeat.objects.filter(name=name).first()
+        if hb is None:
+            raise CommandError(f"no heartbeat from worker {name!r}")
+        age = timedelta(seconds=opt["max_age"]) if opt["max_age"] is not None else None
+        now = timezone.now()
+        if not worker.is_alive(hb, now, age):
+            raise CommandError(f"worker {name!r} is {hb.state}, last beat {int((now - hb.beat_at).total_seconds())}s ago")
+        self.stdout.write(f"worker {name!r} {hb.state}: pid {hb.pid}, {hb.ticks} tick(s), "
+                          f"last beat {int((now - hb.beat_at).total_seconds())}s ago")
@@ -0,0 +1,178 @@
+# core/middleware.py
+import json
+import logging
+import os
+import time
+from contextlib import ExitStack
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from . import instrumentation
+from .db import PRIMARY, is_pinned, pin_on_write, pin_primary, reset_pin
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+request_log = logging.getLogger("uniplan.requests")
+slow_log = logging.getLogger("uniplan.slow")
+
+
+PIN_COOKIE = "uniplan_dbpin"
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Read-your-writes for the replica router: a client that wrote recently,
+    or is writing now, keeps reading from the primary.
+
+    "Recently" travels with the client as a signed cookie valid for
+    DB_REPLICA_STICKY_SECONDS, so it holds whichever worker or process
+    serves the next request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if "replica" not in settings.DATABASES:
+            return self.get_response(request)
+
+        writing = request.method not in SAFE_METHODS
+        sticky = request.get_signed_cookie(PIN_COOKIE, default=None, salt="uniplan.dbpin",
+                                           max_age=settings.DB_REPLICA_STICKY_SECONDS) is not None
+        token = pin_primary(writing or sticky)
+        try:
+            with connections[PRIMARY].execute_wrapper(pin_on_write):
+                response = self.get_response(request)
+            if writing or (not sticky and is_pinned()):  # this request wrote: (re)start the window
+                response.set_signed_cookie(PIN_COOKIE, "1", salt="uniplan.dbpin",
+                                           max_age=settings.DB_REPLICA_STICKY_SECONDS,
+                                           httponly=True, samesite="Lax")
+            return response
+        finally:
+            reset_pin(token)
+
+
+class RequestMetricsMiddleware:
+    """
+    Query count, SQL time, slowest statements and Google API time per
+    request, as a Server-Timing header plus a JSON log line on
+    "uniplan.requests". Requests over SLOW_REQUEST_MS also go to
+    "uniplan.slow" with their SQL. Disabled unless REQUEST_METRICS is on,
+    in which case Django drops the middleware from the chain entirely.
+
+    A streamed body (the .ics feed, /api/export) is produced while it is
+    sent, after the headers: its Server-Timing covers the time until the
+    body starts, and the log line is written once the body is done, with
+    the body's queries and time included. Async iterators are not timed.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics, token = instrumentation.start()
+        t0 = time.perf_counter()
+        try:
+            with _timing_sql():
+                response = self.get_response(request)
+        finally:
+            instrumentation.stop(token)
+        total_ms = (time.perf_counter() - t0) * 1000
+
+        google_ms = metrics.spans.get("google", 0.0)
+        app_ms = max(total_ms - metrics.sql_ms - google_ms, 0.0)
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={metrics.sql_ms:.1f};desc="{metrics.queries} queries"',
+            f"google;dur={google_ms:.1f}",
+            f"app;dur={app_ms:.1f}",
+            f"total;dur={total_ms:.1f}",
+        ])
+        if response.streaming and not response.is_async:
+            response.streaming_content = self._timed_body(response.streaming_content, request, response,
+                                                          metrics, t0)
+        else:
+            self._log(request, response, metrics, total_ms)
+        return response
+
+    def _timed_body(self, content, request, response, metrics, t0):
+        try:
+            while True:
+                token = instrumentation.resume(metrics)
+                try:
+                    with _timing_sql():
+                        chunk = next(content, None)
+                finally:
+                    instrumentation.stop(token)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            self._log(request, response, metrics, (time.perf_counter() - t0) * 1000)
+
+    def _log(self, request, response, metrics, total_ms):
+        match = getattr(request, "resolver_match", None)
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            "total_ms": round(total_ms, 1),
+            "db_ms": round(metrics.sql_ms, 1),
+            "queries": metrics.queries,
+            "google_ms": round(metrics.spans.get("google", 0.0), 1),
+            "slowest": [{"ms": round(ms, 1), "sql": sql[:300]} for ms, sql in metrics.slowest()],
+        }
+        request_log.info(json.dumps(record))
+        if total_ms >= settings.SLOW_REQUEST_MS:
+            record["sql"] = [{"ms": round(ms, 2), "sql": sql} for ms, sql in metrics.statements]
+            slow_log.warning(json.dumps(record))
+
+
+def _timing_sql():
+    stack = ExitStack()
+    for conn in connections.all():
+        stack.enter_context(conn.execute_wrapper(instrumentation.sql_timer))
+    return stack
+
+
+def _is_staff(request):
+    """Authenticate the way the API views do (bearer token, session, basic), without raising."""
+    from rest_framework.exceptions import APIException
+    from rest_framework.request import Request
+    from rest_framework.settings import api_settings
+
+    drf_request = Request(request, authenticators=[cls() for cls in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    try:
+        return drf_request.user.is_staff
+    except APIException:  # bad token, or a session POST failing CSRF
+        return False
+
+
+class ProfilingMiddleware:
+    """
+    Profiles a single request when a staff user asks for it with an
+    "X-Profile: sample|cprofile" header or a ?profile= query flag, writing
+    the result to PROFILE_DIR tagged with the view name (file name returned
+    in X-Profile-File). Any other request only pays for the flag lookup;
+    with PROFILE_DIR unset Django drops the middleware from the chain.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILE_DIR:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = request.META.get("HTTP_X_PROFILE") or request.GET.get("profile")
+        if not mode or not _is_staff(request):
+            return self.get_response(request)
+
+        from . import profiling
+        with profiling.profile("cprofile" if mode == "cprofile" else "sample", settings.PROFILE_DIR) as run:
+            response = self.get_response(request)
+            match = getattr(request, "resolver_match", None)
+            run.tag = match.view_name if match else request.path
+        response["X-Profile-File"] = os.path.basename(run.path)
+        return response
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_remove_reminder_uq_reminder_task_days_before_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='reminder_days_before',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+    ]
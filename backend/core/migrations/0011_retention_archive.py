@@ -0,0 +1,57 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:01
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_notifications'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedReminder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('task_id', models.BigIntegerField()),
+                ('channel', models.CharField(choices=[('email', 'Email'), ('in_app', 'In-app')], max_length=20)),
+                ('notify_at', models.DateTimeField()),
+                ('delivered_at', models.DateTimeField(blank=True, null=True)),
+                ('status', models.CharField(blank=True, max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_reminders', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'notify_at'], name='core_archiv_user_id_2f4fb7_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedTask',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('subject_id', models.BigIntegerField(blank=True, null=True)),
+                ('title', models.CharField(max_length=240)),
+                ('description', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('NOT_STARTED', 'Not started'), ('IN_PROCESS', 'In process'), ('COMPLETED', 'Completed')], max_length=20)),
+                ('priority', models.CharField(choices=[('low', 'Low'), ('normal', 'Normal'), ('high', 'High')], max_length=20)),
+                ('due_at', models.DateTimeField(blank=True, null=True)),
+                ('rrule', models.CharField(blank=True, max_length=400)),
+                ('source', models.CharField(blank=True, max_length=40)),
+                ('external_id', models.CharField(blank=True, max_length=120)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_tasks', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'completed_at'], name='core_archiv_user_id_64a17f_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_retention_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='source_deleted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
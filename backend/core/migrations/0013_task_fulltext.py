@@ -0,0 +1,23 @@
+from django.db import migrations
+
+
+# FULLTEXT is MySQL-only; other backends use the in-process index in core/services/search.py
+def add_fulltext(apps, schema_editor):
+    if schema_editor.connection.vendor == "mysql":
+        schema_editor.execute("CREATE FULLTEXT INDEX ft_task_title_description ON core_task (title, description)")
+
+
+def drop_fulltext(apps, schema_editor):
+    if schema_editor.connection.vendor == "mysql":
+        schema_editor.execute("DROP INDEX ft_task_title_description ON core_task")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_task_source_deleted_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_fulltext, drop_fulltext),
+    ]
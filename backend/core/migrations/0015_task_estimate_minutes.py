@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_task_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='estimate_minutes',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+    ]
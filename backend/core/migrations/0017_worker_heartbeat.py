@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_idempotency_records'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkerHeartbeat',
+            fields=[
+                ('name', models.CharField(max_length=120, primary_key=True, serialize=False)),
+                ('pid', models.IntegerField()),
+                ('state', models.CharField(max_length=20)),
+                ('interval_seconds', models.IntegerField()),
+                ('started_at', models.DateTimeField()),
+                ('beat_at', models.DateTimeField()),
+                ('ticks', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from rest_framework.utils.encoders import JSONEncoder as APIJSONEncoder
 from django.utils import timezone
 
 class GoogleAccount(models.Model):
@@ -53,6 +54,7 @@ class Subject(models.Model):
         constraints = [
             models.UniqueConstraint(fields=["user", "code"], name="uq_subject_user_code")
         ]
+        indexes = [models.Index(fields=["user", "updated_at"], name="idx_subject_user_updated")]
         ordering = ["name"]
 
 class TimetableEntry(models.Model):
@@ -70,6 +72,7 @@ class TimetableEntry(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=["user", "day_of_week", "start_time"]),
+            models.Index(fields=["user", "updated_at"], name="idx_timetable_user_updated"),
         ]
 
 class Task(models.Model):
@@ -81,8 +84,11 @@ class Task(models.Model):
     priority = models.CharField(max_length=20, choices=Priority.choices, default=Priority.NORMAL)
     due_at = models.DateTimeField(null=True, blank=True)
     rrule = models.CharField(max_length=400, blank=True)  # recurrence rule (text)
+    reminder_days_before = models.PositiveSmallIntegerField(null=True, blank=True)  # email offset, reapplied per occurrence
+    estimate_minutes = models.PositiveSmallIntegerField(null=True, blank=True)  # study time the planner books; default by priority
     source = models.CharField(max_length=40, blank=True)  # manual, classroom_import, etc.
     external_id = models.CharField(max_length=120, blank=True)
+    source_deleted_at = models.DateTimeField(null=True, blank=True)  # set when the Classroom coursework disappeared
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     completed_at = models.DateTimeField(null=True, blank=True)
@@ -91,6 +97,8 @@ class Task(models.Model):
         indexes = [
             models.Index(fields=["user", "due_at"]),
             models.Index(fields=["subject", "due_at"], name="idx_tasks_subject_due"),
+            models.Index(fields=["user", "updated_at"], name="idx_tasks_user_updated"),
+            models.Index(fields=["due_at"], name="idx_tasks_due"),  # stats roll: due dates crossing a window
         ]
         constraints = [
             models.UniqueConstraint(fields=["user", "source", "external_id"], name="uq_task_user_source_extid")
@@ -101,11 +109,15 @@ class Reminder(models.Model):
     channel = models.CharField(max_length=20, choices=ReminderChannel.choices, default=ReminderChannel.EMAIL)
     notify_at = models.DateTimeField()
     delivered_at = models.DateTimeField(null=True, blank=True)
-    status = models.CharField(max_length=20, blank=True)  # pending, sent, failed
+    status = models.CharField(max_length=20, blank=True)  # pending, sending (claimed by a worker), sent, failed
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        indexes = [models.Index(fields=["notify_at", "status"])]
+        indexes = [
+            models.Index(fields=["notify_at", "status"]),
+            models.Index(fields=["updated_at"], name="idx_reminder_updated"),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=["task", "channel", "notify_at"],
@@ -113,6 +125,150 @@ class Reminder(models.Model):
             )
         ]
 
+class Notification(models.Model):
+    """In-app inbox entry (e.g. a delivered in_app Reminder)."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="notifications")
+    reminder = models.ForeignKey(Reminder, null=True, blank=True, on_delete=models.SET_NULL, related_name="notifications")
+    title = models.CharField(max_length=240)
+    body = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    read_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["user", "read_at"])]
+        ordering = ["-id"]
+
+    def __str__(self): return self.title
+
+class NotificationCounter(models.Model):
+    """Unread badge count, maintained alongside Notification writes."""
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True,
+                                related_name="notification_counter")
+    unread = models.PositiveIntegerField(default=0)
+
+class TaskCounter(models.Model):
+    """
+    Dashboard task counts per (user, subject), maintained incrementally by
+    core/services/task_stats.py. overdue / due_week count open tasks as of
+    TaskCounterClock.rolled_at.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="task_counters")
+    subject_id = models.BigIntegerField(default=0)  # 0 = no subject (a NULL would slip past the unique key)
+    not_started = models.IntegerField(default=0)
+    in_process = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+    overdue = models.IntegerField(default=0)
+    due_week = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["user", "subject_id"], name="uq_taskcounter_user_subject")]
+
+class TaskCounterClock(models.Model):
+    """Single row: the instant every TaskCounter's overdue / due_week is current as of."""
+    rolled_at = models.DateTimeField()
+
+class CacheGeneration(models.Model):
+    """
+    Per-user cache generation (core/services/generations.py). Kept in the
+    database so a bump from any process (web, reminder worker, management
+    commands) retires every process's cached entries.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="cache_generations")
+    namespace = models.CharField(max_length=40)
+    value = models.BigIntegerField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["user", "namespace"], name="uq_cachegeneration_user_namespace")]
+
+class WorkerHeartbeat(models.Model):
+    """One row per send_reminders worker, updated every tick (core/services/worker.py)."""
+    name = models.CharField(max_length=120, primary_key=True)  # --worker-name, the hostname by default
+    pid = models.IntegerField()
+    state = models.CharField(max_length=20)  # running, draining, stopped
+    interval_seconds = models.IntegerField()
+    started_at = models.DateTimeField()
+    beat_at = models.DateTimeField()
+    ticks = models.PositiveIntegerField(default=0)
+
+    def __str__(self): return f"{self.name} ({self.state})"
+
+class IdempotencyRecord(models.Model):
+    """First response to a POST carrying an Idempotency-Key; retries get it back (core/idempotency.py)."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="idempotency_records")
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)  # sha256 of method, path and body
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    body = models.JSONField(null=True, blank=True, encoder=APIJSONEncoder)  # as the API renders it
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["user", "key"], name="uq_idempotency_user_key")]
+        indexes = [models.Index(fields=["expires_at"])]
+
+class CalendarFeedKey(models.Model):
+    """Secret in the user's .ics feed link; rotating it revokes every link handed out before."""
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True,
+                                related_name="calendar_feed_key")
+    secret = models.CharField(max_length=64)
+    rotated_at = models.DateTimeField(default=timezone.now)
+
+class Tombstone(models.Model):
+    """Marks a hard-deleted row so /api/sync can tell clients to drop it."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="tombstones")
+    model = models.CharField(max_length=40)  # subject, timetableentry, task, reminder
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=["user", "deleted_at"])]
+
+    def __str__(self): return f"{self.model}:{self.object_id}"
+
+# ---------- Archive (core/services/retention.py) ----------
+# Same columns as the live rows (retention copies every concrete field of
+# Task / Reminder by name), keeping their original ids; nothing reads these
+# on the request path, so they carry only the indexes retention needs.
+class ArchivedTask(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="archived_tasks")
+    subject_id = models.BigIntegerField(null=True, blank=True)
+    title = models.CharField(max_length=240)
+    description = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=TaskStatus.choices)
+    priority = models.CharField(max_length=20, choices=Priority.choices)
+    due_at = models.DateTimeField(null=True, blank=True)
+    rrule = models.CharField(max_length=400, blank=True)
+    reminder_days_before = models.PositiveSmallIntegerField(null=True, blank=True)
+    estimate_minutes = models.PositiveSmallIntegerField(null=True, blank=True)
+    source = models.CharField(max_length=40, blank=True)
+    external_id = models.CharField(max_length=120, blank=True)
+    source_deleted_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    completed_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=["user", "completed_at"])]
+
+    def __str__(self): return self.title
+
+class ArchivedReminder(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="archived_reminders")
+    task_id = models.BigIntegerField()  # live or archived task
+    channel = models.CharField(max_length=20, choices=ReminderChannel.choices)
+    notify_at = models.DateTimeField()
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    status = models.CharField(max_length=20, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField(null=True, blank=True)  # NULL for rows archived before it was copied
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=["user", "notify_at"])]
+
 class OAuthAccount(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="oauth_accounts")
     provider = models.CharField(max_length=40)                      # e.g., "google"
@@ -0,0 +1,96 @@
+# core/profiling.py
+"""
+On-demand profiling of one request (ProfilingMiddleware) or of
+send_reminders ticks (--profile).
+
+"sample" mode polls the profiled thread's stack from a helper thread every
+PROFILE_INTERVAL_MS and writes the counts as folded stacks
+("frame;frame;frame count" per line), which flamegraph.pl, speedscope and
+inferno read directly. "cprofile" mode runs the deterministic profiler and
+writes a .prof file (pstats; snakeviz, flameprof). Nothing here is imported
+or run unless profiling was asked for.
+"""
+import cProfile
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from django.conf import settings
+
+MODES = ("sample", "cprofile")
+
+
+class Sampler:
+    """Samples the calling thread's Python stack every `interval` seconds."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks = Counter()
+
+    def __enter__(self):
+        self._target = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="uniplan-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                path = code.co_filename.replace(os.sep, "/").rsplit("/", 2)
+                stack.append(f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def write(self, path):
+        with open(path, "w") as fh:
+            for stack, count in self.stacks.most_common():
+                fh.write(f"{stack} {count}\n")
+
+
+def _filename(directory, tag, suffix):
+    os.makedirs(directory, exist_ok=True)
+    tag = re.sub(r"[^\w.-]+", "_", tag or "unknown").strip("_")
+    return os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{tag}-{uuid.uuid4().hex[:6]}.{suffix}")
+
+
+class Run:
+    """What profile() yields: set `tag` inside the block (e.g. the view name); `path` is filled in on exit."""
+    tag = None
+    path = None
+
+
+@contextmanager
+def profile(mode: str, directory: str, tag: str = None):
+    """Profile the block in `mode` ("sample" or "cprofile") and write the result under `directory`."""
+    run = Run()
+    run.tag = tag
+    if mode == "cprofile":
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            yield run
+        finally:
+            prof.disable()
+            run.path = _filename(directory, run.tag, "prof")
+            prof.dump_stats(run.path)
+    else:
+        sampler = Sampler(settings.PROFILE_INTERVAL_MS / 1000)
+        try:
+            with sampler:
+                yield run
+        finally:
+            run.path = _filename(directory, run.tag, "folded")
+            sampler.write(run.path)
@@ -2,10 +2,11 @@ from rest_framework import serializers
 from django.utils import timezone
 from .models import (
     Subject, TimetableEntry, Task, Reminder, ClassroomCourse,
-    ClassroomAssignment, OAuthAccount, ReminderChannel
+    ClassroomAssignment, OAuthAccount, ReminderChannel, Notification
 )
 import re
 from core.services.reminders import upsert_email_reminder
+from core.services.recurrence import parse_rrule
 from datetime import timedelta
 
 HEX_RE = re.compile(r"^#[0-9A-Fa-f]{6}$")
@@ -79,13 +80,30 @@ class TaskSerializer(serializers.ModelSerializer):
             "status", "priority", "due_at", "rrule", "source",
             "external_id", "created_at", "updated_at", "completed_at",
             # new:
-            "reminder_days_before", "next_reminder_at",
+            "reminder_days_before", "next_reminder_at", "source_deleted_at", "estimate_minutes",
         ]
-        read_only_fields = ["user", "created_at", "updated_at", "completed_at"]
+        read_only_fields = ["user", "created_at", "updated_at", "completed_at", "source_deleted_at"]
+
+    def validate(self, attrs):
+        inst = getattr(self, "instance", None)
+        rrule = attrs.get("rrule", inst.rrule if inst else "")
+        due_at = attrs.get("due_at", inst.due_at if inst else None)
+        if rrule:
+            if not due_at:
+                raise serializers.ValidationError({"rrule": "A recurring task needs due_at (its first occurrence)."})
+            try:
+                parse_rrule(rrule, due_at)
+            except ValueError as e:
+                raise serializers.ValidationError({"rrule": str(e)})
+        return attrs
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
-        # surface the “next” pending email reminder (if any)
+        # surface the “next” pending email reminder (if any); TaskViewSet annotates it,
+        # freshly created/updated instances fall back to one query
+        if hasattr(instance, "next_reminder_at"):
+            data["next_reminder_at"] = instance.next_reminder_at
+            return data
         r = (instance.reminders
              .filter(channel=ReminderChannel.EMAIL, delivered_at__isnull=True, status="pending")
              .order_by("notify_at").first())
@@ -102,6 +120,7 @@ class TaskSerializer(serializers.ModelSerializer):
         days = validated.pop("reminder_days_before", None)
         task = super().update(instance, validated)
         upsert_email_reminder(task, days)
+        task.__dict__.pop("next_reminder_at", None)  # annotation from get_object() is stale now
         return task
 
 class ReminderSerializer(serializers.ModelSerializer):
@@ -159,6 +178,12 @@ class ClassroomAssignmentSerializer(serializers.ModelSerializer):
         model = ClassroomAssignment
         fields = "__all__"
 
+class NotificationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Notification
+        fields = ["id", "reminder", "title", "body", "created_at", "read_at"]
+        read_only_fields = fields
+
 class OAuthAccountSerializer(serializers.ModelSerializer):
     refresh_token = serializers.CharField(write_only=True, required=False, allow_blank=True)
 
@@ -222,7 +247,7 @@ class ReminderIntakeSerializer(serializers.Serializer):
             task.description = (desc + ("\n" if desc else "") + "\n".join(extra)).strip()
             dirty = True
         if dirty:
-            task.save(update_fields=["title", "due_at", "description"])
+            task.save(update_fields=["title", "due_at", "description", "updated_at"])
 
         # 2) (optional) derive offset for your own use (not saved on Task)
         offset = validated.get("offsetDays")
@@ -0,0 +1,151 @@
+from datetime import date, datetime, timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from core.models import TimetableEntry, Task
+from core.services.generations import get_generation
+from core.services.recurrence import iter_occurrences
+
+WEEK = timedelta(days=7)
+
+
+def day_of_week(d: date) -> int:
+    """DayOfWeek value for a date (0=Sun ... 6=Sat); Python's weekday() is Mon=0."""
+    return (d.weekday() + 1) % 7
+
+
+def week_start(d: date) -> date:
+    """Sunday that opens the week containing d (weeks follow DayOfWeek, Sun first)."""
+    return d - timedelta(days=day_of_week(d))
+
+
+def weekly_dates(day: int, start: date, end: date, effective_from=None, effective_to=None):
+    """
+    Every date in [start, end] falling on `day`, clipped to the effective window.
+    The count is computed up front, so this is one step per week, never per day.
+    """
+    lo = max(start, effective_from) if effective_from else start
+    hi = min(end, effective_to) if effective_to else end
+    if lo > hi:
+        return []
+    first = lo + timedelta(days=(day - day_of_week(lo)) % 7)
+    if first > hi:
+        return []
+    n = (hi - first).days // 7 + 1
+    return [first + WEEK * i for i in range(n)]
+
+
+def _aware(d: date, t):
+    return timezone.make_aware(datetime.combine(d, t), timezone.get_current_timezone())
+
+
+def _expand_classes(user_id: int, start: date, end: date):
+    entries = (TimetableEntry.objects
+               .filter(user_id=user_id)
+               .filter(Q(effective_from__isnull=True) | Q(effective_from__lte=end))
+               .filter(Q(effective_to__isnull=True) | Q(effective_to__gte=start))
+               .values("id", "subject_id", "day_of_week", "start_time", "end_time", "room",
+                       "effective_from", "effective_to",
+                       "subject__name", "subject__code", "subject__color_hex", "subject__location"))
+    out = []
+    for e in entries:
+        for d in weekly_dates(e["day_of_week"], start, end, e["effective_from"], e["effective_to"]):
+            out.append({
+                "kind": "class",
+                "id": f"class:{e['id']}:{d.isoformat()}",
+                "entry": e["id"],
+                "task": None,
+                "subject": e["subject_id"],
+                "title": e["subject__name"],
+                "code": e["subject__code"],
+                "color_hex": e["subject__color_hex"],
+                "room": e["room"] or e["subject__location"],
+                "date": d.isoformat(),
+                "start": _aware(d, e["start_time"]).isoformat(),
+                "end": _aware(d, e["end_time"]).isoformat(),
+                "status": None,
+                "priority": None,
+            })
+    return out
+
+
+def _task_occurrence(t, due, recurring: bool):
+    due = timezone.localtime(due)
+    return {
+        "kind": "task",
+        "id": f"task:{t['id']}:{due.date().isoformat()}" if recurring else f"task:{t['id']}",
+        "entry": None,
+        "task": t["id"],
+        "subject": t["subject_id"],
+        "title": t["title"],
+        "code": t["subject__code"],
+        "color_hex": t["subject__color_hex"],
+        "room": "",
+        "date": due.date().isoformat(),
+        "start": due.isoformat(),
+        "end": due.isoformat(),
+        "status": t["status"],
+        "priority": t["priority"],
+    }
+
+
+def _expand_tasks(user_id: int, start: date, end: date):
+    tz = timezone.get_current_timezone()
+    lo = timezone.make_aware(datetime.combine(start, datetime.min.time()), tz)
+    hi = timezone.make_aware(datetime.combine(end + timedelta(days=1), datetime.min.time()), tz)
+    tasks = (Task.objects
+             .filter(user_id=user_id, due_at__lt=hi)
+             .filter(Q(due_at__gte=lo) | ~Q(rrule=""))
+             .values("id", "subject_id", "title", "status", "priority", "due_at", "rrule", "updated_at",
+                     "subject__code", "subject__color_hex"))
+    out = []
+    for t in tasks:
+        if not t["rrule"]:
+            out.append(_task_occurrence(t, t["due_at"], False))
+            continue
+        try:
+            occs = list(iter_occurrences(t["id"], t["updated_at"], t["rrule"], t["due_at"],
+                                         lo, hi - timedelta(microseconds=1)))
+        except ValueError:
+            occs = [t["due_at"]] if t["due_at"] >= lo else []
+        out.extend(_task_occurrence(t, due, True) for due in occs)
+    return out
+
+
+def _week_key(user_id: int, gen: int, ws: date) -> str:
+    return f"calendar:{user_id}:{gen}:{ws.isoformat()}"
+
+
+def calendar_occurrences(user_id: int, start: date, end: date):
+    """
+    Concrete class + task occurrences for [start, end], sorted by start time.
+    Expanded weeks are cached per user; any timetable/subject/task write bumps
+    the user's "calendar" generation, which retires every cached week at once.
+    """
+    gen = get_generation("calendar", user_id)
+    weeks = weekly_dates(0, week_start(start), end)
+    keys = {ws: _week_key(user_id, gen, ws) for ws in weeks}
+    cached = cache.get_many(keys.values())
+
+    missing = [ws for ws in weeks if keys[ws] not in cached]
+    if missing:
+        # one pass over the contiguous span covering all missing weeks
+        lo, hi = missing[0], missing[-1] + timedelta(days=6)
+        buckets = {ws: [] for ws in missing}
+        for occ in _expand_classes(user_id, lo, hi) + _expand_tasks(user_id, lo, hi):
+            bucket = buckets.get(week_start(date.fromisoformat(occ["date"])))
+            if bucket is not None:
+                bucket.append(occ)
+        for bucket in buckets.values():
+            bucket.sort(key=lambda o: (o["date"], o["start"], o["kind"]))
+        cache.set_many({keys[ws]: buckets[ws] for ws in missing}, timeout=settings.CALENDAR_CACHE_TTL)
+        cached.update({keys[ws]: buckets[ws] for ws in missing})
+
+    lo_iso, hi_iso = start.isoformat(), end.isoformat()
+    return [
+        occ
+        for ws in weeks
+        for occ in cached[keys[ws]]
+        if lo_iso <= occ["date"] <= hi_iso
+    ]
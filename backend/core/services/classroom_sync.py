@@ -0,0 +1,169 @@
+"""
+Reconcile Classroom coursework with the user's source="classroom" tasks.
+
+Tasks created through ReminderIntakeSerializer carry external_id
+"<courseId>:<submissionId>". A pass fetches every submission (any state)
+and coursework of the user's active courses, diffs them against the local
+rows as sets, and writes the result back in a handful of bulk statements:
+moved deadlines and renamed coursework, pending reminders shifted by the
+same amount as their task, and tasks whose coursework vanished flagged
+with source_deleted_at.
+
+The reminder worker also asks, before each delivery batch, which of the
+due tasks were turned in on Classroom (fetch_turned_in) and completes
+them with their pending reminders (complete_turned_in), so no mail goes
+out for work that is already handed in.
+"""
+from datetime import datetime, timezone as dt_timezone
+from django.db import transaction
+from django.db.models import Case, F, When
+from django.utils import timezone
+from core.models import Reminder, Task, TaskStatus
+from core.services import task_stats
+from core.services.generations import bump_generation
+
+SOURCE = "classroom"
+TURNED_IN = ("TURNED_IN", "RETURNED")  # returned work was turned in first
+
+
+def _pages(execute, make_request, key):
+    token = None
+    while True:
+        data = execute(make_request(token))
+        yield from data.get(key, [])
+        token = data.get("nextPageToken")
+        if not token:
+            return
+
+
+def coursework_due(cw):
+    """Classroom dueDate/dueTime are UTC; returns None for undated coursework."""
+    d, t = cw.get("dueDate"), cw.get("dueTime") or {}
+    if not d or not all(d.get(k) for k in ("year", "month", "day")):
+        return None
+    return datetime(d["year"], d["month"], d["day"], t.get("hours", 23), t.get("minutes", 59),
+                    tzinfo=dt_timezone.utc)
+
+
+def fetch_remote(classroom, execute):
+    """
+    {external_id: {"title", "due_at"}} for all my submissions in active
+    courses, plus the set of course ids that were fully read. `execute`
+    runs a request (the views pass their budgeted _google wrapper).
+    """
+    api = classroom.courses()
+    remote, seen_courses = {}, set()
+    for course in _pages(execute, lambda tok: api.list(pageSize=100, courseStates=["ACTIVE"], pageToken=tok),
+                         "courses"):
+        cid = course["id"]
+        work = {cw["id"]: cw for cw in _pages(
+            execute, lambda tok: api.courseWork().list(courseId=cid, pageSize=100, pageToken=tok),
+            "courseWork")}
+        for sub in _pages(
+            execute,
+            lambda tok: api.courseWork().studentSubmissions().list(
+                courseId=cid, courseWorkId="-", pageSize=100, pageToken=tok),
+            "studentSubmissions",
+        ):
+            cw = work.get(sub.get("courseWorkId"))
+            if cw is None:
+                continue
+            remote[f"{cid}:{sub['id']}"] = {"title": (cw.get("title") or "")[:240], "due_at": coursework_due(cw)}
+        seen_courses.add(cid)
+    return remote, seen_courses
+
+
+def fetch_turned_in(classroom, execute, course_ids) -> set:
+    """External ids ("<courseId>:<submissionId>") of my turned-in submissions in these courses."""
+    api = classroom.courses().courseWork().studentSubmissions()
+    out = set()
+    for cid in course_ids:
+        for sub in _pages(
+            execute,
+            lambda tok: api.list(courseId=cid, courseWorkId="-", states=list(TURNED_IN), pageSize=100,
+                                 pageToken=tok),
+            "studentSubmissions",
+        ):
+            out.add(f"{cid}:{sub['id']}")
+    return out
+
+
+def complete_turned_in(tasks, now=None) -> int:
+    """
+    Mark these tasks (loaded Task rows) completed and skip their pending
+    reminders: one UPDATE each, whatever the count. Returns tasks completed.
+    """
+    now = now or timezone.now()
+    tasks = [t for t in tasks if t.status != TaskStatus.COMPLETED]
+    if not tasks:
+        return 0
+    ids = [t.pk for t in tasks]
+    with transaction.atomic():
+        Task.objects.filter(pk__in=ids).update(status=TaskStatus.COMPLETED, completed_at=now, updated_at=now)
+        (Reminder.objects
+         .filter(task_id__in=ids, delivered_at__isnull=True)
+         .update(status="skipped_completed", delivered_at=now, updated_at=now))
+        # bulk UPDATEs skip the counter signals
+        task_stats.record([(task_stats.state(t.user_id, t.subject_id, t.status, t.due_at),
+                            task_stats.state(t.user_id, t.subject_id, TaskStatus.COMPLETED, t.due_at))
+                           for t in tasks])
+    for t in tasks:
+        t.status, t.completed_at = TaskStatus.COMPLETED, now
+    for user_id in {t.user_id for t in tasks}:
+        bump_generation("calendar", user_id)
+    return len(tasks)
+
+
+def reconcile(user_id: int, remote: dict, seen_courses: set, now=None) -> dict:
+    """Apply the diff between `remote` (from fetch_remote) and the local classroom tasks; returns counts."""
+    now = now or timezone.now()
+    local = {row["external_id"]: row for row in (Task.objects
+                                                   .filter(user_id=user_id, source=SOURCE)
+                                                   .values("id", "subject_id", "status", "external_id", "title",
+                                                           "due_at", "source_deleted_at"))}
+    local_keys, remote_keys = local.keys(), remote.keys()
+
+    changed, shifts, moved = [], {}, []
+    for key in local_keys & remote_keys:
+        row, theirs = local[key], remote[key]
+        # coursework without a due date keeps the last one we knew
+        due_at = theirs["due_at"] or row["due_at"]
+        if theirs["title"] == row["title"] and due_at == row["due_at"]:
+            continue
+        if due_at != row["due_at"]:
+            moved.append((task_stats.state(user_id, row["subject_id"], row["status"], row["due_at"]),
+                          task_stats.state(user_id, row["subject_id"], row["status"], due_at)))
+            if row["due_at"]:
+                shifts[row["id"]] = due_at - row["due_at"]
+        changed.append(Task(id=row["id"], title=theirs["title"] or row["title"], due_at=due_at, updated_at=now))
+
+    # only courses we actually read can prove their coursework is gone
+    gone = [local[k]["id"] for k in local_keys - remote_keys
+            if k.split(":", 1)[0] in seen_courses and local[k]["source_deleted_at"] is None]
+    back = [local[k]["id"] for k in local_keys & remote_keys if local[k]["source_deleted_at"] is not None]
+
+    with transaction.atomic():
+        if changed:
+            Task.objects.bulk_update(changed, ["title", "due_at", "updated_at"], batch_size=500)
+            task_stats.record(moved)  # bulk_update skips the counter signals
+        shifted = 0
+        if shifts:
+            # one UPDATE: each pending reminder moves by its own task's delta
+            shifted = (Reminder.objects
+                       .filter(task_id__in=shifts, delivered_at__isnull=True)
+                       .update(notify_at=Case(*[When(task_id=tid, then=F("notify_at") + delta)
+                                                for tid, delta in shifts.items()],
+                                              default=F("notify_at")),
+                               updated_at=now))
+        if gone:
+            Task.objects.filter(pk__in=gone).update(source_deleted_at=now, updated_at=now)
+            (Reminder.objects
+             .filter(task_id__in=gone, delivered_at__isnull=True)
+             .update(status="skipped_deleted", delivered_at=now, updated_at=now))
+        if back:
+            Task.objects.filter(pk__in=back).update(source_deleted_at=None, updated_at=now)
+
+    if changed or gone or back:
+        bump_generation("calendar", user_id)  # bulk writes skip the post_save receiver
+    return {"updated": len(changed), "rescheduled": len(shifts), "reminders_shifted": shifted,
+            "flagged_deleted": len(gone), "restored": len(back)}
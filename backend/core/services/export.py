@@ -0,0 +1,141 @@
+"""
+Whole-account export / import as gzip-compressed JSON Lines.
+
+The first line is a header ({"format", "version", "exported_at", "user"}),
+then one {"model": name, "fields": {...}} line per row, models in MODELS
+order so every foreign key points at a row already restored. Rows keep
+their ids; "user" is left out and becomes whoever the import is for.
+
+Export reads each model with keyset pagination over the pk (MySQL's driver
+buffers a whole result set even for .iterator(), so a server-side cursor
+alone would not keep memory flat) and compresses as it goes: memory is one
+chunk of rows and a zlib window whatever the account's size.
+"""
+import json
+import zlib
+from django.db import connection, transaction
+from django.core.management.color import no_style
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+from core.models import ClassroomAssignment, ClassroomCourse, Reminder, Subject, Task, TimetableEntry
+from core.services import task_stats
+from core.services.generations import bump_generation
+
+FORMAT, VERSION = "uniplan-export", 1
+CHUNK = 1000
+FLUSH_BYTES = 64 * 1024  # compressed output handed to the server at a time
+
+# (name, model, lookup from the row to its owner), parents before children
+MODELS = (
+    ("subject", Subject, "user_id"),
+    ("timetableentry", TimetableEntry, "user_id"),
+    ("task", Task, "user_id"),
+    ("reminder", Reminder, "task__user_id"),
+    ("classroomcourse", ClassroomCourse, "user_id"),
+    ("classroomassignment", ClassroomAssignment, "classroom_course__user_id"),
+)
+BY_NAME = {name: model for name, model, _ in MODELS}
+
+
+def _fields(model):
+    return [f.attname for f in model._meta.concrete_fields if f.name != "user"]
+
+
+def _rows(user_id: int, chunk: int):
+    """(name, row dict) for every row the user owns, one indexed range scan per chunk."""
+    for name, model, owner in MODELS:
+        qs = model.objects.filter(**{owner: user_id}).order_by("pk").values(*_fields(model))
+        last = 0
+        while True:
+            rows = list(qs.filter(pk__gt=last)[:chunk])
+            for row in rows:
+                yield name, row
+            if len(rows) < chunk:
+                break
+            last = rows[-1]["id"]
+
+
+def iter_export(user, chunk: int = CHUNK):
+    """The export as gzip bytes, yielded in pieces of roughly FLUSH_BYTES."""
+    gz = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    encoder = JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    out = [gz.compress(encoder.encode({"format": FORMAT, "version": VERSION, "exported_at": timezone.now(),
+                                       "user": user.email or user.username}).encode() + b"\n")]
+    size = len(out[0])
+    for name, row in _rows(user.pk, chunk):
+        piece = gz.compress(encoder.encode({"model": name, "fields": row}).encode() + b"\n")
+        if piece:
+            out.append(piece)
+            size += len(piece)
+            if size >= FLUSH_BYTES:
+                yield b"".join(out)
+                out, size = [], 0
+    out.append(gz.flush())
+    yield b"".join(out)
+
+
+def _decode(model, fields):
+    # JSON gives strings for dates and times; to_python turns them back
+    by_attname = {f.attname: f for f in model._meta.concrete_fields}
+    return {attname: by_attname[attname].to_python(value) for attname, value in fields.items()}
+
+
+def _insert(model, rows, user_id):
+    """bulk_create one chunk, then put back the timestamps auto_now / auto_now_add overwrote (one UPDATE)."""
+    has_user = any(f.name == "user" for f in model._meta.concrete_fields)
+    model.objects.bulk_create([model(**row, **({"user_id": user_id} if has_user else {})) for row in rows])
+    stamped = [f.attname for f in model._meta.concrete_fields
+               if getattr(f, "auto_now", False) or getattr(f, "auto_now_add", False)]
+    if stamped:
+        model.objects.filter(pk__in=[r["id"] for r in rows]).update(**{
+            field: Case(*[When(pk=r["id"], then=Value(r[field])) for r in rows], default=F(field))
+            for field in stamped
+        })
+
+
+def import_lines(lines, user, chunk: int = CHUNK) -> dict:
+    """
+    Restore an export (an iterable of JSON lines) into `user`, all or nothing;
+    returns rows restored per model. Fails if any id is already taken, so an
+    export goes into a fresh database or back after the account was deleted.
+    """
+    lines = iter(lines)
+    header = json.loads(next(lines, "{}") or "{}")
+    if header.get("format") != FORMAT or header.get("version") != VERSION:
+        raise ValueError(f"not a {FORMAT} v{VERSION} file")
+
+    counts, pending, current = {}, [], None
+
+    def flush():
+        if not pending:
+            return
+        model = BY_NAME[current]
+        taken = list(model.objects.filter(pk__in=[r["id"] for r in pending]).values_list("pk", flat=True)[:5])
+        if taken:
+            raise ValueError(f"{current} id(s) {taken} already exist; import into a database without them")
+        _insert(model, pending, user.pk)
+        counts[current] = counts.get(current, 0) + len(pending)
+        pending.clear()
+
+    with transaction.atomic():
+        for line in lines:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            name = record["model"]
+            if name not in BY_NAME:
+                raise ValueError(f"unknown model {name!r}")
+            if name != current or len(pending) >= chunk:
+                flush()
+                current = name
+            pending.append(_decode(BY_NAME[name], record["fields"]))
+        flush()
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [m for _, m, _ in MODELS]):
+                cursor.execute(sql)  # PostgreSQL: explicit ids don't move the sequences
+
+    # bulk inserts skip the signals: recount the dashboard and retire cached views
+    task_stats.rebuild([user.pk])
+    bump_generation("calendar", user.pk)
+    return counts
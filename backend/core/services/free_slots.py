@@ -0,0 +1,143 @@
+"""
+Free time between timetable classes, from a per-user occupancy bitmap.
+
+A week is 7 x 288 five-minute slots, one bit each, held in a Python int
+(day_of_week d owns bits [d*288, (d+1)*288)). effective_from / effective_to
+only change the week at a few dates, so the timetable compiles to a short
+list of segments, each a date span with one weekly bitmap. The compiled
+list is cached under the user's "calendar" generation, which every
+timetable write bumps.
+
+A query lays the days of the range side by side in one int, masks it to
+the allowed hours and finds free runs with whole-int shifts and ANDs,
+touching Python only once per free run rather than once per slot.
+"""
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from core.models import TimetableEntry
+from core.services.calendar import day_of_week
+from core.services.generations import get_generation
+
+SLOT_MINUTES = 5
+DAY_SLOTS = 24 * 60 // SLOT_MINUTES
+DAY_MASK = (1 << DAY_SLOTS) - 1
+DAY_BYTES = DAY_SLOTS // 8
+
+
+def slot_of(t: time, round_up=False) -> int:
+    minutes = t.hour * 60 + t.minute
+    if round_up:
+        minutes += (t.second > 0 or t.microsecond > 0) + SLOT_MINUTES - 1
+    return minutes // SLOT_MINUTES
+
+
+def span(lo: int, hi: int) -> int:
+    """Bits lo..hi-1 set."""
+    return ((1 << max(hi - lo, 0)) - 1) << lo
+
+
+def _compile(user_id: int):
+    """[(segment start date or None, weekly bitmap)], sorted; a segment runs until the next one starts."""
+    entries = list(TimetableEntry.objects
+                   .filter(user_id=user_id)
+                   .values_list("day_of_week", "start_time", "end_time", "effective_from", "effective_to"))
+    edges = sorted({e[3] for e in entries if e[3]} | {e[4] + timedelta(days=1) for e in entries if e[4]})
+    segments = []
+    for start in [None, *edges]:
+        week = 0
+        for dow, st, et, eff_from, eff_to in entries:
+            # constant over the segment, so testing its first day is enough
+            if eff_from and (start is None or start < eff_from):
+                continue
+            if eff_to and start is not None and start > eff_to:
+                continue
+            week |= span(slot_of(st), min(slot_of(et, round_up=True), DAY_SLOTS)) << (dow * DAY_SLOTS)
+        segments.append((start, week))
+    return segments
+
+
+def weekly_segments(user_id: int):
+    key = f"freeslots:{user_id}:{get_generation('calendar', user_id)}"
+    segments = cache.get(key)
+    if segments is None:
+        segments = _compile(user_id)
+        cache.set(key, segments, timeout=settings.CALENDAR_CACHE_TTL)
+    return segments
+
+
+def occupancy(segments, start: date, days: int) -> int:
+    """Occupancy of `days` consecutive days from `start`, day i in bits [i*288, (i+1)*288)."""
+    starts = [s for s, _ in segments[1:]]
+    chunks = []
+    for i in range(days):
+        d = start + timedelta(days=i)
+        week = segments[bisect_right(starts, d)][1]
+        # 288 bits are exactly 36 bytes, so days concatenate as bytes in linear time
+        chunks.append(((week >> (day_of_week(d) * DAY_SLOTS)) & DAY_MASK).to_bytes(DAY_BYTES, "little"))
+    return int.from_bytes(b"".join(chunks), "little")
+
+
+def run_starts(bits: int, width: int) -> int:
+    """Bits that begin `width` consecutive set bits (shift-and, doubling the width each step)."""
+    have = 1
+    while have < width:
+        step = min(have, width - have)
+        bits &= bits >> step
+        have += step
+    return bits
+
+
+def run_length(bits: int, first: int) -> int:
+    """Number of consecutive set bits from `first` upwards."""
+    gaps = ~bits >> first
+    return (gaps & -gaps).bit_length() - 1
+
+
+def slot_time(start: date, slot: int, tz=None) -> datetime:
+    days, rest = divmod(slot, DAY_SLOTS)
+    minutes = rest * SLOT_MINUTES
+    naive = datetime.combine(start + timedelta(days=days), time(minutes // 60, minutes % 60))
+    return timezone.make_aware(naive, tz or timezone.get_current_timezone())
+
+
+def free_bitmap(user_id: int, start: date, days: int, day_start: time = time(0), day_end: time = None) -> int:
+    """Free slots of `days` days from `start` within day_start..day_end, laid out like occupancy()."""
+    lo, hi = slot_of(day_start, round_up=True), slot_of(day_end) if day_end else DAY_SLOTS
+    window = int.from_bytes(span(lo, hi).to_bytes(DAY_BYTES, "little") * days, "little")
+    return window & ~occupancy(weekly_segments(user_id), start, days)
+
+
+def free_slots(user_id: int, start: date, end: date, min_minutes: int = 30,
+               day_start: time = time(0), day_end: time = None):
+    """
+    Free intervals within [start, end] (inclusive dates) lasting at least
+    min_minutes, limited to day_start..day_end each day (day_end None =
+    midnight; a full-day window lets a free run continue past midnight).
+    """
+    days = (end - start).days + 1
+    if days <= 0:
+        return []
+    free = free_bitmap(user_id, start, days, day_start, day_end)
+    need = max(1, -(-min_minutes // SLOT_MINUTES))
+    runs = run_starts(free, need)
+    if not runs:
+        return []
+
+    tz = timezone.get_current_timezone()
+    out = []
+    begins = free & ~(free << 1)  # first slot of every free run
+    while begins:
+        first = (begins & -begins).bit_length() - 1
+        begins &= begins - 1
+        if not (runs >> first) & 1:
+            continue  # this run is shorter than min_minutes
+        length = run_length(free, first)
+        out.append({
+            "start": slot_time(start, first, tz).isoformat(),
+            "end": slot_time(start, first + length, tz).isoformat(),
+            "minutes": length * SLOT_MINUTES,
+        })
+    return out
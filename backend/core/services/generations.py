@@ -0,0 +1,32 @@
+"""
+Cache generations: keys that embed a user's generation go stale as soon
+as it is bumped, no explicit delete needed.
+
+The counters are CacheGeneration rows rather than cache entries: the
+default cache may be per process (LocMemCache), and a bump made by the
+reminder worker or a management command has to reach every web process.
+Reading one costs a unique-key lookup, bumping it one UPDATE.
+"""
+import time
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from core.models import CacheGeneration
+
+
+def get_generation(namespace: str, user_id: int) -> int:
+    """Current cache generation for (namespace, user); 0 until the first bump."""
+    gen = (CacheGeneration.objects.filter(user_id=user_id, namespace=namespace)
+           .values_list("value", flat=True).first())
+    return gen or 0
+
+
+def bump_generation(namespace: str, user_id: int) -> None:
+    rows = CacheGeneration.objects.filter(user_id=user_id, namespace=namespace)
+    if rows.update(value=F("value") + 1):
+        return
+    try:
+        with transaction.atomic():
+            # seed from the clock so a recreated row never reuses an old value
+            CacheGeneration.objects.create(user_id=user_id, namespace=namespace, value=int(time.time() * 1000))
+    except IntegrityError:  # created concurrently
+        rows.update(value=F("value") + 1)
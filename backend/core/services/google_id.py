@@ -0,0 +1,79 @@
+"""
+Local verification of the ID token Google returns with the OAuth code
+exchange (the "openid" scope), so sign-in needs no userinfo round trip.
+
+Google's signing certificates are kept in process memory for as long as
+their Cache-Control allows. Once a set is within REFRESH_AHEAD of expiring,
+the next verification starts a background refresh and carries on with the
+current keys; only a cold start, an expired set or an unknown key id (a
+rotation this process hasn't seen yet) fetches in the request.
+"""
+import json
+import re
+import threading
+import time
+from django.conf import settings
+from core.instrumentation import span
+
+CERTS_URL = "https://www.googleapis.com/oauth2/v1/certs"
+ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+DEFAULT_MAX_AGE = 3600  # if the response carries no max-age
+REFRESH_AHEAD = 600  # seconds before expiry to start refreshing in the background
+
+_lock = threading.Lock()
+_state = {"certs": {}, "expires": 0.0, "refreshing": False}
+
+
+def _fetch():
+    """({kid: PEM certificate}, lifetime in seconds) from Google."""
+    from google.auth.transport.requests import Request
+
+    resp = Request()(CERTS_URL, method="GET", timeout=10)
+    if resp.status != 200:
+        raise ValueError(f"certificate fetch failed: HTTP {resp.status}")
+    match = re.search(r"max-age=(\d+)", resp.headers.get("cache-control", ""))
+    return json.loads(resp.data), int(match.group(1)) if match else DEFAULT_MAX_AGE
+
+
+def _refresh():
+    certs, max_age = _fetch()
+    with _lock:
+        _state.update(certs=certs, expires=time.monotonic() + max_age, refreshing=False)
+    return certs
+
+
+def _refresh_in_background():
+    def run():
+        try:
+            _refresh()
+        except Exception:
+            with _lock:
+                _state["refreshing"] = False  # the next verification tries again
+
+    threading.Thread(target=run, name="google-certs-refresh", daemon=True).start()
+
+
+def _certs(kid=None):
+    with _lock:
+        certs, left = _state["certs"], _state["expires"] - time.monotonic()
+        usable = left > 0 and (kid is None or kid in certs)
+        background = usable and left < REFRESH_AHEAD and not _state["refreshing"]
+        if background:
+            _state["refreshing"] = True
+    if background:
+        _refresh_in_background()
+    if usable:
+        return certs
+    with span("google"):
+        return _refresh()
+
+
+def verify(token: str) -> dict:
+    """The token's claims once signature, audience, issuer and expiry check out; ValueError otherwise."""
+    from google.auth import jwt
+
+    certs = _certs(jwt.decode_header(token).get("kid"))
+    claims = jwt.decode(token, certs=certs, audience=settings.GOOGLE_CLIENT_ID, clock_skew_in_seconds=30)
+    if claims.get("iss") not in ISSUERS:
+        raise ValueError(f"unexpected issuer {claims.get('iss')!r}")
+    return claims
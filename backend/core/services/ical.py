@@ -0,0 +1,251 @@
+import calendar
+import hashlib
+import secrets
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.utils import timezone
+from core.models import CalendarFeedKey, Subject, TimetableEntry, Task
+from core.services.calendar import weekly_dates
+
+BYDAY = ["SU", "MO", "TU", "WE", "TH", "FR", "SA"]  # indexed by DayOfWeek
+WEEKDAY = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]  # indexed by date.weekday()
+FEED_MODELS = (Subject, TimetableEntry, Task)
+
+
+def feed_secret(user_id: int, rotate: bool = False) -> str:
+    """
+    The secret feed links carry. Rotating it replaces the secret, so every
+    link handed out before stops working.
+    """
+    secret = secrets.token_urlsafe(16)
+    if rotate and CalendarFeedKey.objects.filter(user_id=user_id).update(secret=secret, rotated_at=timezone.now()):
+        return secret
+    key, _ = CalendarFeedKey.objects.get_or_create(user_id=user_id, defaults={"secret": secret})
+    return key.secret
+
+
+def feed_fingerprint(user_id: int, secret: str):
+    """
+    (etag, last_modified) for a user's feed, in a single query: the latest
+    updated_at and the row count of each table the feed is built from (the
+    counts catch deletions, which leave no updated_at behind).
+    Returns None if the user does not exist or `secret` is not their current one.
+    """
+    annotations = {}
+    for model in FEED_MODELS:
+        rows = model.objects.filter(user_id=OuterRef("pk")).order_by().values("user_id")
+        name = model._meta.model_name
+        annotations[f"{name}_max"] = Subquery(rows.annotate(v=Max("updated_at")).values("v"))
+        annotations[f"{name}_count"] = Subquery(rows.annotate(v=Count("pk")).values("v"))
+
+    row = get_user_model().objects.filter(pk=user_id, calendar_feed_key__secret=secret).annotate(**annotations).values(*annotations).first()
+    if row is None:
+        return None
+
+    stamps = [v for k, v in row.items() if k.endswith("_max") and v is not None]
+    last_modified = max(stamps) if stamps else None
+    raw = "|".join(f"{k}={row[k].isoformat() if hasattr(row[k], 'isoformat') else row[k]}" for k in sorted(row))
+    etag = '"%s"' % hashlib.sha1(raw.encode()).hexdigest()
+    return etag, last_modified
+
+
+# ---- RFC 5545 formatting ----
+def _escape(text: str) -> str:
+    return (text or "").replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n")
+
+
+def _fold(line: str) -> str:
+    # content lines are limited to 75 octets; continuation lines start with a space
+    raw = line.encode("utf-8")
+    if len(raw) <= 75:
+        return line + "\r\n"
+    parts, limit = [], 75
+    while raw:
+        cut = min(limit, len(raw))
+        while cut < len(raw) and (raw[cut] & 0xC0) == 0x80:  # never split a UTF-8 sequence
+            cut -= 1
+        parts.append(raw[:cut].decode("utf-8"))
+        raw, limit = raw[cut:], 74
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _utc(dt: datetime) -> str:
+    return dt.astimezone(dt_timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _local(dt: datetime) -> str:
+    return dt.strftime("%Y%m%dT%H%M%S")
+
+
+def _wall(prop: str, dt: datetime, tzid: str) -> str:
+    # wall-clock time in the server zone, so weekly classes keep their hour across DST
+    if tzid == "UTC":
+        return f"{prop}:{_local(dt)}Z"
+    return f"{prop};TZID={tzid}:{_local(dt)}"
+
+
+def _offset(delta: timedelta) -> str:
+    seconds = int(delta.total_seconds())
+    sign, seconds = ("-" if seconds < 0 else "+"), abs(seconds)
+    hours, minutes, rest = seconds // 3600, seconds // 60 % 60, seconds % 60
+    return f"{sign}{hours:02d}{minutes:02d}" + (f"{rest:02d}" if rest else "")
+
+
+def _transitions(tz, first_year: int, last_year: int):
+    """(local wall time just before, offset before, offset after, is DST after, name after) per offset change."""
+    out = []
+    t = int(datetime(first_year, 1, 1, tzinfo=dt_timezone.utc).timestamp())
+    stop = int(datetime(last_year + 1, 1, 1, tzinfo=dt_timezone.utc).timestamp())
+    offset = lambda ts: datetime.fromtimestamp(ts, tz).utcoffset()
+    before = offset(t)
+    while t < stop:
+        nxt = t + 86400
+        if offset(nxt) != before:
+            lo, hi = t, nxt  # bisect to the second
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                lo, hi = (mid, hi) if offset(mid) == before else (lo, mid)
+            local = datetime.fromtimestamp(hi, tz)
+            wall = datetime.fromtimestamp(hi, dt_timezone.utc).replace(tzinfo=None) + before
+            out.append((wall, before, local.utcoffset(), bool(local.dst()), local.tzname()))
+            before = local.utcoffset()
+        t = nxt
+    return out
+
+
+def _byday(wall: datetime) -> set:
+    """BYDAY values ("2SU", "-1SU") that put a yearly rule on this date."""
+    nth = (wall.day - 1) // 7 + 1
+    days = {f"{nth}{WEEKDAY[wall.weekday()]}"}
+    if wall.day + 7 > calendar.monthrange(wall.year, wall.month)[1]:
+        days.add(f"-1{WEEKDAY[wall.weekday()]}")
+    return days
+
+
+def _vtimezone(tzid: str, now: datetime):
+    """
+    VTIMEZONE for the server zone, from its transitions around now: one
+    yearly RRULE per kind when the changes follow one (as DST rules do),
+    else each change listed, so clients place TZID times exactly as the
+    server expands them.
+    """
+    tz = timezone.get_current_timezone()
+    changes = _transitions(tz, now.year - 1, now.year + 3)
+    if not changes:
+        local = now.astimezone(tz)
+        return ["BEGIN:VTIMEZONE", f"TZID:{tzid}", "BEGIN:STANDARD", "DTSTART:19700101T000000",
+                f"TZOFFSETFROM:{_offset(local.utcoffset())}", f"TZOFFSETTO:{_offset(local.utcoffset())}",
+                f"TZNAME:{local.tzname()}", "END:STANDARD", "END:VTIMEZONE"]
+
+    lines = ["BEGIN:VTIMEZONE", f"TZID:{tzid}"]
+    for dst in (True, False):
+        kind = "DAYLIGHT" if dst else "STANDARD"
+        group = [c for c in changes if c[3] is dst]
+        if not group:
+            continue
+        shape = {(w.month, w.time(), before, after, name) for w, before, after, _, name in group}
+        days = set.intersection(*(_byday(c[0]) for c in group))
+        rule = None
+        if len(shape) == 1 and days:
+            rule = f"RRULE:FREQ=YEARLY;BYMONTH={group[0][0].month};BYDAY={min(days)}"  # "-1SU" before "4SU"
+            group = group[:1]
+        for wall, before, after, _, name in group:
+            lines += [f"BEGIN:{kind}", f"DTSTART:{_local(wall)}", f"TZOFFSETFROM:{_offset(before)}",
+                      f"TZOFFSETTO:{_offset(after)}", f"TZNAME:{name}", *([rule] if rule else []), f"END:{kind}"]
+    return lines + ["END:VTIMEZONE"]
+
+
+def _event(lines) -> bytes:
+    return "".join(_fold(line) for line in ["BEGIN:VEVENT", *lines, "END:VEVENT"]).encode("utf-8")
+
+
+def _class_event(e, tzid: str, now: datetime):
+    anchor = e["effective_from"] or timezone.localtime(e["created_at"]).date()
+    first = weekly_dates(e["day_of_week"], anchor, anchor + timedelta(days=6))[0]
+    if e["effective_to"] and first > e["effective_to"]:
+        return None
+
+    title = f"{e['subject__code']} {e['subject__name']}".strip()
+    lines = [
+        f"UID:class-{e['id']}@uniplan",
+        f"DTSTAMP:{_utc(e['updated_at'] or now)}",
+        _wall("DTSTART", datetime.combine(first, e["start_time"]), tzid),
+        _wall("DTEND", datetime.combine(first, e["end_time"]), tzid),
+    ]
+    rule = f"RRULE:FREQ=WEEKLY;BYDAY={BYDAY[e['day_of_week']]}"
+    if e["effective_to"]:
+        last = timezone.make_aware(datetime.combine(e["effective_to"], time.max), timezone.get_current_timezone())
+        rule += f";UNTIL={_utc(last)}"
+    lines.append(rule)
+    lines.append(f"SUMMARY:{_escape(title)}")
+    location = e["room"] or e["subject__location"]
+    if location:
+        lines.append(f"LOCATION:{_escape(location)}")
+    if e["subject__teacher_name"]:
+        lines.append(f"DESCRIPTION:{_escape(e['subject__teacher_name'])}")
+    return _event(lines)
+
+
+def _task_event(t, tzid: str, now: datetime):
+    # wall clock like the server's expansion (services/recurrence.py), so a recurring task keeps its hour across DST
+    due = timezone.localtime(t["due_at"])
+    lines = [
+        f"UID:task-{t['id']}@uniplan",
+        f"DTSTAMP:{_utc(t['updated_at'] or now)}",
+        _wall("DTSTART", due, tzid),
+        _wall("DTEND", due, tzid),
+    ]
+    for rule_line in (t["rrule"] or "").splitlines():
+        rule_line = rule_line.strip()
+        if rule_line.startswith("FREQ="):
+            rule_line = "RRULE:" + rule_line
+        if rule_line.startswith(("RRULE:", "EXDATE", "RDATE")):
+            lines.append(rule_line)
+    title = t["title"]
+    if t["subject__code"]:
+        title = f"[{t['subject__code']}] {title}"
+    lines.append(f"SUMMARY:{_escape(title)}")
+    if t["description"]:
+        lines.append(f"DESCRIPTION:{_escape(t['description'])}")
+    lines.append(f"CATEGORIES:{t['priority'].upper()}")
+    return _event(lines)
+
+
+def iter_ical(user_id: int, name: str = "UniPlan"):
+    """
+    Yield the user's feed as encoded chunks (one per event), reading rows
+    with chunked iterators so the full document is never held in memory.
+    """
+    now = timezone.now()
+    tzid = timezone.get_current_timezone_name()
+    yield "".join(_fold(line) for line in [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//UniPlan//Schedule//EN",
+        "CALSCALE:GREGORIAN",
+        f"X-WR-CALNAME:{_escape(name)}",
+        f"X-WR-TIMEZONE:{tzid}",
+        *(_vtimezone(tzid, now) if tzid != "UTC" else []),
+    ]).encode("utf-8")
+
+    entries = (TimetableEntry.objects
+               .filter(user_id=user_id)
+               .order_by("pk")
+               .values("id", "day_of_week", "start_time", "end_time", "room", "effective_from",
+                       "effective_to", "created_at", "updated_at", "subject__name", "subject__code",
+                       "subject__location", "subject__teacher_name"))
+    for e in entries.iterator(chunk_size=500):
+        chunk = _class_event(e, tzid, now)
+        if chunk:
+            yield chunk
+
+    tasks = (Task.objects
+             .filter(user_id=user_id, due_at__isnull=False)
+             .order_by("pk")
+             .values("id", "title", "description", "priority", "due_at", "rrule", "updated_at",
+                     "subject__code"))
+    for t in tasks.iterator(chunk_size=500):
+        yield _task_event(t, tzid, now)
+
+    yield b"END:VCALENDAR\r\n"
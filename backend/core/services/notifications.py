@@ -0,0 +1,70 @@
+from collections import Counter
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from core.models import Notification, NotificationCounter
+
+
+def _bump_unread(user_id: int, delta: int):
+    if not delta:
+        return
+    updated = (NotificationCounter.objects
+               .filter(user_id=user_id)
+               .update(unread=Greatest(F("unread") + delta, Value(0))))
+    if not updated and delta > 0:
+        _, created = NotificationCounter.objects.get_or_create(user_id=user_id, defaults={"unread": delta})
+        if not created:
+            NotificationCounter.objects.filter(user_id=user_id).update(unread=F("unread") + delta)
+
+
+def notify(user_id: int, title: str, body: str = "", reminder=None) -> Notification:
+    """Store an inbox entry and bump the unread counter in the same transaction."""
+    with transaction.atomic():
+        n = Notification.objects.create(user_id=user_id, title=title[:240], body=body, reminder=reminder)
+        _bump_unread(user_id, 1)
+    return n
+
+
+def notify_many(entries) -> int:
+    """
+    Batch form of notify() for the reminder worker: entries are
+    (user_id, title, body, reminder) tuples. A fixed number of queries
+    however many entries or users there are.
+    """
+    entries = list(entries)
+    if not entries:
+        return 0
+    per_user = Counter(user_id for user_id, *_ in entries)
+    with transaction.atomic():
+        Notification.objects.bulk_create([
+            Notification(user_id=user_id, title=title[:240], body=body, reminder=reminder)
+            for user_id, title, body, reminder in entries
+        ])
+        NotificationCounter.objects.bulk_create(
+            [NotificationCounter(user_id=user_id, unread=0) for user_id in per_user], ignore_conflicts=True
+        )
+        NotificationCounter.objects.filter(user_id__in=per_user).update(
+            unread=F("unread") + Case(*[When(user_id=u, then=Value(n)) for u, n in per_user.items()],
+                                      default=Value(0))
+        )
+    return len(entries)
+
+
+def mark_read(user_id: int, ids=None) -> int:
+    """Mark the given notifications (or all, if ids is None) read; returns how many changed."""
+    qs = Notification.objects.filter(user_id=user_id, read_at__isnull=True)
+    if ids is not None:
+        qs = qs.filter(pk__in=ids)
+    with transaction.atomic():
+        changed = qs.update(read_at=timezone.now())
+        _bump_unread(user_id, -changed)
+    return changed
+
+
+def unread_count(user_id: int) -> int:
+    return (NotificationCounter.objects
+            .filter(user_id=user_id)
+            .values_list("unread", flat=True)
+            .first()) or 0
+
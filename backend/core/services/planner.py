@@ -0,0 +1,151 @@
+"""
+Study planner: books sessions for open tasks into the free time between
+classes, before each task's deadline.
+
+Tasks are placed earliest-deadline-first, with priority pulling a task
+forward as if it were due earlier (PRIORITY_LEAD). Each task takes the
+earliest free 5-minute slots before its due_at from the free_slots bitmap,
+in sessions of SESSION_MIN..SESSION_MAX minutes with a break between two
+sessions cut from the same gap. Whatever doesn't fit is reported missing.
+
+The plan for a day is cached per user with the bitmap of slots each task
+took. When the "calendar" generation moves (a task or timetable write),
+only the tasks from the first one whose inputs changed onwards, in EDF
+order, are placed again: everything earlier made the same choices over the
+same free time, so their slots are kept, unless part of them has passed
+since the last call.
+"""
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.dateparse import parse_time
+from core.models import Priority, Task, TaskStatus
+from core.services.free_slots import DAY_SLOTS, SLOT_MINUTES, free_bitmap, run_length, run_starts, slot_time, span
+from core.services.generations import get_generation
+
+# planned as if due this much earlier, so important work lands first
+PRIORITY_LEAD = {Priority.HIGH: timedelta(days=2), Priority.NORMAL: timedelta(days=1), Priority.LOW: timedelta(0)}
+DEFAULT_MINUTES = {Priority.HIGH: 240, Priority.NORMAL: 120, Priority.LOW: 60}  # when estimate_minutes is unset
+SESSION_MIN, SESSION_MAX, BREAK = 30 // SLOT_MINUTES, 120 // SLOT_MINUTES, 15 // SLOT_MINUTES  # in slots
+
+
+def _inputs(user_id: int, origin: datetime, horizon_slots: int):
+    """{task_id: (sort key, deadline slot, slots needed)} and titles of every open task due in the horizon."""
+    tasks = (Task.objects
+             .filter(user_id=user_id, due_at__gt=timezone.now(), source_deleted_at__isnull=True)
+             .exclude(status=TaskStatus.COMPLETED)
+             .values_list("id", "title", "priority", "due_at", "estimate_minutes"))
+    inputs, titles = {}, {}
+    for tid, title, priority, due_at, estimate in tasks:
+        deadline = min(int((due_at - origin).total_seconds() // 60 // SLOT_MINUTES), horizon_slots)
+        lead = PRIORITY_LEAD.get(priority, timedelta(0)) // timedelta(minutes=SLOT_MINUTES)
+        minutes = estimate or DEFAULT_MINUTES.get(priority, DEFAULT_MINUTES[Priority.NORMAL])
+        inputs[tid] = ((deadline - lead, deadline, tid), deadline, -(-minutes // SLOT_MINUTES))
+        titles[tid] = title
+    return inputs, titles
+
+
+def _place(free: int, deadline: int, need: int) -> int:
+    """Bitmap of the slots booked for one task: earliest free sessions before `deadline`."""
+    avail = free & span(0, deadline)
+    booked = 0
+    while need > 0:
+        starts = run_starts(avail, min(SESSION_MIN, need))  # skips every gap too short for a session at once
+        if not starts:
+            break
+        first = (starts & -starts).bit_length() - 1
+        take = min(run_length(avail, first), SESSION_MAX, need)
+        booked |= span(first, first + take)
+        need -= take
+        avail &= ~span(0, first + take + BREAK)  # nothing earlier can hold a session any more
+    return booked
+
+
+def _build(user_id: int, today, previous=None):
+    tz = timezone.get_current_timezone()
+    origin = timezone.make_aware(datetime.combine(today, datetime.min.time()), tz)
+    days = settings.PLAN_HORIZON_DAYS
+    inputs, titles = _inputs(user_id, origin, days * DAY_SLOTS)
+
+    # from the clock every time: a replan later in the day must not book time that has passed
+    now_slot = int((timezone.now() - origin).total_seconds() // 60 // SLOT_MINUTES) + 1
+    base = free_bitmap(user_id, today, days, parse_time(settings.PLAN_DAY_START),
+                       parse_time(settings.PLAN_DAY_END)) & ~span(0, now_slot)
+    order = sorted(inputs, key=lambda tid: inputs[tid][0])
+
+    keep = 0
+    if previous is not None:
+        old_order, old_inputs, masks = previous["order"], previous["inputs"], previous["masks"]
+        while (keep < len(order) and keep < len(old_order) and order[keep] == old_order[keep]
+               and inputs[order[keep]] == old_inputs[order[keep]]):
+            keep += 1
+        lost, gained = previous["base"] & ~base, base & ~previous["base"]
+        lowest_gained = (gained & -gained).bit_length() - 1 if gained else None
+        passed = span(0, now_slot)
+        for i in range(keep):
+            tid = order[i]
+            if masks[tid] & (lost | passed) or (lowest_gained is not None and lowest_gained < inputs[tid][1]):
+                keep = i  # timetable change or the clock reaches this task's slots, or its window
+                break
+
+    masks = {tid: previous["masks"][tid] for tid in order[:keep]} if keep else {}
+    free = base
+    for tid in order[:keep]:
+        free &= ~masks[tid]
+    for tid in order[keep:]:
+        masks[tid] = _place(free, inputs[tid][1], inputs[tid][2])
+        free &= ~masks[tid]
+
+    return {"gen": None, "origin": origin, "now_slot": now_slot, "base": base, "order": order,
+            "inputs": inputs, "titles": titles, "masks": masks, "replanned": len(order) - keep}
+
+
+def _task_sessions(plan, tid, tz):
+    mask, out = plan["masks"][tid], []
+    while mask:
+        first = (mask & -mask).bit_length() - 1
+        length = run_length(mask, first)
+        mask &= ~span(first, first + length)
+        out.append({
+            "task": tid,
+            "title": plan["titles"][tid],
+            "start": slot_time(plan["origin"].date(), first, tz).isoformat(),
+            "end": slot_time(plan["origin"].date(), first + length, tz).isoformat(),
+            "minutes": length * SLOT_MINUTES,
+        })
+    return out
+
+
+def _render(plan, previous=None):
+    tz = timezone.get_current_timezone()
+    kept = plan["order"][:len(plan["order"]) - plan["replanned"]]
+    per_task = {tid: previous["per_task"][tid] for tid in kept if plan["titles"][tid] == previous["titles"][tid]} \
+        if previous else {}
+    sessions, unscheduled = [], []
+    for tid in plan["order"]:
+        if tid not in per_task:
+            per_task[tid] = _task_sessions(plan, tid, tz)
+        sessions.extend(per_task[tid])
+        missing = plan["inputs"][tid][2] * SLOT_MINUTES - sum(s["minutes"] for s in per_task[tid])
+        if missing > 0:
+            unscheduled.append({"task": tid, "title": plan["titles"][tid], "missing_minutes": missing})
+    plan["per_task"] = per_task
+    sessions.sort(key=lambda s: s["start"])
+    return {"sessions": sessions, "unscheduled": unscheduled, "replanned": plan["replanned"],
+            "tasks": len(plan["order"])}
+
+
+def study_plan(user_id: int) -> dict:
+    """The user's plan from now to PLAN_HORIZON_DAYS ahead, replanning only what changed since the last call."""
+    today = timezone.localdate()
+    key = f"plan:{user_id}:{today.isoformat()}"
+    gen = get_generation("calendar", user_id)
+    plan = cache.get(key)
+    if plan is None or plan["gen"] != gen:
+        previous, plan = plan, _build(user_id, today, previous=plan)
+        plan["gen"] = gen
+        plan["rendered"] = _render(plan, previous)
+        cache.set(key, plan, timeout=24 * 3600)
+        return plan["rendered"]
+    return {**plan["rendered"], "replanned": 0}
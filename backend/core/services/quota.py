@@ -0,0 +1,103 @@
+"""
+Outbound Google API budget, per user and project-wide.
+
+Counters live in the Django cache, which should be one every process sees
+(Redis, via REDIS_URL): with a per-process cache each web process and the
+worker get the whole budget to themselves. That still works, so it is a
+system check warning (core.checks) rather than an error;
+GOOGLE_QUOTA_ALLOW_LOCAL_CACHE says a single process is all there is. The cache API only offers atomic add/incr, so each
+bucket is a sliding-window counter: the current minute's count plus the
+previous minute's, weighted by how much of it still overlaps the window.
+That gives token-bucket behaviour (steady rate, bounded burst) without a
+read-modify-write race.
+"""
+import hashlib
+import math
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+WINDOW = 60  # seconds; limits are configured per minute
+
+_subject = ContextVar("uniplan_google_quota_subject", default=None)
+
+
+class QuotaExceeded(Exception):
+    def __init__(self, scope: str, retry_after: int):
+        super().__init__(f"Google API budget exhausted ({scope}); retry in {retry_after}s")
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+@contextmanager
+def charged_to(user_key: str):
+    """Charge Google calls made inside the block to this user's bucket (as well as the global one)."""
+    token = _subject.set(user_key)
+    try:
+        yield
+    finally:
+        _subject.reset(token)
+
+
+def _take(scope: str, limit: int, cost: int, now: float) -> int:
+    """Consume `cost` from the bucket; returns 0 if allowed, else seconds until it is."""
+    index = int(now // WINDOW)
+    key = f"gquota:{scope}:{index}"
+    cache.add(key, 0, timeout=WINDOW * 2)
+    try:
+        count = cache.incr(key, cost)
+    except ValueError:  # evicted between add and incr
+        cache.set(key, cost, timeout=WINDOW * 2)
+        count = cost
+    previous = cache.get(f"gquota:{scope}:{index - 1}", 0)
+    elapsed = (now % WINDOW) / WINDOW
+    if previous * (1 - elapsed) + count <= limit:
+        return 0
+    cache.decr(key, cost)  # refused calls don't spend budget
+    return max(1, math.ceil(WINDOW - now % WINDOW))
+
+
+def shared_cache() -> bool:
+    """Whether the counters are seen by every process (not LocMemCache / DummyCache)."""
+    return not isinstance(caches["default"], (LocMemCache, DummyCache))
+
+
+def acquire(cost: int = 1):
+    """Spend budget for one outbound call, or raise QuotaExceeded."""
+    now = time.time()
+    cooling = cache.get("gquota:cooldown")
+    if cooling and cooling > now:
+        raise QuotaExceeded("upstream", math.ceil(cooling - now))
+
+    user_key = _subject.get()
+    if user_key is not None:
+        wait = _take(f"user:{user_key}", settings.GOOGLE_QUOTA_USER_PER_MINUTE, cost, now)
+        if wait:
+            raise QuotaExceeded("user", wait)
+    wait = _take("global", settings.GOOGLE_QUOTA_GLOBAL_PER_MINUTE, cost, now)
+    if wait:
+        if user_key is not None:
+            cache.decr(f"gquota:user:{user_key}:{int(now // WINDOW)}", cost)
+        raise QuotaExceeded("global", wait)
+
+
+def cool_down(seconds: int):
+    """Google answered 429: stop every process from calling out for a while."""
+    cache.set("gquota:cooldown", time.time() + seconds, timeout=seconds)
+
+
+# ---- last good responses, served while a caller is over budget ----
+def _stale_key(user_key: str, path: str) -> str:
+    return "gquota:last:" + hashlib.sha256(f"{user_key}|{path}".encode()).hexdigest()
+
+
+def remember(user_key: str, path: str, content: bytes):
+    cache.set(_stale_key(user_key, path), content, timeout=settings.GOOGLE_QUOTA_STALE_SECONDS)
+
+
+def last_good(user_key: str, path: str):
+    return cache.get(_stale_key(user_key, path))
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from functools import lru_cache
+from dateutil.rrule import rrulestr
+from django.utils import timezone
+
+# occurrences are expanded (and memoized) one fixed-size window at a time
+WINDOW = timedelta(days=28)
+EPOCH = datetime(2000, 1, 2, tzinfo=dt_timezone.utc)
+
+
+def parse_rrule(rule: str, dtstart: datetime):
+    """
+    Parse an RFC 5545 recurrence ("FREQ=WEEKLY;BYDAY=MO" or a full
+    RRULE:/EXDATE: block) anchored at dtstart. Raises ValueError if invalid.
+    """
+    dtstart = timezone.localtime(dtstart)  # expand on wall-clock time, so 09:00 stays 09:00 across DST
+    try:
+        return rrulestr(rule.strip(), dtstart=dtstart, forceset=True)
+    except (ValueError, TypeError, AttributeError) as e:
+        raise ValueError(f"Invalid recurrence rule: {e}") from e
+
+
+@lru_cache(maxsize=1024)
+def _ruleset(task_id: int, updated_at: datetime, rule: str, dtstart: datetime):
+    return parse_rrule(rule, dtstart)
+
+
+@lru_cache(maxsize=8192)
+def _window(task_id: int, updated_at: datetime, rule: str, dtstart: datetime, index: int):
+    # (task_id, updated_at) identifies one version of the task; editing it
+    # changes updated_at, so stale windows are never hit again and age out of the LRU
+    lo = EPOCH + WINDOW * index
+    hi = lo + WINDOW
+    rs = _ruleset(task_id, updated_at, rule, dtstart)
+    return tuple(o for o in rs.between(lo, hi, inc=True) if o < hi)
+
+
+def _window_index(dt: datetime) -> int:
+    return (dt - EPOCH) // WINDOW
+
+
+def iter_occurrences(task_id: int, updated_at: datetime, rule: str, dtstart: datetime,
+                     start: datetime, end: datetime):
+    """
+    Lazily yield occurrences in [start, end], expanding window by window.
+    Non-recurring tasks yield their due date once (if it falls in range).
+    """
+    if not dtstart:
+        return
+    if not rule:
+        if start <= dtstart <= end:
+            yield dtstart
+        return
+
+    index = max(_window_index(start), _window_index(dtstart))
+    last = _window_index(end)
+    while index <= last:
+        for occ in _window(task_id, updated_at, rule, dtstart, index):
+            if occ > end:
+                return
+            if occ >= start:
+                yield occ
+        index += 1
+
+
+def task_occurrences(task, start: datetime, end: datetime):
+    return iter_occurrences(task.pk, task.updated_at, task.rrule, task.due_at, start, end)
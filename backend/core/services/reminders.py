@@ -1,24 +1,53 @@
 from datetime import timedelta
+from django.conf import settings
+from django.db.models import Max, OuterRef, Q, Subquery
 from django.utils import timezone
-from core.models import Reminder, ReminderChannel, Task
+from core.models import Reminder, ReminderChannel, Task, TaskStatus
+from core.services.recurrence import iter_occurrences
 
 VALID_DAYS = {1, 3, 7}
 
+def next_reminder_subquery():
+    """notify_at of a task's next pending email reminder, as a queryset annotation."""
+    return Subquery(Reminder.objects
+                    .filter(task=OuterRef("pk"), channel=ReminderChannel.EMAIL,
+                            delivered_at__isnull=True, status="pending")
+                    .order_by("notify_at").values("notify_at")[:1])
+
+def _remember_days(task: Task, days_before: int | None):
+    # the offset is kept on the task so recurring occurrences can reuse it later
+    if task.reminder_days_before != days_before:
+        task.reminder_days_before = days_before
+        Task.objects.filter(pk=task.pk).update(reminder_days_before=days_before)
+
 def upsert_email_reminder(task: Task, days_before: int | None):
     """
     Ensure exactly one email Reminder exists for this task according to days_before.
     If days_before is None -> remove any future pending reminders for this task.
+    Recurring tasks (rrule set) get one reminder per upcoming occurrence instead.
     """
     # wipe when disabled or when there is no due date
     if not task.due_at or days_before is None:
+        _remember_days(task, None)
         Reminder.objects.filter(task=task, channel=ReminderChannel.EMAIL, delivered_at__isnull=True).delete()
         return None
 
     if days_before not in VALID_DAYS:
         # ignore unknown options
+        _remember_days(task, None)
         Reminder.objects.filter(task=task, channel=ReminderChannel.EMAIL, delivered_at__isnull=True).delete()
         return None
 
+    _remember_days(task, days_before)
+
+    if task.rrule:
+        # rule or offset may have changed: drop pending ones and re-materialize the horizon
+        Reminder.objects.filter(task=task, channel=ReminderChannel.EMAIL, delivered_at__isnull=True).delete()
+        schedule_recurring_reminders(task_ids=[task.pk])
+        return (Reminder.objects
+                .filter(task=task, channel=ReminderChannel.EMAIL, delivered_at__isnull=True)
+                .order_by("notify_at").first())
+
     notify_at = task.due_at - timedelta(days=days_before)
 
     # Delete other pending reminders (if user changed setting)
@@ -33,7 +62,45 @@ def upsert_email_reminder(task: Task, days_before: int | None):
         notify_at=notify_at,
         defaults={"status": "pending"},
     )
-    if r.status != "pending" and r.delivered_at is None:
+    if r.status not in ("pending", "sending") and r.delivered_at is None:  # never pull one out from under a worker
         r.status = "pending"
-        r.save(update_fields=["status"])
-    return r
\ No newline at end of file
+        r.save(update_fields=["status", "updated_at"])
+    return r
+
+def schedule_recurring_reminders(now=None, horizon=None, task_ids=None) -> int:
+    """
+    Materialize email reminders for recurring tasks, but only for occurrences
+    whose reminder falls within `horizon` of now. Each call resumes after the
+    latest reminder already stored, so a worker tick only adds the slice of
+    time that just entered the horizon. Returns the number of rows attempted.
+    """
+    now = now or timezone.now()
+    horizon = horizon or timedelta(days=settings.RECURRING_REMINDER_HORIZON_DAYS)
+    until = now + horizon
+
+    qs = (Task.objects
+          .exclude(rrule="")
+          .exclude(status=TaskStatus.COMPLETED)
+          .filter(due_at__isnull=False, reminder_days_before__isnull=False, completed_at__isnull=True)
+          .annotate(last_notify=Max("reminders__notify_at",
+                                    filter=Q(reminders__channel=ReminderChannel.EMAIL)))
+          .filter(Q(last_notify__isnull=True) | Q(last_notify__lt=until)))
+    if task_ids is not None:
+        qs = qs.filter(pk__in=task_ids)
+
+    batch = []
+    for tid, updated_at, rule, due_at, days, last in qs.values_list(
+        "id", "updated_at", "rrule", "due_at", "reminder_days_before", "last_notify"
+    ):
+        offset = timedelta(days=days)
+        start = now if last is None else max(now, last + timedelta(seconds=1))
+        try:
+            for occ in iter_occurrences(tid, updated_at, rule, due_at, start + offset, until + offset):
+                batch.append(Reminder(task_id=tid, channel=ReminderChannel.EMAIL,
+                                      notify_at=occ - offset, status="pending"))
+        except ValueError:
+            continue  # unparsable legacy rule; the serializer rejects new ones
+
+    # (task, channel, notify_at) is unique, so overlapping runs are harmless
+    Reminder.objects.bulk_create(batch, batch_size=1000, ignore_conflicts=True)
+    return len(batch)
@@ -0,0 +1,140 @@
+import time
+from django.db import transaction
+from django.db.models import Q
+from core.models import ArchivedReminder, ArchivedTask, IdempotencyRecord, Reminder, Task, TaskStatus, Tombstone
+from core.services import task_stats
+from core.services.generations import bump_generation
+from core.signals import bulk_bookkeeping
+
+# every column of the live rows; an archive model missing one fails the insert instead of dropping data
+REMINDER_FIELDS = tuple(f.attname for f in Reminder._meta.concrete_fields)
+TASK_FIELDS = tuple(f.attname for f in Task._meta.concrete_fields)
+
+
+class Budget:
+    """Stops a run after max_seconds; whatever is left is picked up by the next run."""
+
+    def __init__(self, max_seconds=None, pause=0.0):
+        self.deadline = time.monotonic() + max_seconds if max_seconds else None
+        self.pause = pause
+        self.exhausted = False
+
+    def next_chunk(self):
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.exhausted = True
+            return False
+        return True
+
+    def rest(self):
+        if self.pause:
+            time.sleep(self.pause)  # let replicas and other writers catch up between chunks
+
+
+def _chunks(qs, size, budget):
+    # keyset over pk: every chunk is a short index range scan, never an OFFSET
+    last = 0
+    while budget.next_chunk():
+        ids = list(qs.filter(pk__gt=last).order_by("pk").values_list("pk", flat=True)[:size])
+        if not ids:
+            return
+        yield ids
+        last = ids[-1]
+        budget.rest()
+
+
+def expired_reminders(cutoff):
+    return Reminder.objects.filter(delivered_at__lt=cutoff)
+
+
+def expired_tasks(cutoff):
+    done = Q(completed_at__lt=cutoff) | Q(completed_at__isnull=True, status=TaskStatus.COMPLETED, updated_at__lt=cutoff)
+    return Task.objects.filter(done)
+
+
+def _archive_reminder_rows(rows, owners, now):
+    ArchivedReminder.objects.bulk_create(
+        [ArchivedReminder(user_id=owners[r["task_id"]], archived_at=now, **r) for r in rows if r["task_id"] in owners],
+        ignore_conflicts=True,  # a chunk retried after a crash re-inserts the same ids
+    )
+
+
+def archive_reminders(cutoff, now, chunk=500, purge=False, budget=None):
+    """
+    Move reminders delivered before `cutoff` to ArchivedReminder (or just
+    delete them with purge=True), one short transaction per chunk. Rows are
+    re-checked under lock inside the transaction, so a chunk picked while a
+    reminder was being touched only moves what still qualifies. Returns the
+    number of rows removed from Reminder.
+    """
+    budget = budget or Budget()
+    qs = expired_reminders(cutoff)
+    moved = 0
+    for ids in _chunks(qs, chunk, budget):
+        with transaction.atomic(), bulk_bookkeeping():
+            rows = list(qs.select_for_update(skip_locked=True).filter(pk__in=ids).values(*REMINDER_FIELDS))
+            if not rows:
+                continue
+            owners = dict(Task.objects.filter(pk__in={r["task_id"] for r in rows}).values_list("id", "user_id"))
+            if not purge:
+                _archive_reminder_rows(rows, owners, now)
+            Tombstone.objects.bulk_create([
+                Tombstone(user_id=owners[r["task_id"]], model="reminder", object_id=r["id"], deleted_at=now)
+                for r in rows if r["task_id"] in owners
+            ])
+            Reminder.objects.filter(pk__in=[r["id"] for r in rows]).delete()
+        moved += len(rows)
+    return moved
+
+
+def archive_tasks(cutoff, now, chunk=200, purge=False, budget=None):
+    """
+    Same for tasks completed before `cutoff`; their reminders (delivered or
+    not) go with them. Returns (tasks, reminders) removed.
+    """
+    budget = budget or Budget()
+    qs = expired_tasks(cutoff)
+    tasks = reminders = 0
+    for ids in _chunks(qs, chunk, budget):
+        with transaction.atomic(), bulk_bookkeeping():
+            rows = list(qs.select_for_update(skip_locked=True).filter(pk__in=ids).values(*TASK_FIELDS))
+            if not rows:
+                continue
+            task_ids = [t["id"] for t in rows]
+            owners = {t["id"]: t["user_id"] for t in rows}
+            child_rows = list(Reminder.objects.filter(task_id__in=task_ids).values(*REMINDER_FIELDS))
+            if not purge:
+                ArchivedTask.objects.bulk_create([ArchivedTask(archived_at=now, **t) for t in rows],
+                                                 ignore_conflicts=True)
+                _archive_reminder_rows(child_rows, owners, now)
+            # clients drop a task's reminders along with it, so only the tasks get tombstones
+            Tombstone.objects.bulk_create([
+                Tombstone(user_id=t["user_id"], model="task", object_id=t["id"], deleted_at=now) for t in rows
+            ])
+            Task.objects.filter(pk__in=task_ids).delete()  # cascades to the reminders
+            task_stats.record([(task_stats.state(t["user_id"], t["subject_id"], t["status"], t["due_at"]), None)
+                               for t in rows])
+        for user_id in set(owners.values()):
+            bump_generation("calendar", user_id)
+        tasks += len(rows)
+        reminders += len(child_rows)
+    return tasks, reminders
+
+
+def purge_tombstones(cutoff, chunk=1000, budget=None):
+    """Tombstones older than sync retention are dead weight: such clients get a full snapshot anyway."""
+    budget = budget or Budget()
+    qs = Tombstone.objects.filter(deleted_at__lt=cutoff)
+    purged = 0
+    for ids in _chunks(qs, chunk, budget):
+        purged += Tombstone.objects.filter(pk__in=ids).delete()[0]
+    return purged
+
+
+def purge_idempotency_records(now, chunk=1000, budget=None):
+    """Idempotency keys past their TTL; the stored responses are never replayed again."""
+    budget = budget or Budget()
+    qs = IdempotencyRecord.objects.filter(expires_at__lt=now)
+    purged = 0
+    for ids in _chunks(qs, chunk, budget):
+        purged += IdempotencyRecord.objects.filter(pk__in=ids).delete()[0]
+    return purged
@@ -0,0 +1,153 @@
+"""
+Ranked search over a user's tasks (title + description) and subjects.
+
+On MySQL the task side is a FULLTEXT index (migration 0013) queried in
+boolean mode, every term required and prefix-matched. Other backends
+(SQLite in tests and local runs) get the same semantics from a per-user
+inverted index built in Python and cached under the user's "calendar"
+generation, which every task/subject write already bumps. Subjects are
+few per user, so they are matched in Python on both backends.
+"""
+import math
+import re
+from bisect import bisect_left
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+from core.models import Subject, Task
+from core.services.generations import get_generation
+
+TOKEN = re.compile(r"\w+")
+TITLE_WEIGHT = 3  # a hit in the title counts like three in the description
+MYSQL_MIN_TOKEN = 3  # innodb_ft_min_token_size; shorter terms are not indexed
+FIELDS = ("id", "title", "subject_id", "status", "priority", "due_at")
+
+
+def terms(q: str):
+    seen = []
+    for t in TOKEN.findall(q.casefold()):
+        if t not in seen:
+            seen.append(t)
+    return seen
+
+
+def _index_key(user_id: int, gen: int) -> str:
+    return f"search:{user_id}:{gen}"
+
+
+def _build_index(user_id: int):
+    postings = {}
+    lengths = {}
+    for tid, title, description in (Task.objects.filter(user_id=user_id)
+                                    .values_list("id", "title", "description").iterator(chunk_size=2000)):
+        words = TOKEN.findall(title.casefold())
+        weights = {}
+        for w in words:
+            weights[w] = weights.get(w, 0) + TITLE_WEIGHT
+        body = TOKEN.findall(description.casefold())
+        for w in body:
+            weights[w] = weights.get(w, 0) + 1
+        for w, weight in weights.items():
+            postings.setdefault(w, {})[tid] = weight
+        lengths[tid] = len(words) * TITLE_WEIGHT + len(body)
+    return {"vocab": sorted(postings), "postings": postings, "lengths": lengths}
+
+
+def _index(user_id: int):
+    key = _index_key(user_id, get_generation("calendar", user_id))
+    index = cache.get(key)
+    if index is None:
+        index = _build_index(user_id)
+        cache.set(key, index, timeout=settings.CALENDAR_CACHE_TTL)
+    return index
+
+
+def _expand(index, term):
+    """Postings of every indexed word starting with `term`, merged (max weight per task)."""
+    vocab, merged = index["vocab"], {}
+    i = bisect_left(vocab, term)
+    while i < len(vocab) and vocab[i].startswith(term):
+        for tid, weight in index["postings"][vocab[i]].items():
+            if weight > merged.get(tid, 0):
+                merged[tid] = weight
+        i += 1
+    return merged
+
+
+def _rank_python(user_id: int, words):
+    """{task_id: score}: BM25 over the cached index, every term required."""
+    index = _index(user_id)
+    lengths = index["lengths"]
+    if not lengths:
+        return {}
+    n, avg = len(lengths), sum(lengths.values()) / len(lengths) or 1
+    scores = None
+    for term in words:
+        hits = _expand(index, term)
+        if not hits:
+            return {}
+        idf = math.log(1 + (n - len(hits) + 0.5) / (len(hits) + 0.5))
+        part = {tid: idf * tf * 2.2 / (tf + 1.2 * (0.25 + 0.75 * lengths[tid] / avg)) for tid, tf in hits.items()}
+        if scores is None:
+            scores = part
+        else:
+            scores = {tid: s + part[tid] for tid, s in scores.items() if tid in part}
+        if not scores:
+            return {}
+    return scores
+
+
+def _search_tasks_python(user_id, words, subject_id, limit):
+    scores = _rank_python(user_id, words)
+    if not scores:
+        return []
+    rows = Task.objects.filter(user_id=user_id, pk__in=scores)
+    if subject_id is not None:
+        rows = rows.filter(subject_id=subject_id)
+    rows = list(rows.values(*FIELDS))
+    for r in rows:
+        r["score"] = round(scores[r["id"]], 4)
+    rows.sort(key=lambda r: (-r["score"], r["id"]))
+    return rows[:limit]
+
+
+def _search_tasks_mysql(user_id, words, subject_id, limit):
+    words = [w for w in words if len(w) >= MYSQL_MIN_TOKEN]
+    if not words:
+        return []
+    sql = "MATCH (`core_task`.`title`, `core_task`.`description`) AGAINST (%s IN BOOLEAN MODE)"
+    params = [" ".join(f"+{w}*" for w in words)]
+    rows = (Task.objects
+            .filter(RawSQL(sql, params, output_field=BooleanField()), user_id=user_id)
+            .annotate(score=RawSQL(sql, params, output_field=FloatField())))
+    if subject_id is not None:
+        rows = rows.filter(subject_id=subject_id)
+    rows = list(rows.order_by("-score", "id").values(*FIELDS, "score")[:limit])
+    for r in rows:
+        r["score"] = round(r["score"], 4)
+    return rows
+
+
+def _search_subjects(user_id, words, limit):
+    out = []
+    for s in Subject.objects.filter(user_id=user_id).values("id", "name", "code", "color_hex"):
+        haystack = TOKEN.findall(f"{s['name']} {s['code']}".casefold())
+        hits = [sum(1 for w in haystack if w.startswith(t)) for t in words]
+        if all(hits):
+            out.append({**s, "score": float(sum(hits))})
+    out.sort(key=lambda s: (-s["score"], s["name"]))
+    return out[:limit]
+
+
+def search(user_id: int, q: str, subject_id=None, limit: int = 20) -> dict:
+    """Tasks and subjects matching every term of `q` (prefix match), best first."""
+    words = terms(q)
+    if not words:
+        return {"tasks": [], "subjects": []}
+    find = _search_tasks_mysql if connection.vendor == "mysql" else _search_tasks_python
+    return {
+        "tasks": find(user_id, words, subject_id, limit),
+        "subjects": _search_subjects(user_id, words, limit) if subject_id is None else [],
+    }
@@ -0,0 +1,68 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from core.fastread import ValuesMapper, json_datetime
+from core.models import Subject, TimetableEntry, Task, Reminder, Tombstone
+from core.serializers import SubjectSerializer, TimetableEntrySerializer, TaskSerializer, ReminderSerializer
+from core.services.reminders import next_reminder_subquery
+
+# (payload key, model, read serializer, path to the owning user)
+SYNC_SOURCES = [
+    ("subjects", Subject, SubjectSerializer, "user"),
+    ("timetable", TimetableEntry, TimetableEntrySerializer, "user"),
+    ("tasks", Task, TaskSerializer, "user"),
+    ("reminders", Reminder, ReminderSerializer, "task__user"),
+]
+KEY_BY_MODEL = {model._meta.model_name: key for key, model, _, _ in SYNC_SOURCES}
+
+_mappers = {}
+
+
+def _mapper(serializer_class):
+    if serializer_class not in _mappers:
+        extra = {"next_reminder_at": (next_reminder_subquery(), json_datetime)} if serializer_class is TaskSerializer else None
+        _mappers[serializer_class] = ValuesMapper(serializer_class, extra)
+    return _mappers[serializer_class]
+
+
+def sync_changes(user_id: int, since=None):
+    """
+    Rows created/updated after `since`, plus ids deleted since then (from
+    tombstones). With no `since`, or one older than tombstone retention, the
+    answer is a full snapshot (`full: true`) and the client should replace
+    its store. Returns the payload and the timestamp to issue as next token.
+
+    A small overlap is subtracted from `since` so rows committed late by a
+    concurrent transaction are not skipped; clients upsert by id, so the
+    occasional repeat is harmless. Subject deletion nulls Task.subject
+    without touching the tasks, so clients clear it on a subject tombstone.
+    """
+    now = timezone.now()
+    retention = timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    full = since is None or since < now - retention
+    cutoff = None if full else since - timedelta(seconds=settings.SYNC_OVERLAP_SECONDS)
+
+    payload = {"full": full}
+    for key, model, serializer_class, user_path in SYNC_SOURCES:
+        qs = model.objects.filter(**{user_path: user_id})
+        if cutoff is not None:
+            changed = Q(updated_at__gt=cutoff)
+            if model is Task:
+                # next_reminder_at moves when a reminder changes
+                changed |= Q(reminders__updated_at__gt=cutoff)
+                qs = qs.filter(changed).distinct()
+            else:
+                qs = qs.filter(changed)
+        payload[key] = _mapper(serializer_class).rows(qs.order_by("pk"))
+
+    payload["deleted"] = {key: [] for key, _, _, _ in SYNC_SOURCES}
+    if cutoff is not None:
+        tombstones = (Tombstone.objects
+                      .filter(user_id=user_id, deleted_at__gt=cutoff)
+                      .values_list("model", "object_id"))
+        for model_name, object_id in tombstones:
+            key = KEY_BY_MODEL.get(model_name)
+            if key:
+                payload["deleted"][key].append(object_id)
+    return payload, now
@@ -0,0 +1,217 @@
+"""
+Materialized dashboard counts: tasks per status, overdue and due within a
+week, for every (user, subject).
+
+TaskCounter rows move by deltas: the Task signals record single writes,
+bulk writers call record() themselves. overdue / due_week depend on the
+clock, so they are kept as of TaskCounterClock.rolled_at and the reminder
+worker moves that watermark forward each tick with roll(), which only
+reads the tasks whose due date crossed a window edge since the last tick.
+
+A user's rows are built from a live aggregate the first time they are
+needed. Writes racing a roll can be classified against the old watermark;
+rebuild() (the rebuild_task_stats command) repairs that and any other drift.
+"""
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, When
+from django.utils import timezone
+from core.models import Subject, Task, TaskCounter, TaskCounterClock, TaskStatus
+
+WEEK = timedelta(days=7)
+STATUS_FIELDS = {
+    TaskStatus.NOT_STARTED: "not_started",
+    TaskStatus.IN_PROCESS: "in_process",
+    TaskStatus.COMPLETED: "completed",
+}
+FIELDS = (*STATUS_FIELDS.values(), "overdue", "due_week")
+ZERO = dict.fromkeys(FIELDS, 0)
+
+
+def state(user_id, subject_id, status, due_at):
+    """What a task contributes to the counters; compare two to see if a write matters."""
+    return (user_id, subject_id or 0, status, due_at)
+
+
+def watermark():
+    rolled_at = TaskCounterClock.objects.filter(pk=1).values_list("rolled_at", flat=True).first()
+    if rolled_at is None:
+        clock, _ = TaskCounterClock.objects.get_or_create(pk=1, defaults={"rolled_at": timezone.now()})
+        rolled_at = clock.rolled_at
+    return rolled_at
+
+
+def _contribution(st, rolled_at):
+    _, _, status, due_at = st
+    out = {}
+    if status in STATUS_FIELDS:
+        out[STATUS_FIELDS[status]] = 1
+    if status != TaskStatus.COMPLETED and due_at is not None:
+        if due_at < rolled_at:
+            out["overdue"] = 1
+        elif due_at < rolled_at + WEEK:
+            out["due_week"] = 1
+    return out
+
+
+def _apply(deltas, create=True):
+    """
+    Add {(user_id, subject_id): {field: n}} to the counters in one UPDATE.
+    With create=True, rows that don't exist yet are inserted, and users
+    without any rows are built from scratch instead.
+    """
+    deltas = {k: {f: n for f, n in d.items() if n} for k, d in deltas.items()}
+    deltas = {k: d for k, d in deltas.items() if d}
+    if not deltas:
+        return
+    match = Q()
+    for user_id, subject_id in deltas:
+        match |= Q(user_id=user_id, subject_id=subject_id)
+    updates = {}
+    for field in FIELDS:
+        whens = [When(user_id=u, subject_id=s, then=F(field) + d[field]) for (u, s), d in deltas.items() if field in d]
+        if whens:
+            updates[field] = Case(*whens, default=F(field))
+    updated = TaskCounter.objects.filter(match).update(**updates)
+    if updated == len(deltas) or not create:
+        return
+
+    existing = set(TaskCounter.objects.filter(user_id__in={u for u, _ in deltas}).values_list("user_id", "subject_id"))
+    built = {u for u, _ in existing}
+    unbuilt, new_rows = set(), []
+    for (user_id, subject_id), d in deltas.items():
+        if (user_id, subject_id) in existing:
+            continue
+        if user_id not in built or any(n < 0 for n in d.values()):
+            unbuilt.add(user_id)  # nothing to add to, or already drifted: count from scratch
+        else:
+            new_rows.append(TaskCounter(user_id=user_id, subject_id=subject_id, **{**ZERO, **d}))
+    TaskCounter.objects.bulk_create(new_rows, ignore_conflicts=True)
+    if unbuilt:
+        rebuild(unbuilt)
+
+
+def record(changes):
+    """Apply task writes given as (before, after) states; None on one side for a create / delete."""
+    changes = [(before, after) for before, after in changes if before != after]
+    if not changes:
+        return
+    rolled_at = watermark()
+    deltas = {}
+    for before, after in changes:
+        for st, sign in ((before, -1), (after, 1)):
+            if st is None:
+                continue
+            d = deltas.setdefault(st[:2], {})
+            for field, n in _contribution(st, rolled_at).items():
+                d[field] = d.get(field, 0) + sign * n
+    _apply(deltas)
+
+
+def fold_subject(user_id: int, subject_id: int):
+    """A deleted subject's tasks fall back to "no subject" (SET_NULL skips the Task signals)."""
+    row = TaskCounter.objects.filter(user_id=user_id, subject_id=subject_id).values(*FIELDS).first()
+    if row is None:
+        return
+    TaskCounter.objects.filter(user_id=user_id, subject_id=subject_id).delete()
+    _apply({(user_id, 0): row})
+
+
+def aggregate(user_ids, as_of):
+    """The live COUNT/GROUP BY the counters replace: {(user_id, subject_id): counts} as of `as_of`."""
+    is_open = ~Q(status=TaskStatus.COMPLETED)
+    rows = (Task.objects
+            .filter(user_id__in=user_ids)
+            .values("user_id", "subject_id")
+            .annotate(**{field: Count("id", filter=Q(status=status)) for status, field in STATUS_FIELDS.items()},
+                      overdue=Count("id", filter=is_open & Q(due_at__lt=as_of)),
+                      due_week=Count("id", filter=is_open & Q(due_at__gte=as_of, due_at__lt=as_of + WEEK))))
+    out = {(user_id, 0): dict(ZERO) for user_id in user_ids}
+    for r in rows:
+        out[(r.pop("user_id"), r.pop("subject_id") or 0)] = r
+    return out
+
+
+def rebuild(user_ids):
+    """Recount these users' rows from Task; returns the number of rows that were wrong (or missing)."""
+    user_ids = list(user_ids)
+    with transaction.atomic():
+        rolled_at = watermark()
+        fresh = aggregate(user_ids, rolled_at)
+        current = {(r.pop("user_id"), r.pop("subject_id")): r for r in (TaskCounter.objects
+                                                                        .select_for_update()
+                                                                        .filter(user_id__in=user_ids)
+                                                                        .values("user_id", "subject_id", *FIELDS))}
+        wrong = [k for k in fresh.keys() | current.keys() if fresh.get(k, ZERO) != current.get(k, ZERO)]
+        for key in wrong:
+            if key in current:
+                TaskCounter.objects.filter(user_id=key[0], subject_id=key[1]).update(**fresh.get(key, ZERO))
+        TaskCounter.objects.bulk_create(
+            [TaskCounter(user_id=u, subject_id=s, **counts) for (u, s), counts in fresh.items() if (u, s) not in current],
+            ignore_conflicts=True,
+        )
+    return len(wrong)
+
+
+def rebuild_all(users=None, chunk=500):
+    """
+    rebuild() every user that has counters (or every user in `users`, a user
+    queryset), `chunk` users per transaction; returns rows repaired.
+    """
+    if users is None:
+        users = get_user_model().objects.filter(pk__in=TaskCounter.objects.values("user_id"))
+    last, repaired = 0, 0
+    while True:
+        # keyset over user id: each chunk is an index range scan, never an OFFSET
+        ids = list(users.filter(pk__gt=last).order_by("pk").values_list("pk", flat=True)[:chunk])
+        if not ids:
+            return repaired
+        repaired += rebuild(ids)
+        last = ids[-1]
+
+
+def roll(now=None):
+    """
+    Move overdue / due_week forward to `now`: open tasks that fell due since
+    the last roll turn overdue, those entering the 7-day window join it.
+    Returns the number of counter rows touched, or None if a full rebuild is
+    needed (the worker was down for over a week).
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        clock = TaskCounterClock.objects.select_for_update().filter(pk=1).first()
+        if clock is None or now <= clock.rolled_at:
+            return 0
+        since = clock.rolled_at
+        clock.rolled_at = now
+        clock.save(update_fields=["rolled_at"])
+        if now - since >= WEEK:
+            return None
+
+        open_tasks = Task.objects.exclude(status=TaskStatus.COMPLETED)
+        deltas = {}
+        for lo, hi, moves in ((since, now, {"overdue": 1, "due_week": -1}),
+                              (since + WEEK, now + WEEK, {"due_week": 1})):
+            for r in (open_tasks.filter(due_at__gte=lo, due_at__lt=hi)
+                      .values("user_id", "subject_id").annotate(n=Count("id"))):
+                d = deltas.setdefault((r["user_id"], r["subject_id"] or 0), {})
+                for field, sign in moves.items():
+                    d[field] = d.get(field, 0) + sign * r["n"]
+        _apply(deltas, create=False)  # users without rows get counted when first needed
+    return len(deltas)
+
+
+def dashboard(user_id: int) -> dict:
+    """Counts per subject (every subject listed, no-subject last) and totals; O(subjects)."""
+    rows = {r.pop("subject_id"): r for r in TaskCounter.objects.filter(user_id=user_id).values("subject_id", *FIELDS)}
+    if not rows:
+        rebuild([user_id])
+        rows = {r.pop("subject_id"): r for r in TaskCounter.objects.filter(user_id=user_id).values("subject_id", *FIELDS)}
+    subjects = [{"subject": s["id"], "name": s["name"], "code": s["code"], "color_hex": s["color_hex"],
+                 **rows.get(s["id"], ZERO)}
+                for s in Subject.objects.filter(user_id=user_id).values("id", "name", "code", "color_hex")]
+    if any(rows.get(0, ZERO).values()):
+        subjects.append({"subject": None, "name": "", "code": "", "color_hex": "", **rows[0]})
+    totals = {f: sum(s[f] for s in subjects) for f in FIELDS}
+    return {"as_of": watermark(), "totals": totals, "subjects": subjects}
@@ -0,0 +1,62 @@
+"""
+Reminder worker liveness and crash recovery.
+
+Every send_reminders process keeps a WorkerHeartbeat row, beaten after each
+tick and each delivered batch; the worker_health command (the container
+health check) fails when it goes stale.
+
+A worker claims reminders by committing status "sending" before anything
+goes out, and records emails as sent in small groups while the batch goes
+out (send_reminders.SENT_FLUSH), so a crash re-sends at most one group. A
+stop signal lets the current batch finish, so after a normal shutdown
+nothing is left claimed. After a crash, recover_claims() hands the claims
+back: at startup all of them when no other worker is alive, otherwise (and
+on every tick) only those older than REMINDER_CLAIM_LEASE_SECONDS.
+"""
+import os
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from core.models import Reminder, WorkerHeartbeat
+
+RUNNING, DRAINING, STOPPED = "running", "draining", "stopped"
+SENDING = "sending"
+
+
+def beat(name: str, state: str = RUNNING, ticked: bool = False):
+    """Record that the worker is alive (one UPDATE)."""
+    fields = {"state": state, "beat_at": timezone.now()}
+    if ticked:
+        fields["ticks"] = F("ticks") + 1
+    WorkerHeartbeat.objects.filter(name=name).update(**fields)
+
+
+def start(name: str, interval: int):
+    """(Re)set the heartbeat row for a new worker process."""
+    now = timezone.now()
+    fields = {"pid": os.getpid(), "state": RUNNING, "interval_seconds": interval,
+              "started_at": now, "beat_at": now, "ticks": 0}
+    if not WorkerHeartbeat.objects.filter(name=name).update(**fields):
+        WorkerHeartbeat.objects.create(name=name, **fields)
+
+
+def max_age(hb: WorkerHeartbeat) -> timedelta:
+    """How long a beat stays fresh: two ticks plus the claim lease for a slow batch."""
+    return timedelta(seconds=2 * hb.interval_seconds + settings.REMINDER_CLAIM_LEASE_SECONDS)
+
+
+def is_alive(hb: WorkerHeartbeat, now=None, age: timedelta = None) -> bool:
+    now = now or timezone.now()
+    return hb.state != STOPPED and hb.beat_at >= now - (age or max_age(hb))
+
+
+def recover_claims(name: str, now=None, startup=False) -> int:
+    """Put reminders left in "sending" by a dead worker back to pending; returns how many."""
+    now = now or timezone.now()
+    stuck = Reminder.objects.filter(status=SENDING, delivered_at__isnull=True, notify_at__lte=now)
+    others_alive = startup and any(is_alive(hb, now) for hb in WorkerHeartbeat.objects.exclude(name=name))
+    if not startup or others_alive:
+        # a live worker may be mid-batch: only claims past the lease are abandoned
+        stuck = stuck.filter(updated_at__lt=now - timedelta(seconds=settings.REMINDER_CLAIM_LEASE_SECONDS))
+    return stuck.update(status="pending", updated_at=now)
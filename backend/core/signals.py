@@ -0,0 +1,111 @@
+# core/signals.py
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.contrib.auth import get_user_model
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+from .models import Subject, TimetableEntry, Task, Reminder, Tombstone
+from .services import task_stats
+from .services.generations import bump_generation
+
+_bulk = ContextVar("uniplan_bulk_bookkeeping", default=False)
+
+
+@contextmanager
+def bulk_bookkeeping():
+    """
+    Silence the per-row receivers below for a bulk delete; the caller
+    writes the tombstones, task counters and generations itself, once per batch.
+    """
+    token = _bulk.set(True)
+    try:
+        yield
+    finally:
+        _bulk.reset(token)
+
+
+@receiver([post_save, post_delete], sender=Subject)
+@receiver([post_save, post_delete], sender=TimetableEntry)
+@receiver([post_save, post_delete], sender=Task)
+def _schedule_changed(sender, instance, origin=None, **kwargs):
+    if _bulk.get() or _origin_model(origin) is get_user_model():
+        return  # an account being deleted takes its generations with it
+    # retire the user's cached calendar weeks
+    bump_generation("calendar", instance.user_id)
+
+
+def _origin_model(origin):
+    if isinstance(origin, QuerySet):
+        return origin.model
+    return type(origin) if origin is not None else None
+
+
+@receiver(post_delete, sender=Subject)
+@receiver(post_delete, sender=TimetableEntry)
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Reminder)
+def _record_tombstone(sender, instance, origin=None, **kwargs):
+    if _bulk.get():
+        return
+    origin_model = _origin_model(origin)
+    if origin_model is get_user_model():
+        return  # the whole account is going away, tombstones included
+
+    if sender is Reminder:
+        if origin_model is Task:
+            return  # clients drop a deleted task's reminders along with it
+        user_id = Task.objects.filter(pk=instance.task_id).values_list("user_id", flat=True).first()
+        if user_id is None:
+            return
+    else:
+        user_id = instance.user_id
+
+    Tombstone.objects.create(user_id=user_id, model=sender._meta.model_name, object_id=instance.pk)
+
+
+# ---- dashboard counters (core/services/task_stats.py) ----
+COUNTED = {"user_id", "subject_id", "status", "due_at"}
+
+
+def _counted_state(task):
+    return task_stats.state(task.user_id, task.subject_id, task.status, task.due_at)
+
+
+@receiver(post_init, sender=Task)
+def _remember_counted_state(sender, instance, **kwargs):
+    # what the row in the database counts as; None when unknown (new, or fields deferred)
+    loaded = instance.pk is not None and not (instance.get_deferred_fields() & COUNTED)
+    instance._counted = _counted_state(instance) if loaded else None
+
+
+@receiver(pre_save, sender=Task)
+def _load_counted_state(sender, instance, raw=False, **kwargs):
+    if _bulk.get() or raw or instance._state.adding or instance._counted is not None:
+        return
+    row = (Task.objects.filter(pk=instance.pk)
+           .values_list("user_id", "subject_id", "status", "due_at").first())
+    instance._counted = task_stats.state(*row) if row else None
+
+
+@receiver(post_save, sender=Task)
+def _count_task_save(sender, instance, created, raw=False, **kwargs):
+    if _bulk.get() or raw:
+        return
+    before = None if created else instance._counted
+    instance._counted = _counted_state(instance)
+    task_stats.record([(before, instance._counted)])
+
+
+@receiver(post_delete, sender=Task)
+def _count_task_delete(sender, instance, origin=None, **kwargs):
+    if _bulk.get() or _origin_model(origin) is get_user_model():
+        return
+    task_stats.record([(instance._counted or _counted_state(instance), None)])
+
+
+@receiver(post_delete, sender=Subject)
+def _fold_subject_counts(sender, instance, origin=None, **kwargs):
+    if _bulk.get() or _origin_model(origin) is get_user_model():
+        return
+    task_stats.fold_subject(instance.user_id, instance.pk)
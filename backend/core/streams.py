@@ -0,0 +1,216 @@
+# core/streams.py
+"""
+Server-sent events for the in-app inbox, mounted by mysite/asgi.py at
+/api/notifications/stream (EventSource can't send headers, so the bearer
+token may be passed as ?token=).
+
+Each connection is a coroutine parked on an asyncio.Queue, so idle clients
+cost no thread. One hub task per process polls Notification with a single
+query covering every connected user and fans new rows out to their queues.
+The hub's position is the newest row of anyone's, so a user who connects
+later only gets what arrives after; what they missed is the Last-Event-ID
+replay's job. None of this runs inside Django's request cycle, so every
+database step closes stale connections itself, as a request would.
+"""
+import asyncio
+import json
+import logging
+from urllib.parse import parse_qs
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections
+from core.auth import _unsign
+from core.models import Notification, NotificationCounter
+
+logger = logging.getLogger(__name__)
+
+STREAM_PATH = "/api/notifications/stream"
+BATCH = 500
+
+
+def _event(name: str, data, event_id=None) -> bytes:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {name}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+def _rows(qs):
+    return list(qs.order_by("id").values("id", "user_id", "title", "body", "created_at")[:BATCH])
+
+
+def _payload(row, unread):
+    return {
+        "id": row["id"],
+        "title": row["title"],
+        "body": row["body"],
+        "created_at": row["created_at"].isoformat(),
+        "unread": unread,
+    }
+
+
+def _database(fn):
+    """sync_to_async, dropping connections the server has timed out before and after (as a request does)."""
+    @wraps(fn)
+    def run(*args):
+        close_old_connections()
+        try:
+            return fn(*args)
+        finally:
+            close_old_connections()
+    return sync_to_async(run)
+
+
+def _newest():
+    return Notification.objects.order_by("-id").values_list("id", flat=True).first() or 0
+
+
+@_database
+def _latest_id():
+    return _newest()
+
+
+@_database
+def _fetch_since(last_id, user_ids):
+    """(events for these users after last_id, the hub's next position)."""
+    newest = _newest()  # read first: rows committed after it are left for the next poll
+    rows = _rows(Notification.objects.filter(id__gt=last_id, id__lte=newest, user_id__in=user_ids))
+    if len(rows) < BATCH:
+        last_id = newest  # other users' rows are skipped too, not scanned again on every poll
+    else:
+        last_id = rows[-1]["id"]
+    if not rows:
+        return [], last_id
+    counts = dict(NotificationCounter.objects
+                  .filter(user_id__in={r["user_id"] for r in rows})
+                  .values_list("user_id", "unread"))
+    events = [(r["user_id"], _event("notification", _payload(r, counts.get(r["user_id"], 0)), r["id"]))
+              for r in rows]
+    return events, last_id
+
+
+@_database
+def _backlog(user_id, after_id):
+    # replay what a reconnecting client missed (Last-Event-ID), then the current badge
+    unread = (NotificationCounter.objects.filter(user_id=user_id)
+              .values_list("unread", flat=True).first()) or 0
+    events = []
+    if after_id is not None:
+        rows = _rows(Notification.objects.filter(user_id=user_id, id__gt=after_id))
+        events = [_event("notification", _payload(r, unread), r["id"]) for r in rows]
+    events.append(_event("unread", {"unread": unread}))
+    return events
+
+
+@_database
+def _user_id_for(token):
+    email = _unsign(token) if token else None
+    if not email:
+        return None
+    return get_user_model().objects.filter(username=email).values_list("id", flat=True).first()
+
+
+class NotificationHub:
+    """Per-process fan-out; the polling task only runs while someone is listening."""
+
+    def __init__(self):
+        self.subscribers = {}  # user_id -> set of asyncio.Queue
+        self.last_id = None
+        self._task = None
+
+    def subscribe(self, user_id):
+        q = asyncio.Queue(maxsize=100)
+        self.subscribers.setdefault(user_id, set()).add(q)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return q
+
+    def unsubscribe(self, user_id, q):
+        queues = self.subscribers.get(user_id)
+        if queues is not None:
+            queues.discard(q)
+            if not queues:
+                del self.subscribers[user_id]
+
+    async def _run(self):
+        # start from now: rows from while nobody was listening are for Last-Event-ID replays only
+        self.last_id = await _latest_id()
+        while self.subscribers:
+            await asyncio.sleep(settings.NOTIFICATION_POLL_SECONDS)
+            try:
+                events, self.last_id = await _fetch_since(self.last_id, list(self.subscribers))
+            except Exception:
+                logger.exception("notification poll failed")
+                continue
+            for user_id, event in events:
+                for q in self.subscribers.get(user_id, ()):
+                    try:
+                        q.put_nowait(event)
+                    except asyncio.QueueFull:
+                        pass  # stalled client; it catches up via Last-Event-ID on reconnect
+
+
+hub = NotificationHub()
+
+
+def _cors_headers(headers):
+    origin = headers.get(b"origin", b"").decode()
+    if origin and origin in settings.CORS_ALLOWED_ORIGINS:
+        return [(b"access-control-allow-origin", origin.encode()),
+                (b"access-control-allow-credentials", b"true"),
+                (b"vary", b"Origin")]
+    return []
+
+
+async def _wait_disconnect(receive):
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def notification_stream(scope, receive, send):
+    """Raw ASGI app: authenticate, replay backlog, then stream until the client leaves."""
+    headers = dict(scope.get("headers") or [])
+    query = parse_qs(scope.get("query_string", b"").decode())
+    token = (query.get("token") or [""])[0]
+    authz = headers.get(b"authorization", b"").decode()
+    if not token and authz.startswith("Bearer "):
+        token = authz.split(" ", 1)[1].strip()
+
+    user_id = await _user_id_for(token)
+    if user_id is None:
+        await send({"type": "http.response.start", "status": 401,
+                    "headers": [(b"content-type", b"application/json"), *_cors_headers(headers)]})
+        await send({"type": "http.response.body", "body": b'{"detail": "Invalid/expired token"}'})
+        return
+
+    last_event = headers.get(b"last-event-id", b"").decode() or (query.get("lastEventId") or [""])[0]
+    after_id = int(last_event) if last_event.isdigit() else None
+
+    await send({"type": "http.response.start", "status": 200, "headers": [
+        (b"content-type", b"text/event-stream"),
+        (b"cache-control", b"no-cache"),
+        (b"x-accel-buffering", b"no"),
+        *_cors_headers(headers),
+    ]})
+
+    q = hub.subscribe(user_id)
+    disconnect = asyncio.ensure_future(_wait_disconnect(receive))
+    try:
+        for event in await _backlog(user_id, after_id):
+            await send({"type": "http.response.body", "body": event, "more_body": True})
+        while True:
+            getter = asyncio.ensure_future(q.get())
+            done, _ = await asyncio.wait({getter, disconnect}, timeout=settings.NOTIFICATION_KEEPALIVE_SECONDS,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if disconnect in done:
+                getter.cancel()
+                break
+            body = getter.result() if getter in done else b": keep-alive\n\n"
+            if getter not in done:
+                getter.cancel()
+            await send({"type": "http.response.body", "body": body, "more_body": True})
+    finally:
+        hub.unsubscribe(user_id, q)
+        disconnect.cancel()
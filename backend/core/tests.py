@@ -1,3 +1,1460 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import os
+import shutil
+import signal
+import tempfile
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import date, datetime, time as dtime, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core import mail
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.management import CommandError, call_command
+from django.db import connections, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.models import (
+    ArchivedReminder, ArchivedTask, ClassroomAssignment, ClassroomCourse, GoogleAccount, Notification, OAuthAccount,
+    Priority, Reminder, ReminderChannel, Subject, Task, TaskStatus, TimetableEntry, Tombstone, WorkerHeartbeat,
+)
+from core.checks import google_quota_cache
+from core.db import PrimaryReplicaRouter, is_pinned, pin_on_write, pin_primary, reset_pin, use_primary
+from core.middleware import PIN_COOKIE, ReplicaStickinessMiddleware, RequestMetricsMiddleware
+from core.streams import STREAM_PATH, hub
+from core.services import classroom_sync, export, google_id, quota, retention, task_stats, workload
+from core.services.generations import get_generation
+from core.services.ical import feed_secret
+from core.services.notifications import notify
+from core.services.reminders import schedule_recurring_reminders, upsert_email_reminder
+from core.views import _sign, _sign_feed, _sign_sync
+
+# ---- Query budgets ----
+# Every endpoint in mysite/urls.py (and the reminder tick) is run against a
+# small and a large dataset. The query count must be identical for both and
+# within the budget below; an N+1 shows up as a count that grows with the data.
+SMALL, LARGE = 3, 25
+
+BUDGETS = {
+    # name: (max queries, method, path(ids), body[, headers])
+    "api_root": (1, "get", lambda ids: "/api/", None),
+    "subjects_list": (2, "get", lambda ids: "/api/subjects/", None),
+    "subjects_detail": (2, "get", lambda ids: f"/api/subjects/{ids['subject']}/", None),
+    "timetable_list": (2, "get", lambda ids: "/api/timetable/", None),
+    "timetable_detail": (2, "get", lambda ids: f"/api/timetable/{ids['entry']}/", None),
+    "tasks_list": (2, "get", lambda ids: "/api/tasks/", None),
+    "tasks_detail": (2, "get", lambda ids: f"/api/tasks/{ids['task']}/", None),
+    "tasks_create": (12, "post", lambda ids: "/api/tasks/", lambda ids: {
+        "title": "New", "due_at": (timezone.now() + timedelta(days=10)).isoformat(),
+        "reminder_days_before": 3, "source": "manual", "external_id": "new"}),
+    "tasks_create_keyed": (14, "post", lambda ids: "/api/tasks/", lambda ids: {"title": "Keyed", "source": "manual",
+                                                                              "external_id": "keyed"},
+                           {"HTTP_IDEMPOTENCY_KEY": "create-1"}),
+    "tasks_create_replay": (2, "post", lambda ids: "/api/tasks/", lambda ids: {"title": "Keyed", "source": "manual",
+                                                                               "external_id": "keyed"},
+                            {"HTTP_IDEMPOTENCY_KEY": "create-1"}),
+    "tasks_update": (17, "patch", lambda ids: f"/api/tasks/{ids['task']}/", lambda ids: {
+        "title": "Renamed", "reminder_days_before": 1}),
+    "reminders_list": (2, "get", lambda ids: "/api/reminders/", None),
+    "reminders_detail": (2, "get", lambda ids: f"/api/reminders/{ids['reminder']}/", None),
+    "reminders_intake": (12, "post", lambda ids: "/api/reminders/intake/", lambda ids: {
+        "assignmentId": "cw-1", "title": "Essay", "courseName": "Course",
+        "dueISO": (timezone.now() + timedelta(days=5)).isoformat(),
+        "remindAtISO": (timezone.now() + timedelta(days=4)).isoformat()}),
+    "reminders_summary": (2, "get", lambda ids: "/api/reminders/summary/", None),
+    "classroom_assignments": (2, "get", lambda ids: "/api/classroom-assignments/", None),
+    "oauth_accounts": (2, "get", lambda ids: "/api/oauth-accounts/", None),
+    "notifications_list": (2, "get", lambda ids: "/api/notifications/", None),
+    "notifications_unread": (2, "get", lambda ids: "/api/notifications/unread-count/", None),
+    "notifications_read": (6, "post", lambda ids: "/api/notifications/read/", lambda ids: {"all": True}),
+    "calendar": (4, "get", lambda ids: f"/api/calendar?from={ids['today']}&to={ids['today'] + timedelta(days=30)}",
+                 None),
+    "free_slots": (3, "get", lambda ids: f"/api/free-slots?from={ids['today']}&to={ids['today'] + timedelta(days=6)}"
+                             "&min=45&day_start=08:00&day_end=20:00", None),
+    "plan": (4, "get", lambda ids: "/api/plan", None),
+    "workload": (4, "get", lambda ids: f"/api/workload?from={ids['today']}&to={ids['today'] + timedelta(days=120)}",
+                 None),
+    "calendar_feed_url": (2, "get", lambda ids: "/api/calendar/feed-url", None),
+    "calendar_feed": (3, "get", lambda ids: f"/api/calendar/feed/{ids['feed']}.ics", None),
+    "calendar_feed_rotate": (2, "post", lambda ids: "/api/calendar/feed-url", None),
+    "sync_full": (5, "get", lambda ids: "/api/sync", None),
+    "sync_delta": (6, "get", lambda ids: f"/api/sync?since={_sign_sync(ids['since'])}", None),
+    "stats": (4, "get", lambda ids: "/api/stats", None),
+    "search": (5, "get", lambda ids: "/api/search?q=cw", None),
+    "search_subject": (4, "get", lambda ids: f"/api/search?q=t&subject={ids['subject']}", None),
+    "hello": (0, "get", lambda ids: "/api/hello/", None),
+    "echo_auth": (1, "get", lambda ids: "/api/echo-auth/", None),
+    "whoami": (1, "get", lambda ids: "/api/whoami/", None),
+    "test_email": (1, "post", lambda ids: "/api/test-email/", None),
+    "google_login": (0, "get", lambda ids: "/api/auth/google/login", None),
+    "google_callback": (4, "get", lambda ids: "/api/auth/google/callback?code=abc", None),
+    "classroom_courses": (2, "get", lambda ids: "/api/classroom/courses", None),
+    "classroom_submissions": (2, "get", lambda ids: "/api/classroom/active-submissions/c1", None),
+    "classroom_summary": (2, "get", lambda ids: "/api/classroom/summary", None),
+    "classroom_reconcile": (12, "post", lambda ids: "/api/classroom/reconcile", lambda ids: {}),
+    "export": (7, "get", lambda ids: "/api/export", None),
+}
+TICK_BUDGET = 27
+
+
+def _seed(n):
+    """One user with n rows of everything, n due reminders and one recurring task."""
+    now = timezone.now()
+    email = f"budget{n}@uniplan.local"
+    user = get_user_model().objects.create(username=email, email=email)
+    subjects = [Subject.objects.create(user=user, name=f"S{i}", code=f"C{i}") for i in range(n)]
+    entries = [TimetableEntry.objects.create(user=user, subject=subjects[i], day_of_week=i % 7,
+                                             start_time=dtime(8 + i % 10), end_time=dtime(9 + i % 10))
+               for i in range(n)]
+    tasks = [Task.objects.create(user=user, subject=subjects[i], title=f"T{i}", source="seed", external_id=str(i),
+                                 due_at=now + timedelta(days=i % 20, hours=1),
+                                 status=TaskStatus.COMPLETED if i % 5 == 1 else TaskStatus.NOT_STARTED)
+             for i in range(n)]
+    Task.objects.create(user=user, title="Weekly", rrule="FREQ=WEEKLY", due_at=now + timedelta(hours=2),
+                        reminder_days_before=1, source="seed", external_id="weekly")
+    reminders = []
+    for i, t in enumerate(tasks):
+        reminders.append(Reminder.objects.create(task=t, notify_at=t.due_at - timedelta(days=1, hours=2),
+                                                 status="pending"))  # past: due for the tick
+        reminders.append(Reminder.objects.create(task=t, channel=ReminderChannel.IN_APP, status="pending",
+                                                 notify_at=now - timedelta(minutes=i + 1)))
+        reminders.append(Reminder.objects.create(task=t, notify_at=t.due_at + timedelta(days=3), status="pending"))
+    for i in range(n):
+        Notification.objects.create(user=user, title=f"N{i}")
+        OAuthAccount.objects.create(user=user, provider="google", provider_user_id=f"{email}-{i}")
+        course = ClassroomCourse.objects.create(user=user, google_course_id=f"{email}-c{i}", name=f"Course {i}")
+        ClassroomAssignment.objects.create(classroom_course=course, google_assignment_id=f"{email}-a{i}",
+                                           title=f"A{i}", task=tasks[i])
+    # classroom tasks: every deadline has moved upstream, and one coursework item is gone
+    for i in range(n + 1):
+        t = Task.objects.create(user=user, title=f"CW{i}", source="classroom", external_id=f"c{i % n}:s{i}",
+                                due_at=now + timedelta(days=3))
+        Reminder.objects.create(task=t, notify_at=t.due_at - timedelta(days=1), status="pending")
+    GoogleAccount.objects.create(email=email, credentials={})
+    return user, {"n": n, "user": user.pk, "subject": subjects[0].pk, "entry": entries[0].pk, "task": tasks[0].pk,
+                  "reminder": reminders[-1].pk, "today": timezone.localdate(),
+                  "since": now - timedelta(minutes=10), "feed": _sign_feed(user.pk, feed_secret(user.pk))}
+
+
+def _google_service(n, email):
+    service = mock.MagicMock()
+    courses = service.courses.return_value
+    courses.list.return_value.execute.return_value = {
+        "courses": [{"id": f"c{i}", "name": f"Course {i}"} for i in range(n)]}
+    courses.courseWork.return_value.studentSubmissions.return_value.list.return_value.execute.return_value = {
+        "studentSubmissions": [{"id": f"s{i}", "courseWorkId": f"w{i}"} for i in range(n)]}
+    courses.courseWork.return_value.get.return_value.execute.return_value = {"title": "Work"}
+    due = timezone.now() + timedelta(days=5)
+    courses.courseWork.return_value.list.return_value.execute.return_value = {"courseWork": [
+        {"id": f"w{i}", "title": f"CW{i}", "dueDate": {"year": due.year, "month": due.month, "day": due.day},
+         "dueTime": {"hours": 12}} for i in range(n)]}
+    service.userinfo.return_value.get.return_value.execute.return_value = {"email": email}
+    return service
+
+
+class _Rollback(Exception):
+    pass
+
+
+@override_settings(GOOGLE_QUOTA_USER_PER_MINUTE=10_000, GOOGLE_QUOTA_GLOBAL_PER_MINUTE=10_000)
+class QueryBudgetTests(TestCase):
+    def _capture(self):
+        stack = ExitStack()
+        captured = [stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in connections]
+        return stack, captured
+
+    def _measure(self, n, run):
+        """Seed n rows, run(user, ids) under capture, and roll the data back."""
+        cache.clear()  # per-user caches are keyed by ids that the rollback frees again
+        result = {}
+        try:
+            with transaction.atomic():
+                user, ids = _seed(n)
+                result = run(user, ids)
+                raise _Rollback
+        except _Rollback:
+            pass
+        return result
+
+    def _endpoints(self, user, ids):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Bearer " + _sign(user.username))
+        creds = mock.MagicMock(expired=True, refresh_token="r", id_token=None)  # no ID token: the userinfo path
+        creds.to_json.return_value = "{}"
+        flow = mock.MagicMock()
+        flow.authorization_url.return_value = ("https://accounts.google.com/o/oauth2/auth", "state")
+        flow.credentials = creds
+        out = {}
+        with mock.patch("googleapiclient.discovery.build", return_value=_google_service(ids["n"], user.email)), \
+                mock.patch("google.oauth2.credentials.Credentials.from_authorized_user_info", return_value=creds), \
+                mock.patch("google_auth_oauthlib.flow.Flow.from_client_config", return_value=flow), \
+                mock.patch("google.auth.transport.requests.Request"):
+            for name, (_, method, path, body, *headers) in BUDGETS.items():
+                kwargs = {"format": "json"} if body else {}
+                kwargs.update(*headers)
+                stack, captured = self._capture()
+                with stack:
+                    resp = getattr(client, method)(path(ids), body(ids) if body else None, **kwargs)
+                    if resp.streaming:
+                        b"".join(resp.streaming_content)
+                out[name] = (resp.status_code, [q["sql"] for c in captured for q in c.captured_queries])
+        return out
+
+    def _tick(self, user, ids):
+        stack, captured = self._capture()
+        with stack:
+            call_command("send_reminders", stdout=StringIO())
+        sent = Reminder.objects.filter(task__user=user, status="sent").count()
+        return {"tick": (sent, [q["sql"] for c in captured for q in c.captured_queries])}
+
+    def _check(self, name, budget, small, large):
+        (_, small_sql), (_, large_sql) = small, large
+        if len(small_sql) == len(large_sql) and len(large_sql) <= budget:
+            return
+        listing = "\n".join(f"  {i + 1}. {sql[:300]}" for i, sql in enumerate(large_sql))
+        self.fail(f"{name}: {len(small_sql)} queries at {SMALL} rows, {len(large_sql)} at {LARGE} rows "
+                  f"(budget {budget}). Queries at {LARGE} rows:\n{listing}")
+
+    def test_endpoint_query_budgets(self):
+        small = self._measure(SMALL, self._endpoints)
+        large = self._measure(LARGE, self._endpoints)
+        for name, (budget, *_) in BUDGETS.items():
+            with self.subTest(endpoint=name):
+                self.assertLess(large[name][0], 400, f"{name} returned {large[name][0]}")
+                self._check(name, budget, small[name], large[name])
+
+    def test_reminder_tick_query_budget(self):
+        small = self._measure(SMALL, self._tick)["tick"]
+        large = self._measure(LARGE, self._tick)["tick"]
+        self.assertGreater(large[0], small[0])  # the larger backlog really was delivered
+        self._check("send_reminders", TICK_BUDGET, small, large)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create(username="search@uniplan.local")
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + _sign(self.user.username))
+        self.math = Subject.objects.create(user=self.user, name="Linear Algebra", code="MATH201")
+        self.lab = Task.objects.create(user=self.user, subject=self.math, title="Matrix lab",
+                                       description="eigenvalues worksheet", external_id="lab")
+        self.essay = Task.objects.create(user=self.user, title="Essay on history",
+                                         description="mention the matrix in passing", external_id="essay")
+        other = get_user_model().objects.create(username="other@uniplan.local")
+        Task.objects.create(user=other, title="Matrix lab")
+
+    def _ids(self, **params):
+        resp = self.client.get("/api/search", params)
+        self.assertEqual(resp.status_code, 200)
+        return [t["id"] for t in resp.data["tasks"]], [s["id"] for s in resp.data["subjects"]]
+
+    def test_ranks_title_hits_first_and_stays_per_user(self):
+        tasks, subjects = self._ids(q="matr")
+        self.assertEqual(tasks, [self.lab.pk, self.essay.pk])
+        self.assertEqual(subjects, [])
+        self.assertEqual(self._ids(q="linear alg")[1], [self.math.pk])
+        self.assertEqual(self._ids(q="matrix history")[0], [self.essay.pk])  # every term required
+
+    def test_subject_filter_and_index_refresh(self):
+        self.assertEqual(self._ids(q="matrix", subject=self.math.pk)[0], [self.lab.pk])
+        self.essay.title = "Eigenvalues essay"
+        self.essay.save()
+        self.assertEqual(self._ids(q="eigen")[0], [self.essay.pk, self.lab.pk])
+        self.assertEqual(self.client.get("/api/search", {"q": "x", "subject": 0}).status_code, 400)
+
+
+class TaskStatsTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username="stats@uniplan.local")
+        self.subject = Subject.objects.create(user=self.user, name="Physics", code="PHY")
+        now = timezone.now()
+        self.tasks = [Task.objects.create(user=self.user, subject=self.subject if i % 2 else None, title=f"T{i}",
+                                          external_id=f"t{i}", due_at=now + timedelta(days=i - 2, hours=1))
+                      for i in range(10)]
+
+    def assertCountersExact(self):
+        live = task_stats.aggregate([self.user.pk], task_stats.watermark())
+        stored = {(self.user.pk, r.pop("subject_id")): r
+                  for r in self.user.task_counters.values("subject_id", *task_stats.FIELDS)}
+        self.assertEqual({k: v for k, v in stored.items() if any(v.values())},
+                         {k: v for k, v in live.items() if any(v.values())})
+
+    def test_counters_follow_writes_rolls_and_subject_deletes(self):
+        self.assertCountersExact()
+        self.tasks[0].status = TaskStatus.COMPLETED
+        self.tasks[0].save()
+        Task.objects.get(pk=self.tasks[3].pk).delete()
+        moved = Task.objects.only("id", "title").get(pk=self.tasks[4].pk)  # counted fields deferred
+        moved.due_at = timezone.now() + timedelta(days=30)
+        moved.save()
+        self.assertCountersExact()
+
+        task_stats.roll(timezone.now() + timedelta(days=2))  # two more tasks fall due, two enter the week
+        self.assertCountersExact()
+        self.subject.delete()
+        self.assertCountersExact()
+
+        resp = self.client.get("/api/stats", HTTP_AUTHORIZATION="Bearer " + _sign(self.user.username))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data["totals"]["not_started"], 8)
+        self.assertEqual(resp.data["totals"]["completed"], 1)
+
+    def test_rebuild_repairs_drift(self):
+        self.user.task_counters.update(overdue=99)
+        self.assertEqual(task_stats.rebuild([self.user.pk]), 2)
+        self.assertCountersExact()
+
+
+@override_settings(TIME_ZONE="Asia/Bangkok")
+class CalendarTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create(username="cal@uniplan.local")
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + _sign(self.user.username))
+        self.math = Subject.objects.create(user=self.user, name="Math", code="M1", location="B-201")
+        # Mondays, only from Thursday 5 to Friday 20 March 2026; Wednesdays always
+        self.windowed = TimetableEntry.objects.create(user=self.user, subject=self.math, day_of_week=1,
+                                                      start_time=dtime(9), end_time=dtime(10),
+                                                      effective_from=date(2026, 3, 5),
+                                                      effective_to=date(2026, 3, 20))
+        self.always = TimetableEntry.objects.create(user=self.user, subject=self.math, day_of_week=3,
+                                                    start_time=dtime(13), end_time=dtime(14), room="Lab")
+        at = lambda d, h: timezone.make_aware(datetime.combine(d, dtime(h)))
+        self.once = Task.objects.create(user=self.user, title="Essay", due_at=at(date(2026, 3, 10), 12),
+                                        external_id="once")
+        self.weekly = Task.objects.create(user=self.user, subject=self.math, title="Quiz", rrule="FREQ=WEEKLY",
+                                          due_at=at(date(2026, 3, 3), 8), external_id="weekly")
+
+    def _occurrences(self, start, end):
+        resp = self.client.get("/api/calendar", {"from": start, "to": end})
+        self.assertEqual(resp.status_code, 200)
+        return [(o["date"], o["start"][11:16], o["kind"], o["entry"] or o["task"]) for o in resp.data["occurrences"]]
+
+    def test_classes_clipped_to_their_window_and_merged_with_tasks(self):
+        w, a, once, weekly = self.windowed.pk, self.always.pk, self.once.pk, self.weekly.pk
+        self.assertEqual(self._occurrences("2026-03-01", "2026-03-21"), [
+            ("2026-03-03", "08:00", "task", weekly),
+            ("2026-03-04", "13:00", "class", a),
+            ("2026-03-09", "09:00", "class", w),  # Monday 2 March is before the window
+            ("2026-03-10", "08:00", "task", weekly),
+            ("2026-03-10", "12:00", "task", once),
+            ("2026-03-11", "13:00", "class", a),
+            ("2026-03-16", "09:00", "class", w),
+            ("2026-03-17", "08:00", "task", weekly),
+            ("2026-03-18", "13:00", "class", a),
+        ])
+        occ = self.client.get("/api/calendar", {"from": "2026-03-11", "to": "2026-03-11"}).data["occurrences"]
+        self.assertEqual(len(occ), 1)
+        self.assertEqual((occ[0]["id"], occ[0]["room"], occ[0]["end"]),
+                         (f"class:{a}:2026-03-11", "Lab", "2026-03-11T14:00:00+07:00"))
+
+    def test_cached_weeks_follow_a_timetable_edit(self):
+        self.assertIn(("2026-03-16", "09:00", "class", self.windowed.pk),
+                      self._occurrences("2026-03-15", "2026-03-21"))
+        resp = self.client.patch(f"/api/timetable/{self.windowed.pk}/", {"effective_to": "2026-03-12"},
+                                 format="json")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self._occurrences("2026-03-08", "2026-03-21"), [
+            ("2026-03-09", "09:00", "class", self.windowed.pk),
+            ("2026-03-10", "08:00", "task", self.weekly.pk),
+            ("2026-03-10", "12:00", "task", self.once.pk),
+            ("2026-03-11", "13:00", "class", self.always.pk),
+            ("2026-03-17", "08:00", "task", self.weekly.pk),
+            ("2026-03-18", "13:00", "class", self.always.pk),
+        ])
+
+
+class FreeSlotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create(username="free@uniplan.local")
+        self.subject = Subject.objects.create(user=self.user, name="Chem", code="CHM")
+        self.monday = timezone.localdate() + timedelta(days=(7 - timezone.localdate().weekday()) % 7 or 7)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + _sign(self.user.username))
+
+    def _slots(self, **params):
+        resp = self.client.get("/api/free-slots", {"from": self.monday, "to": self.monday, "day_start": "08:00",
+                                                   "day_end": "18:00", **params})
+        self.assertEqual(resp.status_code, 200)
+        return [(s["start"][11:16], s["end"][11:16]) for s in resp.data["slots"]]
+
+    def test_gaps_between_classes_respect_minimum_and_effective_dates(self):
+        entry = TimetableEntry.objects.create(user=self.user, subject=self.subject, day_of_week=1,
+                                              start_time=dtime(9), end_time=dtime(10, 32))
+        TimetableEntry.objects.create(user=self.user, subject=self.subject, day_of_week=1,
+                                      start_time=dtime(11), end_time=dtime(12),
+                                      effective_from=self.monday + timedelta(days=7))
+        self.assertEqual(self._slots(), [("08:00", "09:00"), ("10:35", "18:00")])
+        self.assertEqual(self._slots(min=61), [("10:35", "18:00")])
+
+        entry.end_time = dtime(10)
+        entry.save()  # timetable writes retire the cached bitmap
+        next_week = self.monday + timedelta(days=7)
+        self.assertEqual(self._slots(**{"from": next_week, "to": next_week}),
+                         [("08:00", "09:00"), ("10:00", "11:00"), ("12:00", "18:00")])
+
+    def test_impossible_dates_are_a_bad_request(self):
+        for path in ("/api/calendar", "/api/free-slots", "/api/workload"):
+            for dates in ({"from": "2026-02-30", "to": "2026-03-02"}, {"from": "2026-03-01", "to": "2026-13-01"}):
+                with self.subTest(path=path, **dates):
+                    self.assertEqual(self.client.get(path, dates).status_code, 400)
+
+    def test_malformed_day_bounds_are_a_bad_request(self):
+        for bounds in ({"day_start": "8am"}, {"day_end": "6pm"}, {"day_end": "25:00"}, {"day_end": "07:00"}):
+            with self.subTest(**bounds):
+                params = {"from": self.monday, "to": self.monday, "day_start": "08:00", **bounds}
+                self.assertEqual(self.client.get("/api/free-slots", params).status_code, 400)
+
+
+@override_settings(PLAN_DAY_START="08:00", PLAN_DAY_END="18:00", PLAN_HORIZON_DAYS=21)
+class PlannerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create(username="plan@uniplan.local")
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + _sign(self.user.username))
+        self.soon = timezone.now() + timedelta(days=3)
+
+    def _plan(self):
+        resp = self.client.get("/api/plan")
+        self.assertEqual(resp.status_code, 200)
+        return resp.data
+
+    def test_edf_with_priority_and_incremental_replan(self):
+        later = Task.objects.create(user=self.user, title="Later", due_at=self.soon + timedelta(days=5),
+                                    estimate_minutes=60, external_id="later")
+        urgent = Task.objects.create(user=self.user, title="Urgent", due_at=self.soon + timedelta(days=5, hours=12),
+                                     priority="high", estimate_minutes=60, external_id="urgent")
+        first = Task.objects.create(user=self.user, title="First", due_at=self.soon, estimate_minutes=300,
+                                    external_id="first")
+        plan = self._plan()
+        self.assertEqual(plan["unscheduled"], [])
+        booked = {}
+        for s in plan["sessions"]:
+            booked.setdefault(s["task"], []).append(s)
+            self.assertLessEqual(s["minutes"], 120)
+        self.assertEqual({t: sum(s["minutes"] for s in ss) for t, ss in booked.items()},
+                         {first.pk: 300, urgent.pk: 60, later.pk: 60})
+        # high priority is pulled ahead of the task due half a day earlier
+        self.assertLess(booked[urgent.pk][0]["start"], booked[later.pk][0]["start"])
+        self.assertLess(booked[first.pk][-1]["start"], booked[urgent.pk][0]["start"])
+
+        self.assertEqual(self._plan()["replanned"], 0)
+        later.estimate_minutes = 90
+        later.save()
+        plan = self._plan()
+        self.assertEqual(plan["replanned"], 1)  # only the last task in EDF order moved
+        self.assertEqual(sum(s["minutes"] for s in plan["sessions"] if s["task"] == later.pk), 90)
+
+        first.status = TaskStatus.COMPLETED
+        first.save()
+        self.assertEqual(self._plan()["replanned"], 2)
+
+    def test_replan_later_in_the_day_books_nothing_in_the_past(self):
+        today = timezone.localdate()
+        morning, evening = (timezone.make_aware(datetime.combine(today, dtime(h))) for h in (8, 14))
+        with mock.patch("django.utils.timezone.now", return_value=morning):
+            kept = Task.objects.create(user=self.user, title="Kept", due_at=morning + timedelta(days=3),
+                                       estimate_minutes=60, external_id="kept")
+            plan = self._plan()
+        self.assertLess(plan["sessions"][0]["start"], evening.isoformat())  # booked in the morning
+
+        with mock.patch("django.utils.timezone.now", return_value=evening):
+            Task.objects.create(user=self.user, title="Added", due_at=evening + timedelta(days=4),
+                                estimate_minutes=60, external_id="added")
+            plan = self._plan()
+        self.assertEqual(plan["replanned"], 2)  # the kept task's slots have passed
+        self.assertEqual(plan["unscheduled"], [])
+        self.assertEqual(len({s["task"] for s in plan["sessions"]} - {kept.pk}), 1)
+        for s in plan["sessions"]:
+            self.assertGreater(datetime.fromisoformat(s["start"]), evening)
+
+
+class IdempotencyTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username="retry@uniplan.local", email="retry@uniplan.local")
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + _sign(self.user.username))
+        self.intake = {"assignmentId": "cw-9", "title": "Lab report", "courseName": "Bio",
+                       "dueISO": (timezone.now() + timedelta(days=5)).isoformat(),
+                       "remindAtISO": (timezone.now() + timedelta(days=4)).isoformat()}
+
+    def test_retry_replays_first_response_without_redoing_the_work(self):
+        first = self.client.post("/api/reminders/intake/", self.intake, format="json", HTTP_IDEMPOTENCY_KEY="k1")
+        self.assertEqual(first.status_code, 201)
+        counts = (Task.objects.count(), Reminder.objects.count())
+        with self.assertNumQueries(2):
+            retry = self.client.post("/api/reminders/intake/", self.intake, format="json", HTTP_IDEMPOTENCY_KEY="k1")
+        self.assertEqual((retry.status_code, retry.json()), (201, first.json()))
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual((Task.objects.count(), Reminder.objects.count()), counts)
+
+        other = self.client.post("/api/reminders/intake/", {**self.intake, "title": "Other"}, format="json",
+                                 HTTP_IDEMPOTENCY_KEY="k1")
+        self.assertEqual(other.status_code, 422)
+
+    def test_expired_key_and_failed_validation(self):
+        bad = self.client.post("/api/tasks/", {"title": ""}, format="json", HTTP_IDEMPOTENCY_KEY="k2")
+        self.assertEqual(bad.status_code, 400)
+        self.assertEqual(self.client.post("/api/tasks/", {"title": ""}, format="json",
+                                          HTTP_IDEMPOTENCY_KEY="k2").status_code, 400)
+        self.user.idempotency_records.update(expires_at=timezone.now() - timedelta(seconds=1))
+        ok = self.client.post("/api/tasks/", {"title": "Now valid", "source": "manual", "external_id": "v"},
+                              format="json", HTTP_IDEMPOTENCY_KEY="k2")
+        self.assertEqual(ok.status_code, 201)
+        call_command("apply_retention", stdout=StringIO())
+        self.assertEqual(self.user.idempotency_records.count(), 1)
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username="metrics@uniplan.local")
+        Subject.objects.create(user=self.user, name="Physics", code="PHY")
+        self.auth = {"HTTP_AUTHORIZATION": "Bearer " + _sign(self.user.username)}
+
+    def _record(self, logs):
+        return json.loads(logs.records[-1].getMessage())
+
+    def test_off_by_default(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            RequestMetricsMiddleware(lambda request: HttpResponse())
+        self.assertNotIn("Server-Timing", self.client.get("/api/subjects/", **self.auth))
+
+    @override_settings(REQUEST_METRICS=True, SLOW_REQUEST_MS=60_000)
+    def test_server_timing_and_log_line(self):
+        with self.assertLogs("uniplan.requests", "INFO") as logs, self.assertNoLogs("uniplan.slow"):
+            resp = self.client.get("/api/subjects/", **self.auth)
+        record = self._record(logs)
+        self.assertEqual((record["view"], record["status"]), ("subject-list", 200))
+        self.assertGreater(record["queries"], 0)
+        self.assertEqual(len(record["slowest"]), min(3, record["queries"]))
+        timing = dict(part.split(";", 1) for part in resp["Server-Timing"].split(", "))
+        self.assertEqual(timing.keys(), {"db", "google", "app", "total"})
+        self.assertIn(f'desc="{record["queries"]} queries"', timing["db"])
+
+    @override_settings(REQUEST_METRICS=True, SLOW_REQUEST_MS=0)
+    def test_slow_requests_log_their_sql(self):
+        with self.assertLogs("uniplan.requests", "INFO"), self.assertLogs("uniplan.slow", "WARNING") as logs:
+            self.client.get("/api/subjects/", **self.auth)
+        record = self._record(logs)
+        self.assertEqual(len(record["sql"]), record["queries"])
+        self.assertTrue(any("core_subject" in q["sql"] for q in record["sql"]))
+
+    @override_settings(REQUEST_METRICS=True, SLOW_REQUEST_MS=0)
+    def test_streamed_body_is_timed_until_it_is_sent(self):
+        with self.assertNoLogs("uniplan.requests"):
+            resp = self.client.get("/api/export", **self.auth)
+        self.assertIn("Server-Timing", resp)  # up to the first byte
+        with self.assertLogs("uniplan.requests", "INFO"), self.assertLogs("uniplan.slow", "WARNING") as logs:
+            b"".join(resp.streaming_content)
+        record = self._record(logs)
+        # the export reads every model while the body goes out
+        self.assertTrue(any("core_classroomassignment" in q["sql"] for q in record["sql"]))
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.user = get_user_model().objects.create(username="ops@uniplan.local", email="ops@uniplan.local")
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + _sign(self.user.username))
+
+    def test_staff_only_and_tagged_with_view(self):
+        with override_settings(PROFILE_DIR=self.dir):
+            resp = self.client.get("/api/stats", HTTP_X_PROFILE="sample")
+            self.assertEqual(resp.status_code, 200)
+            self.assertNotIn("X-Profile-File", resp)
+            self.assertEqual(os.listdir(self.dir), [])
+
+            self.user.is_staff = True
+            self.user.save()
+            resp = self.client.get("/api/stats", HTTP_X_PROFILE="cprofile")
+            self.assertEqual(resp.status_code, 200)
+            self.assertIn("stats", resp["X-Profile-File"])
+            self.assertTrue(resp["X-Profile-File"].endswith(".prof"))
+            folded = self.client.get("/api/stats?profile=1")["X-Profile-File"]
+            self.assertTrue(folded.endswith(".folded"))
+            self.assertEqual(sorted(os.listdir(self.dir)), sorted([resp["X-Profile-File"], folded]))
+
+    def test_send_reminders_profiles_ticks(self):
+        out = StringIO()
+        call_command("send_reminders", "--profile", "1", "--profile-dir", self.dir, stdout=out)
+        self.assertIn("profile written to", out.getvalue())
+        self.assertEqual(len(os.listdir(self.dir)), 1)
+
+
+class LoadToolTests(TransactionTestCase):
+    # bench_load's client threads only see committed rows
+
+    def test_seed_data_then_bench_load_on_a_tiny_dataset(self):
+        seed = ["--users", "2", "--prefix", "smoke", "--subjects", "2", "--tasks", "5", "--chunk", "1"]
+        call_command("seed_data", *seed, stdout=StringIO())
+        users = list(get_user_model().objects.filter(username__startswith="smoke").values_list("id", flat=True))
+        counts = lambda: (TimetableEntry.objects.count(), Task.objects.count(), Reminder.objects.count())
+        before = counts()
+        self.assertEqual(len(users), 2)
+        self.assertGreater(before[1], 0)
+        self.assertTrue(all(get_generation("calendar", uid) for uid in users))  # cached views retired
+        dashboard = task_stats.dashboard(users[0])
+
+        call_command("seed_data", *seed, stdout=StringIO())  # again, without --clear
+        self.assertEqual(counts(), before)
+        self.assertEqual(task_stats.dashboard(users[0])["totals"], dashboard["totals"])
+        self.assertEqual(task_stats.rebuild(users), 0)
+
+        out = StringIO()
+        call_command("bench_load", "--prefix", "smoke", "--requests", "2", "--concurrency", "1", "--warmup", "1",
+                     "--only", "tasks", "ical_feed", "--ticks", "1", stdout=out)
+        report = out.getvalue()
+        self.assertRegex(report, r"tasks +[\d.]+ +[\d.]+ +[\d.]+ +[\d.]+ +0\n")
+        self.assertRegex(report, r"ical_feed +[\d.]+ +[\d.]+ +[\d.]+ +[\d.]+ +0\n")
+        self.assertIn("send_reminders tick:", report)
+
+
+class ReminderWorkerTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username="w@uniplan.local", email="w@uniplan.local")
+        now = timezone.now()
+        self.reminders = [
+            Reminder.objects.create(task=Task.objects.create(user=self.user, title=f"T{i}", external_id=str(i),
+                                                             due_at=now + timedelta(days=1)),
+                                    notify_at=now - timedelta(minutes=i + 1), status="pending")
+            for i in range(2)
+        ]
+
+    def test_stop_signal_finishes_the_batch_then_exits(self):
+        def kill_after_send(*args, **kwargs):
+            os.kill(os.getpid(), signal.SIGTERM)
+            return 1
+
+        with mock.patch("core.management.commands.send_reminders.DELIVERY_BATCH", 1), \
+                mock.patch("core.management.commands.send_reminders.send_mail", side_effect=kill_after_send):
+            call_command("send_reminders", "--loop", "--worker-name", "w1", stdout=StringIO())
+        statuses = sorted(Reminder.objects.values_list("status", flat=True))
+        self.assertEqual(statuses, ["pending", "sent"])  # first batch recorded, nothing left claimed
+        hb = WorkerHeartbeat.objects.get(name="w1")
+        self.assertEqual((hb.state, hb.ticks), ("stopped", 1))
+
+    def test_emails_are_recorded_as_sent_while_the_batch_goes_out(self):
+        seen = []
+
+        def send(*args, **kwargs):
+            seen.append(sorted(Reminder.objects.values_list("status", flat=True)))
+            return 1
+
+        with mock.patch("core.management.commands.send_reminders.SENT_FLUSH", 1), \
+                mock.patch("core.management.commands.send_reminders.send_mail", side_effect=send):
+            call_command("send_reminders", "--worker-name", "w1", stdout=StringIO())
+        # a crash during the second send would re-send only that one
+        self.assertEqual(seen, [["sending", "sending"], ["sending", "sent"]])
+        self.assertFalse(Reminder.objects.exclude(status="sent").exists())
+
+    def test_startup_recovers_claims_of_a_dead_worker(self):
+        Reminder.objects.filter(pk=self.reminders[0].pk).update(status="sending")
+        WorkerHeartbeat.objects.create(name="live", pid=1, state="running", interval_seconds=60,
+                                       started_at=timezone.now(), beat_at=timezone.now())
+        call_command("send_reminders", "--worker-name", "w1", stdout=StringIO())
+        self.assertEqual(Reminder.objects.get(pk=self.reminders[0].pk).status, "sending")  # "live" may hold it
+
+        WorkerHeartbeat.objects.filter(name="live").update(state="stopped")
+        call_command("send_reminders", "--worker-name", "w1", stdout=StringIO())
+        self.assertFalse(Reminder.objects.exclude(status="sent").exists())
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_turned_in_classroom_work_is_completed_instead_of_reminded(self):
+        GoogleAccount.objects.create(email=self.user.email, credentials={})
+        due = timezone.now() + timedelta(days=1)
+        handed_in, open_ = [Task.objects.create(user=self.user, title=ext, source="classroom", external_id=ext,
+                                                due_at=due) for ext in ("c1:s1", "c1:s2")]
+        for t in (handed_in, open_):
+            Reminder.objects.create(task=t, notify_at=timezone.now() - timedelta(minutes=1), status="pending")
+        task_stats.dashboard(self.user.pk)  # counters exist, so the bulk completion has to keep them right
+        service = mock.MagicMock()
+        subs = service.courses.return_value.courseWork.return_value.studentSubmissions.return_value
+        subs.list.return_value.execute.return_value = {"studentSubmissions": [{"id": "s1", "state": "TURNED_IN"}]}
+        with mock.patch("google.oauth2.credentials.Credentials.from_authorized_user_info",
+                        return_value=mock.MagicMock(expired=False)), \
+                mock.patch("googleapiclient.discovery.build", return_value=service):
+            call_command("send_reminders", "--worker-name", "w1", stdout=StringIO())
+
+        subs.list.assert_called_once()
+        self.assertEqual(subs.list.call_args.kwargs["courseId"], "c1")
+        handed_in.refresh_from_db()
+        self.assertEqual(handed_in.status, TaskStatus.COMPLETED)
+        self.assertEqual(handed_in.reminders.get().status, "skipped_completed")
+        self.assertEqual(open_.reminders.get().status, "sent")
+        self.assertEqual(len(mail.outbox), 3)  # the two from setUp and the open classroom task
+        self.assertEqual(task_stats.rebuild([self.user.pk]), 0)
+
+    def test_a_configuration_error_in_the_classroom_check_fails_the_tick(self):
+        GoogleAccount.objects.create(email=self.user.email, credentials={})
+        t = Task.objects.create(user=self.user, title="cw", source="classroom", external_id="c1:s1",
+                                due_at=timezone.now() + timedelta(days=1))
+        Reminder.objects.create(task=t, notify_at=timezone.now() - timedelta(minutes=1), status="pending")
+        err = StringIO()
+        with mock.patch("google.oauth2.credentials.Credentials.from_authorized_user_info",
+                        return_value=mock.MagicMock(expired=False)), \
+                mock.patch("core.views._service", side_effect=ImproperlyConfigured("no client")), \
+                self.assertRaises(ImproperlyConfigured):
+            call_command("send_reminders", "--worker-name", "w1", stdout=StringIO(), stderr=err)
+        self.assertNotIn("reminding anyway", err.getvalue())
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_worker_health(self):
+        with self.assertRaises(CommandError):
+            call_command("worker_health", "--worker-name", "w1", stdout=StringIO())
+        call_command("send_reminders", "--worker-name", "w1", stdout=StringIO())
+        with self.assertRaises(CommandError):  # a one-shot run leaves the row stopped
+            call_command("worker_health", "--worker-name", "w1", stdout=StringIO())
+        WorkerHeartbeat.objects.filter(name="w1").update(state="running")
+        call_command("worker_health", "--worker-name", "w1", stdout=StringIO())
+        WorkerHeartbeat.objects.filter(name="w1").update(beat_at=timezone.now() - timedelta(hours=1))
+        with self.assertRaises(CommandError):
+            call_command("worker_health", "--worker-name", "w1", stdout=StringIO())
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username="move@uniplan.local", email="move@uniplan.local")
+        math = Subject.objects.create(user=self.user, name="Linear Algebra", code="MATH201")
+        TimetableEntry.objects.create(user=self.user, subject=math, day_of_week=1, start_time=dtime(9),
+                                      end_time=dtime(10, 30), effective_from=timezone.localdate())
+        task = Task.objects.create(user=self.user, subject=math, title="Matrix lab ✓", external_id="lab",
+                                   due_at=timezone.now() + timedelta(days=3), estimate_minutes=90)
+        Reminder.objects.create(task=task, notify_at=task.due_at - timedelta(days=1), status="pending")
+        course = ClassroomCourse.objects.create(user=self.user, google_course_id="c1", name="Algebra", subject=math)
+        ClassroomAssignment.objects.create(classroom_course=course, google_assignment_id="a1", title="Lab", task=task)
+        Task.objects.filter(pk=task.pk).update(created_at=timezone.now() - timedelta(days=30))
+
+    def _snapshot(self):
+        # every column but user_id: the restored account is a new user row
+        return {name: list(model.objects.filter(**{owner: self.user.pk}).order_by("pk")
+                           .values_list(*export._fields(model)))
+                for name, model, owner in export.MODELS}
+
+    def test_export_then_import_restores_every_row(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Bearer " + _sign(self.user.username))
+        resp = client.get("/api/export")
+        self.assertEqual(resp["Content-Type"], "application/gzip")
+        data = gzip.decompress(b"".join(resp.streaming_content))
+        lines = data.decode().splitlines()
+        self.assertEqual(json.loads(lines[0])["user"], self.user.email)
+        self.assertEqual(len(lines), 1 + 6)
+
+        before = self._snapshot()
+        path = os.path.join(tempfile.mkdtemp(), "export.jsonl.gz")
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        with open(path, "wb") as fh:
+            fh.write(gzip.compress(data))
+        with self.assertRaises(CommandError):  # ids still taken
+            call_command("import_user_data", path, stdout=StringIO())
+
+        email = self.user.email
+        self.user.delete()
+        call_command("import_user_data", path, "--chunk", "1", stdout=StringIO())
+        self.user = get_user_model().objects.get(username=email)
+        self.assertEqual(self._snapshot(), before)
+        self.assertEqual(task_stats.dashboard(self.user.pk)["totals"]["not_started"], 1)
+
+
+@override_settings(GOOGLE_CLIENT_ID="client-1.apps.googleusercontent.com")
+class GoogleIdTokenTests(TestCase):
+    def setUp(self):
+        import datetime
+        from cryptography import x509
+        from cryptography.hazmat.primitives import hashes, serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+        from cryptography.x509.oid import NameOID
+        from google.auth import crypt
+
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "test")])
+        now = datetime.datetime.now(datetime.timezone.utc)
+        cert = (x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+                .serial_number(1).not_valid_before(now).not_valid_after(now + datetime.timedelta(days=1))
+                .sign(key, hashes.SHA256()))
+        self.certs = {"k1": cert.public_bytes(serialization.Encoding.PEM).decode()}
+        pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                serialization.NoEncryption())
+        self.signer = crypt.RSASigner.from_string(pem, key_id="k1")
+        google_id._state.update(certs={}, expires=0.0, refreshing=False)
+        self.addCleanup(google_id._state.update, certs={}, expires=0.0, refreshing=False)
+
+    def _token(self, **claims):
+        from google.auth import jwt
+        now = int(timezone.now().timestamp())
+        payload = {"iss": "https://accounts.google.com", "aud": "client-1.apps.googleusercontent.com",
+                   "iat": now, "exp": now + 3600, "sub": "1", "email": "idt@uniplan.local",
+                   "name": "Id Token", "picture": "https://example.com/p.png", **claims}
+        return jwt.encode(self.signer, payload).decode()
+
+    def test_callback_uses_verified_claims_without_userinfo(self):
+        flow = mock.MagicMock()
+        flow.credentials.id_token = self._token()
+        flow.credentials.to_json.return_value = "{}"
+        with mock.patch("core.views._flow", return_value=flow), \
+                mock.patch.object(google_id, "_fetch", return_value=(self.certs, 3600)) as fetch, \
+                mock.patch("googleapiclient.discovery.build") as build:
+            resp = self.client.get("/api/auth/google/callback?code=abc")
+            self.assertEqual(resp.status_code, 302)
+            self.client.get("/api/auth/google/callback?code=abc")
+        build.assert_not_called()
+        self.assertEqual(fetch.call_count, 1)  # certificates cached across logins
+        self.assertEqual(GoogleAccount.objects.get(email="idt@uniplan.local").name, "Id Token")
+
+    def test_rejects_bad_tokens_and_refreshes_ahead_of_expiry(self):
+        with mock.patch.object(google_id, "_fetch", return_value=(self.certs, 3600)) as fetch:
+            self.assertEqual(google_id.verify(self._token())["email"], "idt@uniplan.local")
+            for bad in (self._token(aud="someone-else"), self._token(iss="https://evil.example"),
+                        self._token(exp=int(timezone.now().timestamp()) - 3600)):
+                with self.assertRaises(ValueError):
+                    google_id.verify(bad)
+            google_id._state["expires"] = time.monotonic() + 60  # inside REFRESH_AHEAD
+            with mock.patch.object(google_id, "_refresh_in_background") as background:
+                google_id.verify(self._token())
+            background.assert_called_once()
+            self.assertEqual(fetch.call_count, 1)  # served from the current keys meanwhile
+
+
+class WorkloadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create(username="load@uniplan.local")
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + _sign(self.user.username))
+        self.math = Subject.objects.create(user=self.user, name="Algebra", code="M1")
+        self.monday = timezone.localdate() - timedelta(days=timezone.localdate().weekday()) + timedelta(days=7)
+        noon = lambda d: timezone.make_aware(datetime.combine(d, dtime(12)))
+        Task.objects.create(user=self.user, subject=self.math, title="a", external_id="a",
+                            priority=Priority.HIGH, due_at=noon(self.monday))
+        Task.objects.create(user=self.user, title="b", external_id="b", priority=Priority.LOW,
+                            due_at=noon(self.monday + timedelta(days=1)))
+        Task.objects.create(user=self.user, subject=self.math, title="c", external_id="c",
+                            due_at=noon(self.monday + timedelta(days=8)), status=TaskStatus.COMPLETED)
+        self.noon = noon
+
+    def _get(self, **params):
+        resp = self.client.get("/api/workload", {"from": self.monday + timedelta(days=2),
+                                                 "to": self.monday + timedelta(days=13), **params})
+        self.assertEqual(resp.status_code, 200)
+        return resp.data
+
+    def test_weekly_bins_by_priority_and_subject(self):
+        for np in (workload._numpy(), None):  # numpy when installed, and the plain Python fallback
+            with self.subTest(numpy=np is not None), mock.patch.object(workload, "_numpy", return_value=np):
+                cache.clear()
+                data = self._get()
+                self.assertEqual(data["from"], self.monday)  # whole weeks from Monday
+                self.assertEqual([s["subject"] for s in data["subjects"]], [self.math.pk, None])
+                self.assertEqual([(b["tasks"], b["load"], b["by_subject"]) for b in data["bins"]],
+                                 [(2, 4.0, [3.0, 1.0]), (1, 2.0, [2.0, 0.0])])
+                data = self._get(bucket="day", open="true")
+                self.assertEqual([b["tasks"] for b in data["bins"]], [0] * 12)  # day bins start at `from`
+
+    def test_cached_until_a_task_changes(self):
+        self._get()
+        with self.assertNumQueries(2):  # authentication and the generation
+            self._get()
+        Task.objects.create(user=self.user, title="d", external_id="d", due_at=self.noon(self.monday))
+        self.assertEqual(self._get()["bins"][0]["tasks"], 3)
+
+    def test_bump_from_another_process_retires_the_cache(self):
+        self.assertEqual(self._get(open="true")["bins"][0]["tasks"], 2)
+        # the reminder worker's bulk path, run against a cache of its own as in a separate process
+        worker_cache = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "worker"}}
+        with override_settings(CACHES=worker_cache):
+            classroom_sync.complete_turned_in(list(Task.objects.filter(title="a")))
+        self.assertEqual(self._get(open="true")["bins"][0]["tasks"], 1)
+
+
+class CalendarFeedTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username="feed@uniplan.local")
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + _sign(self.user.username))
+
+    def _feed(self, url):
+        resp = self.client.get(url)
+        return resp.status_code, b"".join(resp.streaming_content).decode() if resp.status_code == 200 else ""
+
+    def test_recurring_task_keeps_its_wall_clock_hour(self):
+        for tzid, rules in (("America/New_York", ("BYMONTH=3;BYDAY=2SU", "BYMONTH=11;BYDAY=1SU")),
+                            ("Europe/Berlin", ("BYMONTH=3;BYDAY=-1SU", "BYMONTH=10;BYDAY=-1SU"))):
+            with self.subTest(tz=tzid), override_settings(TIME_ZONE=tzid):
+                due = timezone.make_aware(datetime(timezone.now().year, 1, 13, 9))
+                task = Task.objects.create(user=self.user, title="Lab", rrule="FREQ=WEEKLY", due_at=due)
+                _, body = self._feed(self.client.get("/api/calendar/feed-url").data["url"])
+                self.assertIn(f"DTSTART;TZID={tzid}:{due:%Y%m%d}T090000", body)
+                for rule in rules:
+                    self.assertIn(f"RRULE:FREQ=YEARLY;{rule}", body)
+
+                # the VTIMEZONE puts every weekly occurrence at 09:00, as the server expands it
+                from dateutil.tz import tzical
+                block = body[body.index("BEGIN:VTIMEZONE"):body.index("END:VTIMEZONE") + len("END:VTIMEZONE")]
+                client_tz = tzical(StringIO(block.replace("\r\n", "\n"))).get()
+                for week in (0, 12, 30, 45):
+                    wall = (due + timedelta(weeks=week)).replace(tzinfo=None)
+                    self.assertEqual(wall.replace(tzinfo=client_tz).utcoffset(),
+                                     timezone.make_aware(wall).utcoffset(), wall)
+                task.delete()
+
+    def test_rotating_the_secret_revokes_old_links(self):
+        old = self.client.get("/api/calendar/feed-url").data["url"]
+        self.assertEqual(self.client.get("/api/calendar/feed-url").data["url"], old)  # stable until rotated
+        self.assertEqual(self._feed(old)[0], 200)
+        new = self.client.post("/api/calendar/feed-url").data["url"]
+        self.assertNotEqual(new, old)
+        self.assertEqual(self._feed(old)[0], 404)
+        self.assertEqual(self._feed(new)[0], 200)
+
+
+@override_settings(TIME_ZONE="Europe/Berlin", RECURRING_REMINDER_HORIZON_DAYS=14)
+class RecurrenceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create(username="rrule@uniplan.local")
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + _sign(self.user.username))
+
+    def test_weekly_task_expands_on_wall_clock_across_dst(self):
+        year = timezone.localdate().year + 1
+        march = [d for d in (datetime(year, 3, day) for day in range(1, 32)) if d.weekday() == 0]
+        due = timezone.make_aware(march[1].replace(hour=9))  # second Monday of March, 09:00 CET
+        Task.objects.create(user=self.user, title="Lab", rrule="FREQ=WEEKLY;COUNT=6", due_at=due)
+
+        resp = self.client.get("/api/calendar", {"from": date(year, 3, 1), "to": date(year, 5, 31)})
+        starts = [o["start"] for o in resp.data["occurrences"] if o["kind"] == "task"]
+        self.assertEqual(len(starts), 6)  # COUNT holds across the 28-day expansion windows
+        self.assertTrue(all(s[11:19] == "09:00:00" for s in starts), starts)
+        self.assertEqual({s[19:] for s in starts}, {"+01:00", "+02:00"})  # the same 09:00 on both sides of DST
+
+    def test_reminders_materialize_a_horizon_at_a_time(self):
+        now = timezone.now().replace(microsecond=0)
+        task = Task.objects.create(user=self.user, title="Quiz", rrule="FREQ=WEEKLY", due_at=now + timedelta(days=2))
+        upsert_email_reminder(task, 1)
+        # compared as wall-clock times: a weekly series keeps its hour when DST starts or ends
+        wall = lambda dt: timezone.localtime(dt).replace(tzinfo=None)
+        notify = lambda: [wall(n) for n in Reminder.objects.filter(task=task).order_by("notify_at")
+                          .values_list("notify_at", flat=True)]
+        self.assertEqual(notify(), [wall(now) + timedelta(days=1), wall(now) + timedelta(days=8)])  # 14 days ahead
+
+        self.assertEqual(schedule_recurring_reminders(now=now), 0)  # nothing new entered the horizon
+        schedule_recurring_reminders(now=now + timedelta(days=7))
+        self.assertEqual(notify()[1:], [wall(now) + timedelta(days=8), wall(now) + timedelta(days=15)])
+
+        task.status = TaskStatus.COMPLETED
+        task.save()
+        self.assertEqual(schedule_recurring_reminders(now=now + timedelta(days=30)), 0)  # finished series stop
+
+
+@override_settings(TIME_ZONE="Asia/Bangkok")
+class FastReadPathTests(TestCase):
+    def test_list_endpoints_match_the_serializers(self):
+        user, _ = _seed(3)
+        Task.objects.create(user=user, title="No date", source="manual", external_id="nodate")
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Bearer " + _sign(user.username))
+        for path in ("/api/subjects/", "/api/timetable/", "/api/tasks/", "/api/reminders/"):
+            with self.subTest(path=path):
+                with override_settings(FAST_READ_PATH=False):
+                    slow = client.get(path)
+                with override_settings(FAST_READ_PATH=True):
+                    fast = client.get(path)
+                self.assertEqual(fast.status_code, 200)
+                self.assertTrue(json.loads(slow.content))
+                self.assertEqual(json.loads(fast.content), json.loads(slow.content))
+
+
+class SyncTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username="sync@uniplan.local", email="sync@uniplan.local")
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + _sign(self.user.username))
+
+    def _task(self, title, **fields):
+        return Task.objects.create(user=self.user, title=title, external_id=fields.pop("external_id", title),
+                                   due_at=timezone.now() + timedelta(days=3), **fields)
+
+    def test_delta_has_changed_rows_and_tombstones_including_bulk_writes(self):
+        now = timezone.now()
+        kept, gone_subject = (Subject.objects.create(user=self.user, name=n, code=n) for n in ("Kept", "Gone"))
+        untouched, edited, deleted, mailed = (self._task(t) for t in ("untouched", "edited", "deleted", "mailed"))
+        turned_in = self._task("turned in", source="classroom", external_id="c1:s1")
+        moved = self._task("moved", source="classroom", external_id="c1:s2")
+        due_mail = Reminder.objects.create(task=mailed, notify_at=now - timedelta(minutes=1), status="pending")
+        dropped = Reminder.objects.create(task=untouched, notify_at=now + timedelta(days=1), status="pending")
+        skipped = Reminder.objects.create(task=turned_in, notify_at=now + timedelta(days=1), status="pending")
+        shifted = Reminder.objects.create(task=moved, notify_at=now + timedelta(days=2), status="pending")
+        Reminder.objects.create(task=deleted, notify_at=now + timedelta(days=1), status="pending")
+        for model in (Subject, Task, Reminder):  # everything so far predates the token
+            model.objects.update(updated_at=now - timedelta(hours=1))
+        token = _sign_sync(timezone.now())
+        gone_ids = {"subjects": [gone_subject.pk], "timetable": [], "tasks": [deleted.pk], "reminders": [dropped.pk]}
+
+        edited.title = "edited again"
+        edited.save()
+        deleted.delete()
+        gone_subject.delete()
+        dropped.delete()
+        # the bulk UPDATE paths: reminder worker delivery (046) and turned-in work (050), reconcile (039)
+        call_command("send_reminders", stdout=StringIO())
+        classroom_sync.complete_turned_in([turned_in])
+        classroom_sync.reconcile(self.user.pk, {"c1:s1": {"title": "turned in", "due_at": turned_in.due_at},
+                                                "c1:s2": {"title": "moved", "due_at": moved.due_at + timedelta(days=1)}},
+                                 {"c1"})
+
+        data = self.client.get("/api/sync", {"since": token}).data
+        self.assertFalse(data["full"])
+        self.assertEqual(sorted(t["id"] for t in data["tasks"]), [edited.pk, mailed.pk, turned_in.pk, moved.pk])
+        self.assertEqual(sorted(r["id"] for r in data["reminders"]), [due_mail.pk, skipped.pk, shifted.pk])
+        self.assertEqual(data["subjects"], [])
+        self.assertEqual(data["deleted"], gone_ids)  # a deleted task's reminders go with it, without tombstones
+        self.assertNotEqual(data["token"], token)
+
+        full = self.client.get("/api/sync").data
+        self.assertTrue(full["full"])
+        self.assertEqual([s["id"] for s in full["subjects"]], [kept.pk])
+        self.assertEqual(len(full["tasks"]), 5)
+
+    def test_account_deletion_leaves_no_tombstones_and_bad_tokens_are_rejected(self):
+        self._task("t")
+        self.assertEqual(self.client.get("/api/sync", {"since": "forged"}).status_code, 400)
+        self.user.delete()
+        self.assertFalse(Tombstone.objects.exists())
+
+
+class ReplicaStickinessTests(TestCase):
+    def _middleware(self, write=False):
+        def view(request):
+            seen.append(is_pinned())
+            if write:
+                Subject.objects.filter(pk=0).update(name="x")
+            return HttpResponse("ok")
+        seen = []
+        return ReplicaStickinessMiddleware(view), seen
+
+    def test_pin_travels_with_the_client_to_any_process(self):
+        factory = RequestFactory()
+        replica = {**settings.DATABASES, "replica": settings.DATABASES["default"]}
+        with mock.patch.dict(settings.DATABASES, replica), override_settings(DB_REPLICA_STICKY_SECONDS=10):
+            writer, _ = self._middleware(write=True)
+            response = writer(factory.get("/api/tasks/"))  # a GET whose view happens to write
+            cookie = response.cookies[PIN_COOKIE]
+            self.assertEqual(cookie["max-age"], 10)
+
+            other, seen = self._middleware()  # another worker, no shared memory
+            other(factory.get("/api/tasks/"))
+            request = factory.get("/api/tasks/")
+            request.COOKIES[PIN_COOKIE] = cookie.value
+            response = other(request)
+            self.assertEqual(seen, [False, True])
+            self.assertNotIn(PIN_COOKIE, response.cookies)  # reads don't extend the window
+
+            request = factory.get("/api/tasks/")
+            request.COOKIES[PIN_COOKIE] = cookie.value
+            with mock.patch("django.core.signing.time.time", return_value=time.time() + 11):
+                other(request)
+            request.COOKIES[PIN_COOKIE] = "1:forged"
+            other(request)
+            self.assertEqual(seen[2:], [False, False])  # expired, forged
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    # committed rows, so the mirror's own connection sees them
+
+    def setUp(self):
+        self.user = get_user_model().objects.create(username="replica@uniplan.local", email="replica@uniplan.local")
+        self.router = PrimaryReplicaRouter()
+
+    @contextmanager
+    def _replica_alias(self):
+        """A "replica" alias mirroring the test database, as DB_REPLICA_NAME sets one up (TEST: MIRROR)."""
+        if "replica" in settings.DATABASES:
+            yield connections["replica"]
+            return
+        primary = connections["default"].settings_dict
+        mirror = {**primary, "TEST": {**primary["TEST"], "MIRROR": "default"}}
+        connections.settings["replica"] = mirror
+        try:
+            with mock.patch.dict(settings.DATABASES, {"replica": mirror}), \
+                    mock.patch.object(type(self), "databases", self.databases | {"replica"}):
+                yield connections["replica"]
+        finally:
+            connections["replica"].close()
+            del connections["replica"]
+            del connections.settings["replica"]
+
+    def test_router(self):
+        self.assertEqual(self.router.db_for_read(Task), "default")  # no replica configured
+        with self._replica_alias():
+            self.assertEqual(self.router.db_for_read(Task), "replica")
+            with transaction.atomic():
+                self.assertEqual(self.router.db_for_read(Task), "default")
+            with use_primary():
+                self.assertEqual(self.router.db_for_read(Task), "default")
+
+            token = pin_primary(False)
+            try:
+                with connections["default"].execute_wrapper(pin_on_write):
+                    Subject.objects.filter(user=self.user).exists()
+                    self.assertEqual(self.router.db_for_read(Task), "replica")  # reads don't pin
+                    Subject.objects.create(user=self.user, name="Chem")
+                self.assertEqual(self.router.db_for_read(Task), "default")  # after a write
+            finally:
+                reset_pin(token)
+            self.assertEqual(self.router.db_for_read(Task), "replica")
+
+    def test_reminder_claims_stay_on_the_primary(self):
+        task = Task.objects.create(user=self.user, title="T", external_id="t", due_at=timezone.now() + timedelta(days=1))
+        Reminder.objects.create(task=task, notify_at=timezone.now() - timedelta(minutes=1), status="pending")
+        with self._replica_alias() as replica, CaptureQueriesContext(replica) as on_replica:
+            call_command("send_reminders", "--worker-name", "w1", stdout=StringIO())
+        self.assertEqual(on_replica.captured_queries, [])
+        self.assertEqual(Reminder.objects.get().status, "sent")
+
+    def test_api_reads_the_replica_until_the_client_writes(self):
+        Subject.objects.create(user=self.user, name="Physics", code="PHY")
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Bearer " + _sign(self.user.username))
+        with self._replica_alias() as replica:
+            with CaptureQueriesContext(replica) as on_replica:
+                resp = client.get("/api/subjects/")
+            self.assertEqual([s["name"] for s in resp.data], ["Physics"])
+            self.assertTrue(any("core_subject" in q["sql"] for q in on_replica.captured_queries))
+
+            resp = client.post("/api/subjects/", {"name": "Biology", "code": "BIO"}, format="json")
+            self.assertEqual(resp.status_code, 201)
+            self.assertIn(PIN_COOKIE, resp.cookies)
+            with CaptureQueriesContext(replica) as on_replica, \
+                    CaptureQueriesContext(connections["default"]) as on_primary:
+                resp = client.get("/api/subjects/")  # the client carries the pin cookie
+            self.assertEqual(sorted(s["name"] for s in resp.data), ["Biology", "Physics"])
+            self.assertEqual(on_replica.captured_queries, [])
+            self.assertTrue(any("core_subject" in q["sql"] for q in on_primary.captured_queries))
+
+
+class RetentionTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username="archive@uniplan.local")
+        self.now = timezone.now()
+        self.long_ago = self.now - timedelta(days=400)
+
+    def _done_task(self, i, when):
+        task = Task.objects.create(user=self.user, title=f"Done {i}", external_id=f"done{i}",
+                                   status=TaskStatus.COMPLETED, due_at=when, rrule="FREQ=WEEKLY",
+                                   reminder_days_before=3, estimate_minutes=90, source="classroom",
+                                   priority=Priority.HIGH)
+        Task.objects.filter(pk=task.pk).update(completed_at=when, source_deleted_at=when)
+        Reminder.objects.create(task=task, notify_at=when, delivered_at=when, status="sent")
+        Reminder.objects.create(task=task, notify_at=when, channel=ReminderChannel.IN_APP, status="pending")
+        return task
+
+    def test_chunks_resume_and_copy_every_column(self):
+        old = [self._done_task(i, self.long_ago) for i in range(5)]
+        recent = self._done_task(9, self.now - timedelta(days=1))
+        open_task = Task.objects.create(user=self.user, title="Open", external_id="open")
+        for i in range(3):
+            Reminder.objects.create(task=open_task, notify_at=self.long_ago + timedelta(hours=i),
+                                    delivered_at=self.long_ago, status="sent")
+        Reminder.objects.create(task=open_task, notify_at=self.now, delivered_at=self.now, status="sent")
+        cutoff = self.now - timedelta(days=180)
+        live = {t["id"]: t for t in Task.objects.filter(pk__in=[t.pk for t in old]).values()}
+        reminders = {r["id"]: r for r in Reminder.objects.filter(task__in=old).values()}
+        reminders.update({r["id"]: r for r in Reminder.objects.filter(task=open_task, delivered_at__lt=cutoff)
+                          .values()})
+
+        class OneChunk:  # a run that hits --max-seconds after its first chunk
+            exhausted, calls = False, 0
+
+            def next_chunk(self):
+                self.calls += 1
+                self.exhausted = self.calls > 1
+                return not self.exhausted
+
+            def rest(self):
+                pass
+
+        budget = OneChunk()
+        self.assertEqual(retention.archive_tasks(cutoff, self.now, chunk=2, budget=budget), (2, 4))
+        self.assertTrue(budget.exhausted)
+
+        out = StringIO()
+        call_command("apply_retention", "--chunk", "2", stdout=out)
+        self.assertIn("archived 3 task(s) with 6 reminder(s), 3 delivered reminder(s)", out.getvalue())
+        self.assertEqual(set(Task.objects.values_list("pk", flat=True)), {recent.pk, open_task.pk})
+        self.assertEqual(Reminder.objects.filter(task=open_task).count(), 1)
+
+        archived = {t["id"]: t for t in ArchivedTask.objects.values()}
+        self.assertEqual(archived.keys(), live.keys())
+        for pk, row in live.items():
+            self.assertEqual({k: archived[pk][k] for k in row}, row)
+        archived_reminders = {r["id"]: r for r in ArchivedReminder.objects.values()}
+        self.assertEqual(len(archived_reminders), 13)  # 5 tasks x 2, plus 3 delivered on the open task
+        for pk, row in reminders.items():
+            self.assertEqual({k: archived_reminders[pk][k] for k in row}, row)
+        self.assertEqual(Tombstone.objects.filter(model="task").count(), 5)
+        self.assertEqual(Tombstone.objects.filter(model="reminder").count(), 3)
+
+        dashboard = task_stats.dashboard(self.user.pk)
+        task_stats.rebuild([self.user.pk])
+        self.assertEqual(task_stats.dashboard(self.user.pk), dashboard)  # counters followed the bulk deletes
+
+    def test_purge_deletes_without_archiving(self):
+        self._done_task(0, self.long_ago)
+        out = StringIO()
+        call_command("apply_retention", "--purge", stdout=out)
+        self.assertIn("purged 1 task(s) with 2 reminder(s)", out.getvalue())
+        self.assertFalse(Task.objects.exists())
+        self.assertFalse(ArchivedTask.objects.exists() or ArchivedReminder.objects.exists())
+
+    def test_archive_tables_have_every_live_column(self):
+        for live, archive in ((Task, ArchivedTask), (Reminder, ArchivedReminder)):
+            missing = set(retention.TASK_FIELDS if live is Task else retention.REMINDER_FIELDS) - {
+                f.attname for f in archive._meta.concrete_fields}
+            self.assertFalse(missing, f"{archive.__name__} lacks {sorted(missing)}")
+
+
+@override_settings(GOOGLE_QUOTA_USER_PER_MINUTE=2, GOOGLE_QUOTA_GLOBAL_PER_MINUTE=3,
+                   GOOGLE_QUOTA_COOLDOWN_SECONDS=30)
+class GoogleQuotaTests(TestCase):
+    NOW = 1_000 * quota.WINDOW + 1  # just into a window, so the previous one weighs in fully
+
+    def setUp(self):
+        cache.clear()
+        clock = mock.patch.object(quota, "time", mock.Mock(time=lambda: self.NOW))
+        clock.start()
+        self.addCleanup(clock.stop)
+        self.user = get_user_model().objects.create(username="quota@uniplan.local", email="quota@uniplan.local")
+        GoogleAccount.objects.create(email=self.user.email, credentials={})
+        self.auth = {"HTTP_AUTHORIZATION": "Bearer " + _sign(self.user.email)}
+
+    def _spent(self, scope):
+        return cache.get(f"gquota:{scope}:{int(self.NOW // quota.WINDOW)}", 0)
+
+    def test_user_and_global_budgets_refuse_without_spending(self):
+        with quota.charged_to("a"):
+            quota.acquire()
+            quota.acquire()
+            with self.assertRaises(quota.QuotaExceeded) as refused:
+                quota.acquire()
+        self.assertEqual(refused.exception.scope, "user")
+        self.assertEqual(refused.exception.retry_after, quota.WINDOW - 1)
+        self.assertEqual((self._spent("user:a"), self._spent("global")), (2, 2))
+
+        with quota.charged_to("b"):
+            quota.acquire()
+            with self.assertRaises(quota.QuotaExceeded) as refused:
+                quota.acquire()
+        self.assertEqual(refused.exception.scope, "global")
+        self.assertEqual((self._spent("user:b"), self._spent("global")), (1, 3))  # b's refused call refunded
+
+    def test_a_429_from_google_cools_every_caller_down(self):
+        from core.views import _google
+
+        throttled = Exception("rate limited")
+        throttled.resp = mock.Mock(status=429)
+        with self.assertRaises(quota.QuotaExceeded) as refused:
+            _google(mock.Mock(side_effect=throttled))
+        self.assertEqual((refused.exception.scope, refused.exception.retry_after), ("upstream", 30))
+        with quota.charged_to("someone-else"), self.assertRaises(quota.QuotaExceeded):
+            quota.acquire()
+        self.assertEqual(self._spent("user:someone-else"), 0)
+
+    def test_a_per_process_cache_is_a_startup_warning_not_an_error(self):
+        self.assertEqual([w.id for w in google_quota_cache(None)], ["core.W001"])
+        with override_settings(GOOGLE_QUOTA_ALLOW_LOCAL_CACHE=True):
+            self.assertEqual(google_quota_cache(None), [])
+        with quota.charged_to("a"):
+            quota.acquire()  # the budget still applies, per process
+        self.assertEqual(self._spent("user:a"), 1)
+
+    def test_classroom_proxy_serves_the_last_good_response_while_over_budget(self):
+        service = _google_service(2, self.user.email)
+        creds = mock.MagicMock(expired=False)
+        with mock.patch("googleapiclient.discovery.build", return_value=service), \
+                mock.patch("google.oauth2.credentials.Credentials.from_authorized_user_info", return_value=creds):
+            fresh = self.client.get("/api/classroom/courses", **self.auth)
+            self.assertEqual(fresh.status_code, 200)
+            self.assertNotIn("X-UniPlan-Stale", fresh)
+            with override_settings(GOOGLE_QUOTA_USER_PER_MINUTE=0):
+                stale = self.client.get("/api/classroom/courses", **self.auth)
+                missing = self.client.get("/api/classroom/active-submissions/c0", **self.auth)
+        self.assertEqual(stale.status_code, 200)
+        self.assertEqual(stale.content, fresh.content)
+        self.assertEqual((stale["X-UniPlan-Stale"], stale["Retry-After"]), ("1", str(quota.WINDOW - 1)))
+        self.assertEqual(missing.status_code, 429)  # nothing remembered for that URL
+        self.assertEqual(missing["Retry-After"], str(quota.WINDOW - 1))
+
+    def test_sign_in_over_budget_goes_back_to_the_app(self):
+        quota.cool_down(30)
+        with mock.patch("core.views._flow") as flow, \
+                mock.patch.dict(os.environ, {"FRONTEND_REDIRECT": "https://app.example"}):
+            resp = self.client.get("/api/auth/google/callback?code=abc")
+        flow.return_value.fetch_token.assert_not_called()
+        self.assertEqual(resp.status_code, 302)
+        self.assertEqual(resp["Location"], "https://app.example?error=google_busy&retry_after=30")
+        self.assertEqual(resp["Retry-After"], "30")
+
+
+class ClassroomReconcileTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username="recon@uniplan.local")
+        self.now = timezone.now().replace(microsecond=0)
+
+    def _task(self, key, days, **fields):
+        task = Task.objects.create(user=self.user, title=f"CW {key}", source=classroom_sync.SOURCE,
+                                   external_id=key, due_at=self.now + timedelta(days=days), **fields)
+        pending = Reminder.objects.create(task=task, notify_at=task.due_at - timedelta(days=1), status="pending")
+        sent = Reminder.objects.create(task=task, notify_at=task.due_at - timedelta(days=2),
+                                       delivered_at=self.now, status="sent")
+        return task, pending, sent
+
+    def test_moves_flags_and_restores_by_the_diff(self):
+        moved, moved_pending, moved_sent = self._task("c1:s1", 3)
+        later, later_pending, _ = self._task("c1:s2", 5)
+        gone, gone_pending, gone_sent = self._task("c1:s3", 4)
+        unread, unread_pending, _ = self._task("c2:s1", 4)  # course c2 was not read this pass
+        back, _, _ = self._task("c1:s4", 6, source_deleted_at=self.now - timedelta(days=1))
+        dashboard = task_stats.dashboard(self.user.pk)
+
+        remote = {
+            "c1:s1": {"title": "Renamed", "due_at": moved.due_at + timedelta(days=6, hours=3)},
+            "c1:s2": {"title": later.title, "due_at": later.due_at - timedelta(hours=5)},
+            "c1:s4": {"title": back.title, "due_at": back.due_at},
+        }
+        counts = classroom_sync.reconcile(self.user.pk, remote, {"c1"}, now=self.now)
+        self.assertEqual(counts, {"updated": 2, "rescheduled": 2, "reminders_shifted": 2,
+                                  "flagged_deleted": 1, "restored": 1})
+
+        for obj in (moved, moved_pending, moved_sent, later, later_pending, gone, gone_pending, gone_sent,
+                    unread, unread_pending, back):
+            obj.refresh_from_db()
+        self.assertEqual((moved.title, moved.due_at), ("Renamed", remote["c1:s1"]["due_at"]))
+        self.assertEqual(moved_pending.notify_at, moved.due_at - timedelta(days=1))  # shifted by its own delta
+        self.assertEqual(later_pending.notify_at, later.due_at - timedelta(days=1))
+        self.assertEqual(moved_sent.notify_at, self.now + timedelta(days=1))  # delivered: left where it was
+
+        self.assertEqual(gone.source_deleted_at, self.now)
+        self.assertEqual((gone_pending.status, gone_pending.delivered_at), ("skipped_deleted", self.now))
+        self.assertEqual(gone_sent.status, "sent")
+        self.assertIsNone(unread.source_deleted_at)
+        self.assertEqual(unread_pending.status, "pending")
+        self.assertIsNone(back.source_deleted_at)
+
+        self.assertEqual(classroom_sync.reconcile(self.user.pk, remote, {"c1"}, now=self.now),
+                         {"updated": 0, "rescheduled": 0, "reminders_shifted": 0,
+                          "flagged_deleted": 0, "restored": 0})  # a second pass finds nothing to do
+        self.assertNotEqual(task_stats.dashboard(self.user.pk), dashboard)  # c1:s1 left the coming week
+        fresh = task_stats.dashboard(self.user.pk)
+        task_stats.rebuild([self.user.pk])
+        self.assertEqual(task_stats.dashboard(self.user.pk), fresh)  # counters followed the bulk update
+
+
+class _StreamClient:
+    """One EventSource connection driven through the ASGI app with a fake receive/send pair."""
+
+    def __init__(self, token=None, last_event_id=None):
+        from mysite.asgi import application
+
+        headers = [(b"authorization", f"Bearer {token}".encode())] if token else []
+        if last_event_id is not None:
+            headers.append((b"last-event-id", str(last_event_id).encode()))
+        self.received, self.sent = asyncio.Queue(), asyncio.Queue()
+        scope = {"type": "http", "method": "GET", "path": STREAM_PATH, "query_string": b"", "headers": headers}
+        self.task = asyncio.ensure_future(application(scope, self.received.get, self.sent.put))
+
+    async def _next(self):
+        return await asyncio.wait_for(self.sent.get(), timeout=5)
+
+    async def status(self):
+        return (await self._next())["status"]
+
+    async def event(self):
+        """(event name, id, data) of the next event, keep-alives skipped."""
+        while True:
+            body = (await self._next())["body"].decode()
+            if not body.startswith(":"):
+                break
+        fields = dict(line.split(": ", 1) for line in body.strip().splitlines())
+        return fields["event"], int(fields.get("id", 0)), json.loads(fields["data"])
+
+    async def close(self):
+        await self.received.put({"type": "http.disconnect"})
+        await asyncio.wait_for(self.task, timeout=5)
+
+
+@override_settings(NOTIFICATION_POLL_SECONDS=0.01, NOTIFICATION_KEEPALIVE_SECONDS=5)
+class NotificationStreamTests(TransactionTestCase):
+    # the stream's database steps run outside a request and close stale connections
+    # as one would, which a TestCase transaction wouldn't survive
+
+    def setUp(self):
+        User = get_user_model()
+        self.alice = User.objects.create(username="alice@uniplan.local")
+        self.bob = User.objects.create(username="bob@uniplan.local")
+
+    async def _hub_stopped(self):
+        if hub._task is not None:
+            await asyncio.wait_for(hub._task, timeout=5)  # it winds down once nobody listens
+
+    async def test_rejects_a_bad_token(self):
+        client = _StreamClient(token="not-a-token")
+        self.assertEqual(await client.status(), 401)
+        await asyncio.wait_for(client.task, timeout=5)
+
+    async def test_replays_after_last_event_id_then_pushes_new_rows(self):
+        first, second, third = [await sync_to_async(notify)(self.alice.pk, f"N{i}") for i in range(3)]
+        client = _StreamClient(token=_sign(self.alice.username), last_event_id=first.pk)
+        self.assertEqual(await client.status(), 200)
+        self.assertEqual([(await client.event())[:2] for _ in range(2)],
+                         [("notification", second.pk), ("notification", third.pk)])
+        self.assertEqual(await client.event(), ("unread", 0, {"unread": 3}))
+
+        pushed = await sync_to_async(notify)(self.alice.pk, "Live", "body")
+        name, event_id, data = await client.event()
+        self.assertEqual((name, event_id, data["title"], data["body"], data["unread"]),
+                         ("notification", pushed.pk, "Live", "body", 4))
+        await client.close()
+        await self._hub_stopped()
+
+    async def test_a_late_subscriber_only_gets_what_arrives_after(self):
+        alice = _StreamClient(token=_sign(self.alice.username))
+        self.assertEqual(await alice.status(), 200)
+        await alice.event()  # the unread badge
+        await sync_to_async(notify)(self.bob.pk, "while only alice listened")
+        mark = await sync_to_async(notify)(self.alice.pk, "for alice")
+        self.assertEqual((await alice.event())[1], mark.pk)  # the hub has polled past bob's row
+
+        bob = _StreamClient(token=_sign(self.bob.username))
+        self.assertEqual(await bob.status(), 200)
+        await bob.event()
+        fresh = await sync_to_async(notify)(self.bob.pk, "for bob")
+        self.assertEqual((await bob.event())[1], fresh.pk)
+        await alice.close()
+        await bob.close()
+        await self._hub_stopped()
+
+        await sync_to_async(notify)(self.bob.pk, "while nobody listened")
+        bob = _StreamClient(token=_sign(self.bob.username))
+        self.assertEqual(await bob.status(), 200)
+        await bob.event()
+        fresh = await sync_to_async(notify)(self.bob.pk, "after the hub restarted")
+        self.assertEqual((await bob.event())[1], fresh.pk)
+        await bob.close()
+        await self._hub_stopped()
@@ -1,20 +1,16 @@
 # backend/core/views.py
-import json, os, urllib.parse
+import json, logging, os, urllib.parse
+from functools import wraps
 from django.conf import settings
-from django.http import JsonResponse, HttpResponseBadRequest
+from django.http import JsonResponse, HttpResponse, HttpResponseBadRequest, StreamingHttpResponse, Http404
 from django.shortcuts import redirect
 from django.views.decorators.http import require_GET
 from django.core.signing import dumps, loads, BadSignature, SignatureExpired
 
-from google_auth_oauthlib.flow import Flow
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from google.auth.transport.requests import Request
-
 from .models import GoogleAccount
 from rest_framework import viewsets, permissions, status
-from .models import Subject, TimetableEntry, Task, Reminder, ClassroomCourse, ClassroomAssignment, OAuthAccount
-from rest_framework.decorators import api_view, permission_classes
+from .models import Subject, TimetableEntry, Task, Reminder, ClassroomCourse, ClassroomAssignment, OAuthAccount, Notification
+from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
 from django.core.mail import send_mail
 from rest_framework import mixins
@@ -27,11 +23,31 @@ from .serializers import (
     ClassroomAssignmentSerializer,
     OAuthAccountSerializer,
     ReminderIntakeSerializer,  # <-- add this here
+    NotificationSerializer,
 )
 from rest_framework.permissions import IsAuthenticated
 
-from django.utils.dateparse import parse_datetime
-
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime, parse_date, parse_time
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from .services.calendar import calendar_occurrences
+from .fastread import FastListMixin, json_datetime
+from .idempotency import IdempotentCreateMixin
+from .services.reminders import next_reminder_subquery
+from .services.ical import feed_fingerprint, feed_secret, iter_ical
+from .services.sync import sync_changes
+from .services import classroom_sync
+from .services.search import search as search_tasks
+from .services.export import iter_export
+from .services import task_stats
+from .services.free_slots import free_slots as find_free_slots
+from .services.planner import study_plan
+from .services.workload import BUCKETS, workload as task_workload
+from .services import google_id, notifications, quota
+from .instrumentation import span
+
+logger = logging.getLogger(__name__)
 
 # ---- Scopes----
 SCOPES = [
@@ -66,12 +82,99 @@ def _unsign(token: str):
     except (BadSignature, SignatureExpired, KeyError):
         return None
 
-def _creds_for(email: str):
+# calendar apps can't send headers or refresh tokens, so feed links don't expire;
+# they carry the user's feed secret instead, and rotating it revokes them
+def _sign_feed(user_id: int, secret: str) -> str:
+    return dumps({"uid": user_id, "key": secret}, salt="uniplan.ics", key=settings.SECRET_KEY)
+
+def _unsign_feed(token: str):
+    """(user id, feed secret), or (None, None) for a bad token."""
     try:
-        acc = GoogleAccount.objects.get(pk=email)
-    except GoogleAccount.DoesNotExist:
+        data = loads(token, salt="uniplan.ics", key=settings.SECRET_KEY)
+        return data["uid"], data["key"]
+    except (BadSignature, KeyError, TypeError):
+        return None, None
+
+def _sign_sync(at) -> str:
+    return dumps({"t": at.isoformat()}, salt="uniplan.sync", key=settings.SECRET_KEY)
+
+def _unsign_sync(token: str):
+    try:
+        return parse_datetime(loads(token, salt="uniplan.sync", key=settings.SECRET_KEY)["t"])
+    except (BadSignature, KeyError, TypeError, ValueError):
         return None
-    return Credentials.from_authorized_user_info(acc.credentials, SCOPES)
+
+# ---- Google client stack ----
+# Imported on first use, not at module load: URL loading imports this module,
+# so every manage.py command would otherwise pay for it (see bench_imports).
+def _flow():
+    from google_auth_oauthlib.flow import Flow
+    return Flow.from_client_config(
+        _client_config(), scopes=SCOPES, redirect_uri=settings.GOOGLE_REDIRECT_URI
+    )
+
+def _creds_for(email: str):
+    """(GoogleAccount, Credentials) for the email, or (None, None)."""
+    from google.oauth2.credentials import Credentials
+
+    acc = GoogleAccount.objects.filter(pk=email).first()
+    if acc is None:
+        return None, None
+    return acc, Credentials.from_authorized_user_info(acc.credentials, SCOPES)
+
+def _service(name: str, version: str, creds):
+    """API client; build() reads the bundled discovery doc, so no round trip (and no budget)."""
+    from googleapiclient.discovery import build
+
+    with span("google"):
+        return build(name, version, credentials=creds)
+
+def _google(call, *args, **kwargs):
+    """
+    Run an outbound Google call, timed into the request's Server-Timing and
+    charged to the API budget (services/quota.py).
+    """
+    quota.acquire()
+    with span("google"):
+        try:
+            return call(*args, **kwargs)
+        except Exception as e:
+            if getattr(getattr(e, "resp", None), "status", None) == 429:
+                quota.cool_down(settings.GOOGLE_QUOTA_COOLDOWN_SECONDS)
+                raise quota.QuotaExceeded("upstream", settings.GOOGLE_QUOTA_COOLDOWN_SECONDS) from e
+            raise
+
+def _quota_guarded(view):
+    """
+    Classroom proxies: Google calls are charged to the caller, and when the
+    caller (or the whole project) is over budget the last good response for
+    the same URL is served instead, else 429 with Retry-After.
+    """
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        authz = request.META.get("HTTP_AUTHORIZATION", "")
+        email = _unsign(authz.split(" ", 1)[1]) if authz.startswith("Bearer ") else None
+        if not email:
+            return view(request, *args, **kwargs)  # _require_auth answers 401
+
+        path = request.get_full_path()
+        try:
+            with quota.charged_to(email):
+                resp = view(request, *args, **kwargs)
+        except quota.QuotaExceeded as e:
+            cached = quota.last_good(email, path)
+            if cached is None:
+                resp = JsonResponse({"detail": "Google API budget exceeded, try again shortly."}, status=429)
+            else:
+                resp = HttpResponse(cached, content_type="application/json")
+                resp["X-UniPlan-Stale"] = "1"
+            resp["Retry-After"] = str(e.retry_after)
+            return resp
+
+        if resp.status_code == 200:
+            quota.remember(email, path, resp.content)
+        return resp
+    return wrapped
 
 @require_GET
 def hello(request):
@@ -80,9 +183,7 @@ def hello(request):
 # ---- OAuth ----
 @require_GET
 def google_login(request):
-    flow = Flow.from_client_config(
-        _client_config(), scopes=SCOPES, redirect_uri=settings.GOOGLE_REDIRECT_URI
-    )
+    flow = _flow()
     auth_url, _ = flow.authorization_url(
         access_type="offline",
         include_granted_scopes="true",
@@ -90,20 +191,39 @@ def google_login(request):
     )
     return JsonResponse({"auth_url": auth_url})
 
+def _id_claims(creds) -> dict:
+    """Claims of the ID token from the code exchange, verified locally; {} if absent or not valid."""
+    if not creds.id_token:
+        return {}
+    try:
+        return google_id.verify(creds.id_token)
+    except Exception as e:
+        logger.warning("ID token not usable, falling back to userinfo: %s", e)
+        return {}
+
 @require_GET
 def google_callback(request):
     code = request.GET.get("code")
     if not code:
         return HttpResponseBadRequest("Missing code")
 
-    flow = Flow.from_client_config(
-        _client_config(), scopes=SCOPES, redirect_uri=settings.GOOGLE_REDIRECT_URI
-    )
-    flow.fetch_token(code=code)
-    creds: Credentials = flow.credentials
-
-    oauth2 = build("oauth2", "v2", credentials=creds)
-    me = oauth2.userinfo().get().execute()
+    frontend_redirect = os.getenv("FRONTEND_REDIRECT", "http://localhost:5173")
+    flow = _flow()
+    try:
+        _google(flow.fetch_token, code=code)
+        creds = flow.credentials
+
+        # the ID token already carries email / name / picture; userinfo only if it doesn't
+        me = _id_claims(creds)
+        if not me.get("email"):
+            oauth2 = _service("oauth2", "v2", creds)
+            me = _google(oauth2.userinfo().get().execute)
+    except quota.QuotaExceeded as e:
+        # over the Google API budget: back to the app with the wait, instead of a 500
+        qs = urllib.parse.urlencode({"error": "google_busy", "retry_after": e.retry_after})
+        resp = redirect(f"{frontend_redirect}?{qs}")
+        resp["Retry-After"] = str(e.retry_after)
+        return resp
     email = me.get("email")
     name = me.get("name", "")
     picture = me.get("picture", "")
@@ -114,7 +234,6 @@ def google_callback(request):
     )
 
     token = _sign(email)
-    frontend_redirect = os.getenv("FRONTEND_REDIRECT", "http://localhost:5173")
 
     qs = urllib.parse.urlencode({"token": token, "email": email, "name": name, "picture": picture})
     return redirect(f"{frontend_redirect}?{qs}")
@@ -129,35 +248,37 @@ def _require_auth(request):
     if not email:
         return None, JsonResponse({"detail": "Invalid/expired token"}, status=401)
 
-    creds = _creds_for(email)
+    acc, creds = _creds_for(email)
     if not creds:
         return None, JsonResponse({"detail": "No Google credentials stored"}, status=401)
 
-    # refresh if needed and persist
+    _refresh_if_expired(acc, creds)
+    return (email, creds), None
+
+def _refresh_if_expired(acc, creds):
+    # refresh if needed and persist (on the row we already loaded)
     if creds.expired and creds.refresh_token:
-        creds.refresh(Request())
-        try:
-            acc = GoogleAccount.objects.get(pk=email)
-            acc.credentials = json.loads(creds.to_json())
-            acc.save(update_fields=["credentials"])
-        except GoogleAccount.DoesNotExist:
-            pass
+        from google.auth.transport.requests import Request
 
-    return (email, creds), None
+        _google(creds.refresh, Request())
+        acc.credentials = json.loads(creds.to_json())
+        acc.save(update_fields=["credentials"])
 
 # ---- Classroom API ----
 @require_GET
+@_quota_guarded
 def list_courses(request):
     """Return ACTIVE courses only."""
     auth, err = _require_auth(request)
     if err: return err
     _, creds = auth
 
-    classroom = build("classroom", "v1", credentials=creds)
-    data = classroom.courses().list(pageSize=50, courseStates=["ACTIVE"]).execute()
+    classroom = _service("classroom", "v1", creds)
+    data = _google(classroom.courses().list(pageSize=50, courseStates=["ACTIVE"]).execute)
     return JsonResponse(data)
 
 @require_GET
+@_quota_guarded
 def list_active_submissions(request, course_id: str):
     """
     Return *my* active (pending) submissions for a given course,
@@ -169,15 +290,15 @@ def list_active_submissions(request, course_id: str):
         return err
     _, creds = auth
 
-    classroom = build("classroom", "v1", credentials=creds)
+    classroom = _service("classroom", "v1", creds)
 
     # fetch my active submissions
-    data = classroom.courses().courseWork().studentSubmissions().list(
+    data = _google(classroom.courses().courseWork().studentSubmissions().list(
         courseId=course_id,
         courseWorkId="-",  # all coursework in the course
         pageSize=100,
         states=["NEW", "CREATED", "RECLAIMED_BY_STUDENT"],
-    ).execute()
+    ).execute)
 
     subs = data.get("studentSubmissions", [])
     if not subs:
@@ -188,9 +309,11 @@ def list_active_submissions(request, course_id: str):
     cw_map = {}
     for cw_id in cw_ids:
         try:
-            cw_map[cw_id] = classroom.courses().courseWork().get(
+            cw_map[cw_id] = _google(classroom.courses().courseWork().get(
                 courseId=course_id, id=cw_id
-            ).execute()
+            ).execute)
+        except quota.QuotaExceeded:
+            raise
         except Exception:
             pass  # ignore if missing
 
@@ -211,14 +334,15 @@ def list_active_submissions(request, course_id: str):
     return JsonResponse({"studentSubmissions": subs})
 
 @require_GET
+@_quota_guarded
 def summary(request):
     """Small summary for the header."""
     auth, err = _require_auth(request)
     if err: return err
     email, creds = auth
 
-    classroom = build("classroom", "v1", credentials=creds)
-    courses = classroom.courses().list(pageSize=50, courseStates=["ACTIVE"]).execute().get("courses", [])
+    classroom = _service("classroom", "v1", creds)
+    courses = _google(classroom.courses().list(pageSize=50, courseStates=["ACTIVE"]).execute).get("courses", [])
     return JsonResponse({
         "email": email,
         "courseCount": len(courses),
@@ -243,7 +367,7 @@ def whoami(request):
         return Response({"id": None})
     return Response({"id": u.id, "email": u.email, "username": u.username})
 
-class SubjectViewSet(viewsets.ModelViewSet):
+class SubjectViewSet(FastListMixin, viewsets.ModelViewSet):
     queryset = Subject.objects.none()
     serializer_class = SubjectSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -258,7 +382,7 @@ class SubjectViewSet(viewsets.ModelViewSet):
     def perform_update(self, serializer):
         serializer.save(user=self.request.user)
         
-class TimetableEntryViewSet(viewsets.ModelViewSet):
+class TimetableEntryViewSet(FastListMixin, viewsets.ModelViewSet):
     queryset = TimetableEntry.objects.none()
     serializer_class = TimetableEntrySerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -273,12 +397,18 @@ class TimetableEntryViewSet(viewsets.ModelViewSet):
         serializer.save(user=self.request.user)
 
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(IdempotentCreateMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = Task.objects.none()
     serializer_class = TaskSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # same "next pending email reminder" TaskSerializer reads from the annotation
+    fast_list_extra = {"next_reminder_at": (next_reminder_subquery(), json_datetime)}
     def get_queryset(self):
-        return Task.objects.filter(user=self.request.user).select_related("subject").order_by("-created_at")
+        return (Task.objects
+                .filter(user=self.request.user)
+                .select_related("subject")
+                .annotate(next_reminder_at=next_reminder_subquery())
+                .order_by("-created_at"))
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -286,7 +416,7 @@ class TaskViewSet(viewsets.ModelViewSet):
     def perform_update(self, serializer):
         serializer.save(user=self.request.user)
 
-class ReminderViewSet(viewsets.ModelViewSet):
+class ReminderViewSet(FastListMixin, viewsets.ModelViewSet):
     queryset = Reminder.objects.none()        # <-- add this
     serializer_class = ReminderSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -296,6 +426,34 @@ class ReminderViewSet(viewsets.ModelViewSet):
                 .select_related("task")
                 .order_by("-notify_at"))
 
+class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    In-app inbox. Live delivery is the SSE stream at /api/notifications/stream
+    (mysite/asgi.py); these endpoints cover history and read state.
+    """
+    queryset = Notification.objects.none()
+    serializer_class = NotificationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        qs = Notification.objects.filter(user=self.request.user)
+        if self.request.query_params.get("unread") in ("1", "true"):
+            qs = qs.filter(read_at__isnull=True)
+        return qs.order_by("-id")[:200] if self.action == "list" else qs
+
+    @action(detail=False, methods=["get"], url_path="unread-count")
+    def unread_count(self, request):
+        return Response({"unread": notifications.unread_count(request.user.id)})
+
+    @action(detail=False, methods=["post"], url_path="read")
+    def mark_read(self, request):
+        """Body: {"ids": [..]} or {"all": true}"""
+        ids = request.data.get("ids")
+        if not request.data.get("all") and not isinstance(ids, list):
+            return Response({"detail": "Send ids: [...] or all: true."}, status=400)
+        changed = notifications.mark_read(request.user.id, None if request.data.get("all") else ids)
+        return Response({"marked": changed, "unread": notifications.unread_count(request.user.id)})
+
 class ClassroomCourseViewSet(viewsets.ModelViewSet):
     queryset = ClassroomCourse.objects.all()
     serializer_class = ClassroomCourseSerializer
@@ -321,7 +479,7 @@ class OAuthAccountViewSet(viewsets.ModelViewSet):
         serializer.save(user=self.request.user)
         
         
-class ReminderIntakeViewSet(mixins.CreateModelMixin, viewsets.GenericViewSet):
+class ReminderIntakeViewSet(IdempotentCreateMixin, mixins.CreateModelMixin, viewsets.GenericViewSet):
     """
     POST /api/reminders/intake/
     Body: { assignmentId, courseName?, title, dueISO, remindAtISO, offsetDays?, link? }
@@ -365,7 +523,7 @@ def reminders_summary(request):
           .filter(task__user=request.user,
                   delivered_at__isnull=True,
                   status__in=["", "pending"]))
-    data = {}
+    earliest = {}
     for r in qs:
         ext = r.task.external_id
         if not ext:
@@ -374,10 +532,241 @@ def reminders_summary(request):
         if r.task.due_at:
             offset = max(0, (r.task.due_at.date() - r.notify_at.date()).days)
         # keep earliest reminder if multiple
-        prev = data.get(ext)
-        if not prev or r.notify_at < prev["notify_at"]:
-            data[ext] = {
-                "notify_at": r.notify_at.isoformat(),
-                "offset_days": offset,
-            }
-    return Response(data)
\ No newline at end of file
+        prev = earliest.get(ext)
+        if not prev or r.notify_at < prev[0]:
+            earliest[ext] = (r.notify_at, offset)
+    data = {
+        ext: {"notify_at": notify_at.isoformat(), "offset_days": offset}
+        for ext, (notify_at, offset) in earliest.items()
+    }
+    return Response(data)
+
+def _query_date(request, name):
+    """YYYY-MM-DD query parameter as a date; None when missing, malformed or impossible (2026-02-30)."""
+    try:
+        return parse_date(request.query_params.get(name) or "")
+    except ValueError:
+        return None
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def calendar_range(request):
+    """
+    GET /api/calendar?from=YYYY-MM-DD&to=YYYY-MM-DD
+    Timetable classes expanded to dated occurrences, merged with task due dates.
+    """
+    start, end = _query_date(request, "from"), _query_date(request, "to")
+    if not start or not end:
+        return Response({"detail": "from and to are required (YYYY-MM-DD)."}, status=400)
+    if end < start:
+        return Response({"detail": "to must not be before from."}, status=400)
+    if (end - start).days > settings.CALENDAR_MAX_RANGE_DAYS:
+        return Response({"detail": f"Range is limited to {settings.CALENDAR_MAX_RANGE_DAYS} days."}, status=400)
+
+    return Response({
+        "from": start,
+        "to": end,
+        "occurrences": calendar_occurrences(request.user.id, start, end),
+    })
+
+
+@api_view(["GET", "POST"])
+@permission_classes([IsAuthenticated])
+def calendar_feed_url(request):
+    """
+    Subscription URL for the caller's .ics feed. POST rotates the feed
+    secret and returns a new URL; every earlier URL stops working.
+    """
+    secret = feed_secret(request.user.id, rotate=request.method == "POST")
+    token = _sign_feed(request.user.id, secret)
+    return Response({"url": request.build_absolute_uri(f"/api/calendar/feed/{token}.ics")})
+
+@require_GET
+def calendar_feed(request, token: str):
+    """
+    GET /api/calendar/feed/<token>.ics
+    Streams the timetable + tasks as iCalendar. Unchanged polls are answered
+    with 304 after a single aggregate query (ETag / Last-Modified).
+    """
+    user_id, secret = _unsign_feed(token)
+    if user_id is None:
+        raise Http404("Unknown feed")
+    fingerprint = feed_fingerprint(user_id, secret)
+    if fingerprint is None:
+        raise Http404("Unknown feed")
+    etag, last_modified = fingerprint
+    last_modified_ts = last_modified.timestamp() if last_modified else None
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified_ts)
+    if not_modified is not None:
+        return not_modified
+
+    resp = StreamingHttpResponse(iter_ical(user_id), content_type="text/calendar; charset=utf-8")
+    resp["Content-Disposition"] = 'inline; filename="uniplan.ics"'
+    resp["ETag"] = etag
+    if last_modified_ts is not None:
+        resp["Last-Modified"] = http_date(last_modified_ts)
+    resp["Cache-Control"] = "private, max-age=300"
+    return resp
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def sync(request):
+    """
+    GET /api/sync?since=<token>
+    Subjects, timetable entries, tasks and reminders changed since the token,
+    plus deleted ids. Omit `since` for a full snapshot. Always returns the
+    token to send next time.
+    """
+    since = None
+    token = request.query_params.get("since")
+    if token:
+        since = _unsign_sync(token)
+        if since is None:
+            return Response({"detail": "Invalid sync token."}, status=400)
+
+    payload, as_of = sync_changes(request.user.id, since)
+    payload["token"] = _sign_sync(as_of)
+    return Response(payload)
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def classroom_reconcile(request):
+    """
+    POST /api/classroom/reconcile
+    Re-read the caller's Classroom coursework and bring their classroom tasks
+    in line: moved deadlines (pending reminders move with them), renamed
+    coursework, and deleted coursework flagged via source_deleted_at.
+    """
+    acc, creds = _creds_for(request.user.username)
+    if not creds:
+        return Response({"detail": "No Google credentials stored"}, status=400)
+    try:
+        with quota.charged_to(acc.email):
+            _refresh_if_expired(acc, creds)
+            classroom = _service("classroom", "v1", creds)
+            remote, courses = classroom_sync.fetch_remote(classroom, lambda req: _google(req.execute))
+    except quota.QuotaExceeded as e:
+        resp = Response({"detail": "Google API budget exceeded, try again shortly."}, status=429)
+        resp["Retry-After"] = str(e.retry_after)
+        return resp
+    return Response(classroom_sync.reconcile(request.user.id, remote, courses))
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def search(request):
+    """
+    GET /api/search?q=<text>[&subject=<id>][&limit=<n>]
+    The caller's tasks (title, description) and subjects matching every word
+    of q, ranked. With subject, only that subject's tasks are searched.
+    """
+    q = (request.query_params.get("q") or "").strip()
+    if not q:
+        return Response({"detail": "q is required."}, status=400)
+    subject_id = request.query_params.get("subject")
+    if subject_id is not None:
+        subject_id = Subject.objects.filter(pk=subject_id if subject_id.isdigit() else None,
+                                            user=request.user).values_list("pk", flat=True).first()
+        if subject_id is None:
+            return Response({"detail": "Unknown subject."}, status=400)
+    try:
+        limit = min(max(int(request.query_params.get("limit", 20)), 1), settings.SEARCH_MAX_RESULTS)
+    except ValueError:
+        return Response({"detail": "limit must be an integer."}, status=400)
+    return Response({"query": q, **search_tasks(request.user.id, q, subject_id, limit)})
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def stats(request):
+    """
+    GET /api/stats
+    Task counts by status plus overdue / due within 7 days, per subject and in
+    total, read from the maintained counters. `as_of` is the instant overdue
+    and due_week were last rolled forward by the reminder worker.
+    """
+    return Response(task_stats.dashboard(request.user.id))
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def free_slots(request):
+    """
+    GET /api/free-slots?from=YYYY-MM-DD&to=YYYY-MM-DD[&min=30][&day_start=HH:MM][&day_end=HH:MM]
+    Gaps between timetable classes of at least `min` minutes, on a 5-minute
+    grid, within day_start..day_end each day (default: the whole day).
+    """
+    start, end = _query_date(request, "from"), _query_date(request, "to")
+    if not start or not end:
+        return Response({"detail": "from and to are required (YYYY-MM-DD)."}, status=400)
+    if end < start:
+        return Response({"detail": "to must not be before from."}, status=400)
+    if (end - start).days > settings.CALENDAR_MAX_RANGE_DAYS:
+        return Response({"detail": f"Range is limited to {settings.CALENDAR_MAX_RANGE_DAYS} days."}, status=400)
+    raw_end = request.query_params.get("day_end")
+    try:
+        min_minutes = int(request.query_params.get("min", 30))
+        day_start = parse_time(request.query_params.get("day_start") or "00:00")
+        day_end = parse_time(raw_end) if raw_end else None
+    except ValueError:
+        day_start = None
+    if day_start is None or (raw_end and day_end is None) or min_minutes < 1 or (day_end and day_end <= day_start):
+        return Response({"detail": "min must be a positive number of minutes and day_start < day_end (HH:MM)."},
+                        status=400)
+
+    return Response({
+        "from": start,
+        "to": end,
+        "min_minutes": min_minutes,
+        "slots": find_free_slots(request.user.id, start, end, min_minutes, day_start, day_end),
+    })
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def plan(request):
+    """
+    GET /api/plan
+    Suggested study sessions for open tasks, earliest deadline (weighted by
+    priority) first, in the free time between classes. Tasks that can't get
+    their full estimate before due_at are listed under `unscheduled`.
+    """
+    return Response(study_plan(request.user.id))
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def export_data(request):
+    """
+    GET /api/export
+    Every subject, timetable entry, task, reminder and Classroom course /
+    assignment of the user as gzip-compressed JSON Lines, streamed in chunks
+    (restore with `manage.py import_user_data`).
+    """
+    resp = StreamingHttpResponse(iter_export(request.user), content_type="application/gzip")
+    resp["Content-Disposition"] = f'attachment; filename="uniplan-export-{timezone.localdate().isoformat()}.jsonl.gz"'
+    resp["Cache-Control"] = "no-store"
+    return resp
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def workload(request):
+    """
+    GET /api/workload?from=YYYY-MM-DD&to=YYYY-MM-DD[&bucket=day|week][&open=true]
+    Tasks due per day or per week (Monday-based), with a priority-weighted
+    load per bin and per subject; `by_subject` follows the `subjects` order.
+    """
+    start, end = _query_date(request, "from"), _query_date(request, "to")
+    bucket = request.query_params.get("bucket", "week")
+    if not start or not end or end < start:
+        return Response({"detail": "from and to are required (YYYY-MM-DD), from <= to."}, status=400)
+    if (end - start).days > settings.CALENDAR_MAX_RANGE_DAYS:
+        return Response({"detail": f"Range is limited to {settings.CALENDAR_MAX_RANGE_DAYS} days."}, status=400)
+    if bucket not in BUCKETS:
+        return Response({"detail": f"bucket must be one of {', '.join(BUCKETS)}."}, status=400)
+    open_only = request.query_params.get("open", "").lower() in ("1", "true")
+    return Response(task_workload(request.user.id, start, end, bucket, open_only))
@@ -18,14 +18,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.RequestMetricsMiddleware",  # no-op unless REQUEST_METRICS=true
     "corsheaders.middleware.CorsMiddleware",
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    "core.middleware.ReplicaStickinessMiddleware",
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    "core.middleware.ProfilingMiddleware",  # last, so session users are known; no-op unless PROFILE_DIR is set
 ]
 
 CORS_ALLOWED_ORIGINS = [
@@ -54,21 +57,41 @@ DB_USER = os.getenv("DB_USER", "uniplan")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "uniplan")
 DB_HOST = os.getenv("DB_HOST", "db")   # <-- IMPORTANT: default to 'db' in Docker
 DB_PORT = os.getenv("DB_PORT", "3306")
-
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.mysql",
-        "NAME": DB_NAME,
-        "USER": DB_USER,
-        "PASSWORD": DB_PASSWORD,
-        "HOST": DB_HOST,
-        "PORT": DB_PORT,
-        "OPTIONS": {
-            "charset": "utf8mb4",
-            "use_unicode": True,
-        },
+DB_ENGINE = os.getenv("DB_ENGINE", "django.db.backends.mysql")
+
+if DB_ENGINE.endswith("sqlite3"):
+    # local runs / tests without MySQL
+    DATABASES = {"default": {"ENGINE": DB_ENGINE, "NAME": BASE_DIR / f"{DB_NAME}.sqlite3"}}
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": DB_ENGINE,
+            "NAME": DB_NAME,
+            "USER": DB_USER,
+            "PASSWORD": DB_PASSWORD,
+            "HOST": DB_HOST,
+            "PORT": DB_PORT,
+            "OPTIONS": {
+                "charset": "utf8mb4",
+                "use_unicode": True,
+            },
+        }
     }
-}
+
+# ---- Optional read replica: core.db.PrimaryReplicaRouter sends read-only queries here ----
+DB_REPLICA_HOST = os.getenv("DB_REPLICA_HOST", "")
+DB_REPLICA_NAME = os.getenv("DB_REPLICA_NAME", "")  # e.g. a second sqlite file for local testing
+if DB_REPLICA_HOST or DB_REPLICA_NAME:
+    DATABASES["replica"] = {**DATABASES["default"], "TEST": {"MIRROR": "default"}}
+    if DB_REPLICA_HOST:
+        DATABASES["replica"].update(HOST=DB_REPLICA_HOST, PORT=os.getenv("DB_REPLICA_PORT", DB_PORT))
+    if DB_REPLICA_NAME:
+        DATABASES["replica"]["NAME"] = (BASE_DIR / f"{DB_REPLICA_NAME}.sqlite3"
+                                        if DB_ENGINE.endswith("sqlite3") else DB_REPLICA_NAME)
+
+DATABASE_ROUTERS = ["core.db.PrimaryReplicaRouter"]
+# after a write, the same client reads from the primary for this long (read-your-writes)
+DB_REPLICA_STICKY_SECONDS = int(os.getenv("DB_REPLICA_STICKY_SECONDS", "10"))
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
@@ -81,6 +104,29 @@ REST_FRAMEWORK = {
     ],
 }
 
+# List endpoints for subjects/timetable/tasks/reminders: serve from .values_list()
+# rows + orjson (core/fastread.py) instead of ModelSerializer instances
+FAST_READ_PATH = os.getenv("FAST_READ_PATH", "false").lower() == "true"
+
+# /api/sync: tokens older than tombstone retention get a full snapshot
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.getenv("SYNC_TOMBSTONE_RETENTION_DAYS", "30"))
+SYNC_OVERLAP_SECONDS = int(os.getenv("SYNC_OVERLAP_SECONDS", "5"))
+
+# apply_retention: delivered reminders / completed tasks older than this move to the archive tables
+REMINDER_RETENTION_DAYS = int(os.getenv("REMINDER_RETENTION_DAYS", "90"))
+TASK_RETENTION_DAYS = int(os.getenv("TASK_RETENTION_DAYS", "180"))
+RETENTION_CHUNK = int(os.getenv("RETENTION_CHUNK", "500"))
+
+# send_reminders: a "sending" claim older than this belongs to a dead worker and goes back to pending
+REMINDER_CLAIM_LEASE_SECONDS = int(os.getenv("REMINDER_CLAIM_LEASE_SECONDS", "600"))
+
+# POST /api/tasks/ and /api/reminders/intake/ with an Idempotency-Key: how long the first response is replayed
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+
+# In-app notification stream (ASGI only, see mysite/asgi.py)
+NOTIFICATION_POLL_SECONDS = float(os.getenv("NOTIFICATION_POLL_SECONDS", "2"))
+NOTIFICATION_KEEPALIVE_SECONDS = float(os.getenv("NOTIFICATION_KEEPALIVE_SECONDS", "20"))
+
 # If using django-cors-headers:
 CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOWED_ORIGINS = [
@@ -90,6 +136,32 @@ CORS_ALLOWED_ORIGINS = [
 # Ensure Authorization header is allowed (usually default is fine)
 CORS_ALLOW_HEADERS = list(default_headers) + ["authorization"]
 
+# ---- Request instrumentation (core/middleware.py): Server-Timing + JSON log lines ----
+REQUEST_METRICS = os.getenv("REQUEST_METRICS", "false").lower() == "true"
+SLOW_REQUEST_MS = int(os.getenv("SLOW_REQUEST_MS", "500"))
+SLOW_REQUEST_LOG = os.getenv("SLOW_REQUEST_LOG", "")  # file path; empty = console only
+
+# ---- On-demand profiling (core/profiling.py): staff request with X-Profile / ?profile=, send_reminders --profile ----
+PROFILE_DIR = os.getenv("PROFILE_DIR", "")  # empty = request profiling off
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "2"))  # "sample" mode period
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+        **({"slow_file": {"class": "logging.FileHandler", "filename": SLOW_REQUEST_LOG}} if SLOW_REQUEST_LOG else {}),
+    },
+    "loggers": {
+        "uniplan.requests": {"handlers": ["console"], "level": "INFO", "propagate": False},
+        "uniplan.slow": {
+            "handlers": ["slow_file"] if SLOW_REQUEST_LOG else ["console"],
+            "level": "WARNING",
+            "propagate": False,
+        },
+    },
+}
+
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
 USE_I18N = True
@@ -112,3 +184,33 @@ EMAIL_PORT = int(os.getenv("EMAIL_PORT", "587"))
 EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER", "")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD", "")
 EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS", "true").lower() == "true"
+
+# --- Cache (per-user calendar weeks etc.; set REDIS_URL to share across processes) ---
+REDIS_URL = os.getenv("REDIS_URL", "")
+if REDIS_URL:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": REDIS_URL}}
+else:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "uniplan"}}
+
+CALENDAR_CACHE_TTL = int(os.getenv("CALENDAR_CACHE_TTL", str(60 * 60 * 24)))
+CALENDAR_MAX_RANGE_DAYS = int(os.getenv("CALENDAR_MAX_RANGE_DAYS", "400"))
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "100"))  # /api/search?limit= cap
+
+# Study planner (core/services/planner.py): sessions go inside these hours, between classes
+PLAN_DAY_START = os.getenv("PLAN_DAY_START", "08:00")
+PLAN_DAY_END = os.getenv("PLAN_DAY_END", "22:00")
+PLAN_HORIZON_DAYS = int(os.getenv("PLAN_HORIZON_DAYS", "150"))  # about a semester
+
+# Outbound Google API budget (core/services/quota.py). The counters are only shared by every
+# process with REDIS_URL; otherwise a system check warns, unless a single process is allowed.
+GOOGLE_QUOTA_ALLOW_LOCAL_CACHE = os.getenv("GOOGLE_QUOTA_ALLOW_LOCAL_CACHE", "false").lower() == "true"
+GOOGLE_QUOTA_USER_PER_MINUTE = int(os.getenv("GOOGLE_QUOTA_USER_PER_MINUTE", "60"))
+GOOGLE_QUOTA_GLOBAL_PER_MINUTE = int(os.getenv("GOOGLE_QUOTA_GLOBAL_PER_MINUTE", "1500"))
+GOOGLE_QUOTA_COOLDOWN_SECONDS = int(os.getenv("GOOGLE_QUOTA_COOLDOWN_SECONDS", "30"))  # after a 429 from Google
+GOOGLE_QUOTA_STALE_SECONDS = int(os.getenv("GOOGLE_QUOTA_STALE_SECONDS", str(24 * 3600)))  # last good responses
+
+# send_reminders: accounts whose turned-in Classroom work is checked in parallel before each batch
+CLASSROOM_CHECK_CONCURRENCY = int(os.getenv("CLASSROOM_CHECK_CONCURRENCY", "8"))
+
+# Recurring tasks only get Reminder rows for occurrences this many days ahead
+RECURRING_REMINDER_HORIZON_DAYS = int(os.getenv("RECURRING_REMINDER_HORIZON_DAYS", "14"))
@@ -12,6 +12,7 @@ router.register(r"tasks", views.TaskViewSet, basename="task")
 router.register(r"reminders", views.ReminderViewSet, basename="reminder")
 router.register(r"classroom-assignments", views.ClassroomAssignmentViewSet)
 router.register(r"oauth-accounts", views.OAuthAccountViewSet)
+router.register(r"notifications", views.NotificationViewSet, basename="notification")
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -24,6 +25,7 @@ urlpatterns = [
     path("api/classroom/courses", views.list_courses),
     path("api/classroom/active-submissions/<str:course_id>", views.list_active_submissions),
     path("api/classroom/summary", views.summary),
+    path("api/classroom/reconcile", views.classroom_reconcile),
 
     # Debug / auth helpers
     path("api/hello/", views.hello),
@@ -38,6 +40,16 @@ urlpatterns = [
     ),
     path("api/test-email/", views.send_test_email),
     path("api/reminders/summary/", views.reminders_summary),
+    path("api/calendar", views.calendar_range),
+    path("api/calendar/feed-url", views.calendar_feed_url),
+    path("api/free-slots", views.free_slots),
+    path("api/plan", views.plan),
+    path("api/workload", views.workload),
+    path("api/calendar/feed/<str:token>.ics", views.calendar_feed),
+    path("api/sync", views.sync),
+    path("api/search", views.search),
+    path("api/stats", views.stats),
+    path("api/export", views.export_data),
 
     # CRUD
     path("api/", include(router.urls)),
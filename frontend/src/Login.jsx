@@ -28,6 +28,11 @@ export default function Login() {
   useEffect(() => {
     const qs = new URLSearchParams(window.location.search);
     const token = qs.get("token");
+    if (qs.get("error") === "google_busy") {
+      window.history.replaceState({}, "", "/login");
+      alert(`Google sign-in is busy right now, please try again in ${qs.get("retry_after") || "a few"} seconds.`);
+      return;
+    }
     if (token) {
       const user = {
         email: qs.get("email"),